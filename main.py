@@ -14,6 +14,7 @@ Environment Variables:
 """
 
 import argparse
+import json
 import os
 import shutil
 import subprocess
@@ -436,6 +437,34 @@ Examples:
         help="API key for model authentication",
     )
 
+    parser.add_argument(
+        "--fast-model",
+        type=str,
+        default=os.getenv("PHONE_AGENT_FAST_MODEL"),
+        help="Fast model for routine steps; --model is then only used on escalation",
+    )
+
+    parser.add_argument(
+        "--fast-base-url",
+        type=str,
+        default=os.getenv("PHONE_AGENT_FAST_BASE_URL"),
+        help="Base URL of the fast model (defaults to --base-url)",
+    )
+
+    parser.add_argument(
+        "--hedge-base-url",
+        type=str,
+        default=os.getenv("PHONE_AGENT_HEDGE_BASE_URL"),
+        help="Backup endpoint that also gets a request when --base-url is slow to start streaming",
+    )
+
+    parser.add_argument(
+        "--hedge-model",
+        type=str,
+        default=os.getenv("PHONE_AGENT_HEDGE_MODEL"),
+        help="Model name on the backup endpoint (defaults to --model)",
+    )
+
     parser.add_argument(
         "--max-steps",
         type=int,
@@ -511,6 +540,35 @@ Examples:
         "--list-apps", action="store_true", help="List supported apps and exit"
     )
 
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_PIPELINED", "0") == "1",
+        help="Overlap screenshot/app/resolution queries with model inference (Android/HarmonyOS only)",
+    )
+
+    parser.add_argument(
+        "--early-action",
+        action="store_true",
+        default=os.getenv("PHONE_AGENT_EARLY_ACTION", "0") == "1",
+        help="Start device actions as soon as the action call has streamed in, before the response ends",
+    )
+
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Record per-step phase timings and write them as a Chrome trace JSON file",
+    )
+
+    parser.add_argument(
+        "--context-budget",
+        type=int,
+        default=int(os.getenv("PHONE_AGENT_CONTEXT_BUDGET", "0")),
+        help="Prompt token budget; older steps are summarized beyond it (0 = per-model default)",
+    )
+
     parser.add_argument(
         "--lang",
         type=str,
@@ -764,7 +822,25 @@ def main():
         model_name=args.model,
         api_key=args.apikey,
         lang=args.lang,
+        context_budget=args.context_budget or None,
     )
+    fast_model_config = None
+    if args.fast_model:
+        fast_model_config = ModelConfig(
+            base_url=args.fast_base_url or args.base_url,
+            model_name=args.fast_model,
+            api_key=args.apikey,
+            lang=args.lang,
+        )
+    hedge_model_config = None
+    if args.hedge_base_url:
+        hedge_model_config = ModelConfig(
+            base_url=args.hedge_base_url,
+            model_name=args.hedge_model or args.model,
+            api_key=args.apikey,
+            lang=args.lang,
+            context_budget=args.context_budget or None,
+        )
 
     if device_type == DeviceType.IOS:
         # Create iOS agent
@@ -787,11 +863,15 @@ def main():
             device_id=args.device_id,
             verbose=not args.quiet,
             lang=args.lang,
+            pipelined=args.pipelined,
+            early_action=args.early_action,
         )
 
         agent = PhoneAgent(
             model_config=model_config,
             agent_config=agent_config,
+            fast_model_config=fast_model_config,
+            hedge_model_config=hedge_model_config,
         )
 
     # Print header
@@ -802,6 +882,10 @@ def main():
         print("Phone Agent - AI-powered phone automation")
     print("=" * 50)
     print(f"Model: {model_config.model_name}")
+    if fast_model_config is not None and device_type != DeviceType.IOS:
+        print(f"Fast Model: {fast_model_config.model_name} ({fast_model_config.base_url})")
+    if hedge_model_config is not None and device_type != DeviceType.IOS:
+        print(f"Hedge Model: {hedge_model_config.model_name} ({hedge_model_config.base_url})")
     print(f"Base URL: {model_config.base_url}")
     print(f"Max Steps: {agent_config.max_steps}")
     print(f"Language: {agent_config.lang}")
@@ -831,11 +915,21 @@ def main():
 
     print("=" * 50)
 
+    # Record phase timings for --trace
+    timeline = None
+    if args.trace:
+        from phone_agent.profiler import Timeline, set_timeline
+
+        timeline = Timeline(device_id=agent_config.device_id)
+        set_timeline(timeline)
+
     # Run with provided task or enter interactive mode
     if args.task:
         print(f"\nTask: {args.task}\n")
         result = agent.run(args.task)
         print(f"\nResult: {result}")
+        if timeline is not None:
+            _write_trace(timeline, args.trace)
     else:
         # Interactive mode
         print("\nEntering interactive mode. Type 'quit' to exit.\n")
@@ -855,6 +949,8 @@ def main():
                 result = agent.run(task)
                 print(f"\nResult: {result}\n")
                 agent.reset()
+                if timeline is not None:
+                    _write_trace(timeline, args.trace)
 
             except KeyboardInterrupt:
                 print("\n\nInterrupted. Goodbye!")
@@ -863,5 +959,15 @@ def main():
                 print(f"\nError: {e}\n")
 
 
+def _write_trace(timeline, path: str) -> None:
+    """Print the per-phase timing summary and write the Chrome trace."""
+    print("⏱️  Phase timings:")
+    for name, stats in timeline.summary().items():
+        print(f"  {name:<22} {stats['total']:8.2f}s  ({int(stats['count'])}x, avg {stats['avg']:.3f}s)")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(timeline.to_chrome_trace(), f)
+    print(f"Trace written to {path}")
+
+
 if __name__ == "__main__":
     main()
@@ -1,6 +1,7 @@
 """Action handler for processing AI model outputs."""
 
 import ast
+import asyncio
 import logging
 import re
 import subprocess
@@ -96,29 +97,80 @@ class ActionHandler:
         Returns:
             ActionResult indicating success and whether to finish.
         """
+        result, action_name, action = self._resolve_action(
+            action, screen_width, screen_height
+        )
+        if result is not None:
+            return result
+
+        handler_method = self._get_handler(action_name)
+        try:
+            return handler_method(action, screen_width, screen_height)
+        except Exception as e:
+            return ActionResult(
+                success=False, should_finish=False, message=f"Action failed: {e}"
+            )
+
+    async def aexecute(
+        self, action: dict[str, Any], screen_width: int, screen_height: int
+    ) -> ActionResult:
+        """
+        Execute an action from the AI model without blocking the event loop.
+
+        Device actions run on the device factory's async primitives; actions
+        that wait on user callbacks (confirmation, takeover, tap preview) run
+        their blocking handler in a worker thread.
+        """
+        result, action_name, action = self._resolve_action(
+            action, screen_width, screen_height
+        )
+        if result is not None:
+            return result
+
+        async_handler = self._get_async_handler(action_name)
+        try:
+            if async_handler is not None:
+                return await async_handler(action, screen_width, screen_height)
+            return await asyncio.to_thread(
+                self._get_handler(action_name), action, screen_width, screen_height
+            )
+        except Exception as e:
+            return ActionResult(
+                success=False, should_finish=False, message=f"Action failed: {e}"
+            )
+
+    def _resolve_action(
+        self, action: dict[str, Any], screen_width: int, screen_height: int
+    ) -> tuple[ActionResult | None, str | None, dict[str, Any]]:
+        """
+        Validate an action and apply the rule engine.
+
+        Returns:
+            (result, action_name, action). result is set when the action ends
+            here (finish, unknown action, rule abort/skip); otherwise the
+            possibly rule-modified action should be dispatched to its handler.
+        """
         action_type = action.get("_metadata")
 
         if action_type == "finish":
             return ActionResult(
                 success=True, should_finish=True, message=action.get("message")
-            )
+            ), None, action
 
         if action_type != "do":
             return ActionResult(
                 success=False,
                 should_finish=True,
                 message=f"Unknown action type: {action_type}",
-            )
+            ), None, action
 
         action_name = action.get("action")
-        handler_method = self._get_handler(action_name)
-
-        if handler_method is None:
+        if self._get_handler(action_name) is None:
             return ActionResult(
                 success=False,
                 should_finish=False,
                 message=f"Unknown action: {action_name}",
-            )
+            ), action_name, action
 
         # 应用规则引擎
         try:
@@ -137,7 +189,7 @@ class ActionHandler:
                     success=False,
                     should_finish=False,
                     message=rule_result.message or f"规则阻止执行: {action_name}"
-                )
+                ), action_name, action
 
             if rule_result.result == RuleResult.SKIP:
                 logger.info(f"规则跳过动作 {action_name}: {rule_result.message}")
@@ -145,7 +197,7 @@ class ActionHandler:
                     success=True,
                     should_finish=False,
                     message=rule_result.message or f"规则跳过: {action_name}"
-                )
+                ), action_name, action
 
             if rule_result.result == RuleResult.MODIFIED and rule_result.modified_params:
                 # 使用修改后的参数
@@ -155,17 +207,11 @@ class ActionHandler:
                 # 检查是否转换为其他动作
                 if action.get("_converted_from_swipe"):
                     action_name = "Tap"
-                    handler_method = self._get_handler(action_name)
 
         except Exception as e:
             logger.warning(f"规则引擎执行失败，继续使用原有逻辑: {e}")
 
-        try:
-            return handler_method(action, screen_width, screen_height)
-        except Exception as e:
-            return ActionResult(
-                success=False, should_finish=False, message=f"Action failed: {e}"
-            )
+        return None, action_name, action
 
     def _get_handler(self, action_name: str) -> Callable | None:
         """Get the handler method for an action."""
@@ -187,6 +233,22 @@ class ActionHandler:
         }
         return handlers.get(action_name)
 
+    def _get_async_handler(self, action_name: str) -> Callable | None:
+        """Get the async handler method for an action, if it has one."""
+        handlers = {
+            "Launch": self._ahandle_launch,
+            "Tap": self._ahandle_tap,
+            "Type": self._ahandle_type,
+            "Type_Name": self._ahandle_type,
+            "Swipe": self._ahandle_swipe,
+            "Back": self._ahandle_back,
+            "Home": self._ahandle_home,
+            "Double Tap": self._ahandle_double_tap,
+            "Long Press": self._ahandle_long_press,
+            "Wait": self._ahandle_wait,
+        }
+        return handlers.get(action_name)
+
     def _convert_relative_to_absolute(
         self, element: list[int], screen_width: int, screen_height: int
     ) -> tuple[int, int]:
@@ -271,16 +333,22 @@ class ActionHandler:
 
         # Clear existing text and type new text
         device_factory.clear_text(self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_clear_delay)
+        device_factory.wait_for_settle(
+            self.device_id, TIMING_CONFIG.action.text_clear_delay
+        )
 
         # Handle multiline text by splitting on newlines
         device_factory.type_text(text, self.device_id)
-        time.sleep(TIMING_CONFIG.action.text_input_delay)
+        device_factory.wait_for_settle(
+            self.device_id, TIMING_CONFIG.action.text_input_delay
+        )
 
         # Press Enter key if requested
         if press_enter:
             device_factory.press_enter(self.device_id)
-            time.sleep(TIMING_CONFIG.action.text_input_delay)
+            device_factory.wait_for_settle(
+                self.device_id, TIMING_CONFIG.action.text_input_delay
+            )
 
         return ActionResult(True, False)
 
@@ -367,6 +435,122 @@ class ActionHandler:
         # This action signals that user input is needed
         return ActionResult(True, False, message="User interaction required")
 
+    async def _ahandle_launch(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle app launch action (async)."""
+        app_name = action.get("app")
+        if not app_name:
+            return ActionResult(False, False, "No app name specified")
+
+        success = await get_device_factory().alaunch_app(app_name, self.device_id)
+        if success:
+            return ActionResult(True, False)
+        return ActionResult(False, False, f"App not found: {app_name}")
+
+    async def _ahandle_tap(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle tap action (async)."""
+        if "message" in action or self.tap_preview_callback:
+            # Confirmation and tap preview callbacks block on the user
+            return await asyncio.to_thread(self._handle_tap, action, width, height)
+
+        element = action.get("element")
+        if not element:
+            return ActionResult(False, False, "No element coordinates")
+
+        x, y = self._convert_relative_to_absolute(element, width, height)
+        logger.info(f"Executing tap at ({x}, {y}) on device {self.device_id}")
+        await get_device_factory().atap(x, y, self.device_id)
+
+        # 记录点击位置和时间，用于规则引擎检测连续快速点击
+        self._last_tap_position = (x, y)
+        self._last_tap_time = time.time()
+
+        return ActionResult(True, False)
+
+    async def _ahandle_type(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle text input action (async)."""
+        text = action.get("text", "")
+        press_enter = action.get("press_enter", False)
+
+        device_factory = get_device_factory()
+
+        if not self._keyboard_set:
+            await asyncio.to_thread(self.setup_keyboard)
+
+        await device_factory.aclear_text(self.device_id)
+        await device_factory.await_for_settle(
+            self.device_id, TIMING_CONFIG.action.text_clear_delay
+        )
+
+        await device_factory.atype_text(text, self.device_id)
+        await device_factory.await_for_settle(
+            self.device_id, TIMING_CONFIG.action.text_input_delay
+        )
+
+        if press_enter:
+            await device_factory.apress_enter(self.device_id)
+            await device_factory.await_for_settle(
+                self.device_id, TIMING_CONFIG.action.text_input_delay
+            )
+
+        return ActionResult(True, False)
+
+    async def _ahandle_swipe(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle swipe action (async)."""
+        start = action.get("start")
+        end = action.get("end")
+
+        if not start or not end:
+            return ActionResult(False, False, "Missing swipe coordinates")
+
+        start_x, start_y = self._convert_relative_to_absolute(start, width, height)
+        end_x, end_y = self._convert_relative_to_absolute(end, width, height)
+
+        await get_device_factory().aswipe(
+            start_x, start_y, end_x, end_y, device_id=self.device_id
+        )
+        return ActionResult(True, False)
+
+    async def _ahandle_back(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle back button action (async)."""
+        await get_device_factory().aback(self.device_id)
+        return ActionResult(True, False)
+
+    async def _ahandle_home(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle home button action (async)."""
+        await get_device_factory().ahome(self.device_id)
+        return ActionResult(True, False)
+
+    async def _ahandle_double_tap(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle double tap action (async)."""
+        element = action.get("element")
+        if not element:
+            return ActionResult(False, False, "No element coordinates")
+
+        x, y = self._convert_relative_to_absolute(element, width, height)
+        await get_device_factory().adouble_tap(x, y, self.device_id)
+        return ActionResult(True, False)
+
+    async def _ahandle_long_press(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle long press action (async)."""
+        element = action.get("element")
+        if not element:
+            return ActionResult(False, False, "No element coordinates")
+
+        x, y = self._convert_relative_to_absolute(element, width, height)
+        await get_device_factory().along_press(x, y, device_id=self.device_id)
+        return ActionResult(True, False)
+
+    async def _ahandle_wait(self, action: dict, width: int, height: int) -> ActionResult:
+        """Handle wait action (async)."""
+        duration_str = action.get("duration", "1 seconds")
+        try:
+            duration = float(duration_str.replace("seconds", "").strip())
+        except ValueError:
+            duration = 1.0
+
+        await asyncio.sleep(duration)
+        return ActionResult(True, False)
+
     def _send_keyevent(self, keycode: str) -> None:
         """Send a keyevent to the device."""
         from phone_agent.device_factory import DeviceType, get_device_factory
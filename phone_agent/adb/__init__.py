@@ -1,5 +1,6 @@
 """ADB utilities for Android device interaction."""
 
+from phone_agent.adb import aio
 from phone_agent.adb.connection import (
     ADBConnection,
     ConnectionType,
@@ -17,6 +18,7 @@ from phone_agent.adb.device import (
     swipe,
     tap,
 )
+from phone_agent.adb.geometry import DeviceGeometry, get_geometry_cache
 from phone_agent.adb.input import (
     clear_text,
     detect_and_set_adb_keyboard,
@@ -26,6 +28,7 @@ from phone_agent.adb.input import (
     type_text,
 )
 from phone_agent.adb.screenshot import get_screenshot, set_screenshot_verbose
+from phone_agent.adb.settle import wait_for_settle
 from phone_agent.adb.unlock import (
     ensure_device_unlocked,
     is_device_locked,
@@ -55,6 +58,10 @@ __all__ = [
     "double_tap",
     "long_press",
     "launch_app",
+    "wait_for_settle",
+    # Display geometry
+    "DeviceGeometry",
+    "get_geometry_cache",
     # Connection management
     "ADBConnection",
     "DeviceInfo",
@@ -68,4 +75,6 @@ __all__ = [
     "set_pin_request_callback",
     "unlock_device",
     "wake_screen",
+    # Asyncio variants of the device primitives
+    "aio",
 ]
@@ -0,0 +1,324 @@
+"""Asyncio variants of the ADB device primitives.
+
+These mirror the blocking helpers in device.py, input.py, screenshot.py,
+settle.py and unlock.py, but run adb through asyncio subprocesses so a single
+event loop can drive many devices without holding a thread per device. Output
+parsing and image processing are shared with the blocking implementations;
+CPU-heavy image work runs in a worker thread.
+"""
+
+import asyncio
+import base64
+import logging
+import time
+
+from phone_agent.adb import screenshot as _screenshot
+from phone_agent.adb.device import FOCUS_QUERY, parse_current_app, swipe_duration
+from phone_agent.adb.geometry import get_geometry_cache
+from phone_agent.adb.screenshot import Screenshot
+from phone_agent.adb.settle import (
+    frame_difference,
+    poll_budget_exceeded,
+    polling_worthwhile,
+    record_capture_cost,
+    streamed_thumbnail,
+    thumbnail_from_raw,
+)
+from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.config.screenshot import SCREENSHOT_CONFIG
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.profiler import SPAN_SCREENSHOT_CAPTURE, SPAN_SETTLE, span
+
+logger = logging.getLogger(__name__)
+
+
+async def run_adb(
+    args: list[str], device_id: str | None = None, timeout: float | None = None
+) -> tuple[int, bytes, bytes]:
+    """
+    Run an adb command without blocking the event loop.
+
+    Args:
+        args: Arguments after the 'adb [-s serial]' prefix.
+        device_id: Optional ADB device ID.
+        timeout: Optional timeout in seconds; the process is killed on expiry.
+
+    Returns:
+        Tuple of (returncode, stdout, stderr).
+
+    Raises:
+        asyncio.TimeoutError: If the command does not finish in time.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *_get_adb_prefix(device_id),
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        proc.kill()
+        await proc.wait()
+        raise
+    return proc.returncode, stdout, stderr
+
+
+async def get_current_app(device_id: str | None = None) -> str:
+    """Async variant of device.get_current_app."""
+    _, stdout, _ = await run_adb(["shell", FOCUS_QUERY], device_id)
+    if not stdout.strip():
+        _, stdout, _ = await run_adb(["shell", "dumpsys", "window"], device_id)
+    return parse_current_app(stdout.decode("utf-8", errors="ignore"))
+
+
+async def get_screen_size(device_id: str | None = None) -> tuple[int, int]:
+    """Async variant of unlock.get_screen_size (served from the geometry cache)."""
+    return (await get_geometry_cache().aget(device_id)).size
+
+
+async def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+    """
+    Async variant of screenshot.get_screenshot.
+
+    Shares in-flight captures of the device with blocking and async callers.
+    """
+    return await _screenshot._asingle_flight(
+        device_id, lambda: _capture_screenshot(device_id, timeout)
+    )
+
+
+async def _capture_screenshot(device_id: str | None, timeout: int) -> Screenshot:
+    start_time = time.time()
+    try:
+        if SCREENSHOT_CONFIG.capture_format_for(device_id) == "raw":
+            with span(SPAN_SCREENSHOT_CAPTURE, format="raw"):
+                returncode, stdout, _ = await run_adb(
+                    ["exec-out", "screencap"], device_id, timeout=timeout
+                )
+            if returncode == 0:
+                screenshot = await asyncio.to_thread(
+                    _screenshot._screenshot_from_raw, stdout, start_time
+                )
+                if screenshot is not None:
+                    return screenshot
+
+        with span(SPAN_SCREENSHOT_CAPTURE):
+            returncode, stdout, _ = await run_adb(
+                ["exec-out", "screencap", "-p"], device_id, timeout=timeout
+            )
+        if returncode == 0:
+            screenshot = await asyncio.to_thread(
+                _screenshot._screenshot_from_png, stdout, start_time
+            )
+            if screenshot is not None:
+                return screenshot
+    except asyncio.TimeoutError:
+        return _screenshot._create_fallback_screenshot(is_sensitive=False)
+    except Exception as e:
+        print(f"[Screenshot] Error: {e}")
+        return _screenshot._create_fallback_screenshot(is_sensitive=False)
+
+    # Rare path (old devices): temp file on the device, pulled in a worker thread
+    return await asyncio.to_thread(
+        _screenshot._get_screenshot_traditional, device_id, timeout
+    )
+
+
+async def capture_thumbnail(device_id: str | None = None, timeout: float = 5):
+    """Async variant of settle.capture_thumbnail."""
+    thumbnail = await asyncio.to_thread(streamed_thumbnail, device_id)
+    if thumbnail is not None:
+        return thumbnail
+
+    start = time.monotonic()
+    try:
+        returncode, stdout, _ = await run_adb(["exec-out", "screencap"], device_id, timeout)
+    except (asyncio.TimeoutError, OSError) as e:
+        logger.debug(f"Settle capture failed: {e}")
+        return None
+    if returncode != 0:
+        return None
+    record_capture_cost(device_id, time.monotonic() - start)
+    return await asyncio.to_thread(thumbnail_from_raw, stdout)
+
+
+async def wait_for_settle(device_id: str | None = None, fallback_delay: float = 1.0) -> float:
+    """Async variant of settle.wait_for_settle."""
+    config = TIMING_CONFIG.settle
+    if not config.enabled or not polling_worthwhile(device_id, fallback_delay):
+        await asyncio.sleep(fallback_delay)
+        return fallback_delay
+
+    start = time.monotonic()
+    await asyncio.sleep(config.min_delay)
+
+    previous = await capture_thumbnail(device_id)
+    stable_count = 0
+    while True:
+        elapsed = time.monotonic() - start
+        if previous is None:
+            await asyncio.sleep(max(0.0, fallback_delay - elapsed))
+            break
+        if poll_budget_exceeded(device_id, elapsed):
+            break
+
+        await asyncio.sleep(config.poll_interval)
+        current = await capture_thumbnail(device_id)
+        if current is not None:
+            if frame_difference(previous, current) <= config.diff_threshold:
+                stable_count += 1
+                if stable_count >= config.stable_frames:
+                    break
+            else:
+                stable_count = 0
+        previous = current
+
+    return time.monotonic() - start
+
+
+async def _wait_after_action(
+    device_id: str | None, delay: float | None, default_delay: float
+) -> None:
+    """Sleep an explicit delay, or wait for the screen to settle by default."""
+    with span(SPAN_SETTLE, delay=delay if delay is not None else default_delay):
+        if delay is not None:
+            await asyncio.sleep(delay)
+        else:
+            await wait_for_settle(device_id, default_delay)
+
+
+async def tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """Async variant of device.tap."""
+    returncode, _, stderr = await run_adb(["shell", "input", "tap", str(x), str(y)], device_id)
+    if returncode != 0:
+        logger.error(f"Tap command failed: {stderr.decode(errors='ignore')}")
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_tap_delay)
+
+
+async def double_tap(
+    x: int, y: int, device_id: str | None = None, delay: float | None = None
+) -> None:
+    """Async variant of device.double_tap."""
+    await run_adb(["shell", "input", "tap", str(x), str(y)], device_id)
+    await asyncio.sleep(TIMING_CONFIG.device.double_tap_interval)
+    await run_adb(["shell", "input", "tap", str(x), str(y)], device_id)
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_double_tap_delay)
+
+
+async def long_press(
+    x: int,
+    y: int,
+    duration_ms: int = 3000,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """Async variant of device.long_press."""
+    await run_adb(
+        ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
+        device_id,
+    )
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_long_press_delay)
+
+
+async def swipe(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    duration_ms: int | None = None,
+    device_id: str | None = None,
+    delay: float | None = None,
+) -> None:
+    """Async variant of device.swipe."""
+    if duration_ms is None:
+        duration_ms = swipe_duration(start_x, start_y, end_x, end_y)
+    await run_adb(
+        [
+            "shell",
+            "input",
+            "swipe",
+            str(start_x),
+            str(start_y),
+            str(end_x),
+            str(end_y),
+            str(duration_ms),
+        ],
+        device_id,
+    )
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_swipe_delay)
+
+
+async def back(device_id: str | None = None, delay: float | None = None) -> None:
+    """Async variant of device.back."""
+    await run_adb(["shell", "input", "keyevent", "4"], device_id)
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_back_delay)
+
+
+async def home(device_id: str | None = None, delay: float | None = None) -> None:
+    """Async variant of device.home."""
+    await run_adb(["shell", "input", "keyevent", "KEYCODE_HOME"], device_id)
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_home_delay)
+
+
+async def launch_app(
+    app_name: str, device_id: str | None = None, delay: float | None = None
+) -> bool:
+    """Async variant of device.launch_app."""
+    if app_name not in APP_PACKAGES:
+        return False
+    await run_adb(
+        [
+            "shell",
+            "monkey",
+            "-p",
+            APP_PACKAGES[app_name],
+            "-c",
+            "android.intent.category.LAUNCHER",
+            "1",
+        ],
+        device_id,
+    )
+    await _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_launch_delay)
+    return True
+
+
+async def type_text(text: str, device_id: str | None = None) -> bool:
+    """Async variant of input.type_text."""
+    if not text:
+        return True
+
+    _, stdout, _ = await run_adb(
+        ["shell", "settings", "get", "secure", "default_input_method"], device_id, timeout=5
+    )
+    if "com.android.adbkeyboard/.AdbIME" not in stdout.decode(errors="ignore"):
+        print("[ADB Input] ADB Keyboard is not enabled, cannot input text")
+        return False
+
+    encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
+    await run_adb(
+        ["shell", "am", "broadcast", "-a", "ADB_INPUT_B64", "--es", "msg", encoded_text],
+        device_id,
+    )
+    return True
+
+
+async def clear_text(device_id: str | None = None) -> None:
+    """Async variant of input.clear_text."""
+    await run_adb(["shell", "input", "keyevent", "KEYCODE_MOVE_END"], device_id)
+    for _ in range(20):
+        await run_adb(["shell", "input", "keyevent"] + ["KEYCODE_DEL"] * 10, device_id)
+
+
+async def press_enter(device_id: str | None = None) -> None:
+    """Async variant of input.press_enter."""
+    await run_adb(["shell", "input", "keyevent", "KEYCODE_ENTER"], device_id)
+
+
+def _get_adb_prefix(device_id: str | None) -> list:
+    """Get ADB command prefix with optional device specifier."""
+    if device_id:
+        return ["adb", "-s", device_id]
+    return ["adb"]
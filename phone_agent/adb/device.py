@@ -2,16 +2,30 @@
 
 import logging
 import os
+import re
 import subprocess
 import time
 from typing import List, Optional, Tuple
 
-from phone_agent.config.apps import APP_PACKAGES
+from phone_agent.adb.settle import wait_for_settle
+from phone_agent.config.apps import APP_PACKAGES, get_app_name
 from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.profiler import SPAN_SETTLE, span
 
 logger = logging.getLogger(__name__)
 
 
+# Only the focus lines of 'dumpsys window' (a few hundred bytes instead of
+# hundreds of KB); the full dump is the fallback for devices without grep
+FOCUS_QUERY = "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'"
+
+# Package of a focus line, e.g. "mCurrentFocus=Window{1f u0 com.tencent.mm/.ui.LauncherUI}"
+# or "mFocusedApp=ActivityRecord{2e u0 com.tencent.mm/.ui.LauncherUI t12}"
+_FOCUS_PACKAGE_RE = re.compile(
+    r"(?:mCurrentFocus|mFocusedApp)=.*?\su\d+\s+([A-Za-z]\w*(?:\.\w+)+)"
+)
+
+
 def get_current_app(device_id: str | None = None) -> str:
     """
     Get the currently focused app name.
@@ -25,18 +39,34 @@ def get_current_app(device_id: str | None = None) -> str:
     adb_prefix = _get_adb_prefix(device_id)
 
     result = subprocess.run(
-        adb_prefix + ["shell", "dumpsys", "window"], capture_output=True, text=True, encoding="utf-8"
+        adb_prefix + ["shell", FOCUS_QUERY], capture_output=True, text=True, encoding="utf-8"
     )
     output = result.stdout
+    if not output or not output.strip():
+        result = subprocess.run(
+            adb_prefix + ["shell", "dumpsys", "window"],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+        )
+        output = result.stdout
+    return parse_current_app(output)
+
+
+def parse_current_app(output: str) -> str:
+    """
+    Map 'dumpsys window' output (full or only the focus lines) to the focused app name.
+
+    Raises:
+        ValueError: If the output is empty.
+    """
     if not output:
         raise ValueError("No output from dumpsys window")
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            for app_name, package in APP_PACKAGES.items():
-                if package in line:
-                    return app_name
+    for package in _FOCUS_PACKAGE_RE.findall(output):
+        app_name = get_app_name(package)
+        if app_name is not None:
+            return app_name
 
     return "System Home"
 
@@ -51,11 +81,9 @@ def tap(
         x: X coordinate.
         y: Y coordinate.
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after tap. If None, uses configured default.
+        delay: Delay in seconds after tap. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_tap_delay
-
     adb_prefix = _get_adb_prefix(device_id)
     
     tap_command = adb_prefix + ["shell", "input", "tap", str(x), str(y)]
@@ -68,7 +96,7 @@ def tap(
     else:
         logger.info(f"Tap executed successfully at ({x}, {y})")
     
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_tap_delay)
 
 
 def double_tap(
@@ -81,11 +109,9 @@ def double_tap(
         x: X coordinate.
         y: Y coordinate.
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after double tap. If None, uses configured default.
+        delay: Delay in seconds after double tap. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_double_tap_delay
-
     adb_prefix = _get_adb_prefix(device_id)
 
     subprocess.run(
@@ -95,7 +121,7 @@ def double_tap(
     subprocess.run(
         adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_double_tap_delay)
 
 
 def long_press(
@@ -113,11 +139,9 @@ def long_press(
         y: Y coordinate.
         duration_ms: Duration of press in milliseconds.
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after long press. If None, uses configured default.
+        delay: Delay in seconds after long press. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_long_press_delay
-
     adb_prefix = _get_adb_prefix(device_id)
 
     subprocess.run(
@@ -125,7 +149,7 @@ def long_press(
         + ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
         capture_output=True,
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_long_press_delay)
 
 
 def swipe(
@@ -147,18 +171,13 @@ def swipe(
         end_y: Ending Y coordinate.
         duration_ms: Duration of swipe in milliseconds (auto-calculated if None).
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after swipe. If None, uses configured default.
+        delay: Delay in seconds after swipe. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_swipe_delay
-
     adb_prefix = _get_adb_prefix(device_id)
 
     if duration_ms is None:
-        # Calculate duration based on distance
-        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-        duration_ms = int(dist_sq / 1000)
-        duration_ms = max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
+        duration_ms = swipe_duration(start_x, start_y, end_x, end_y)
 
     subprocess.run(
         adb_prefix
@@ -174,7 +193,7 @@ def swipe(
         ],
         capture_output=True,
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_swipe_delay)
 
 
 def back(device_id: str | None = None, delay: float | None = None) -> None:
@@ -183,17 +202,15 @@ def back(device_id: str | None = None, delay: float | None = None) -> None:
 
     Args:
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after pressing back. If None, uses configured default.
+        delay: Delay in seconds after pressing back. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_back_delay
-
     adb_prefix = _get_adb_prefix(device_id)
 
     subprocess.run(
         adb_prefix + ["shell", "input", "keyevent", "4"], capture_output=True
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_back_delay)
 
 
 def home(device_id: str | None = None, delay: float | None = None) -> None:
@@ -202,17 +219,15 @@ def home(device_id: str | None = None, delay: float | None = None) -> None:
 
     Args:
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after pressing home. If None, uses configured default.
+        delay: Delay in seconds after pressing home. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_home_delay
-
     adb_prefix = _get_adb_prefix(device_id)
 
     subprocess.run(
         adb_prefix + ["shell", "input", "keyevent", "KEYCODE_HOME"], capture_output=True
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_home_delay)
 
 
 def launch_app(
@@ -224,14 +239,12 @@ def launch_app(
     Args:
         app_name: The app name (must be in APP_PACKAGES).
         device_id: Optional ADB device ID.
-        delay: Delay in seconds after launching. If None, uses configured default.
+        delay: Delay in seconds after launching. If None, waits for the screen to settle
+            (bounded by the configured default when settling is disabled).
 
     Returns:
         True if app was launched, False if app not found.
     """
-    if delay is None:
-        delay = TIMING_CONFIG.device.default_launch_delay
-
     if app_name not in APP_PACKAGES:
         return False
 
@@ -251,10 +264,28 @@ def launch_app(
         ],
         capture_output=True,
     )
-    time.sleep(delay)
+    _wait_after_action(device_id, delay, TIMING_CONFIG.device.default_launch_delay)
     return True
 
 
+def swipe_duration(start_x: int, start_y: int, end_x: int, end_y: int) -> int:
+    """Default swipe duration in milliseconds, based on the swipe distance."""
+    dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+    duration_ms = int(dist_sq / 1000)
+    return max(1000, min(duration_ms, 2000))  # Clamp between 1000-2000ms
+
+
+def _wait_after_action(
+    device_id: str | None, delay: float | None, default_delay: float
+) -> None:
+    """Sleep an explicit delay, or wait for the screen to settle by default."""
+    with span(SPAN_SETTLE, delay=delay if delay is not None else default_delay):
+        if delay is not None:
+            time.sleep(delay)
+        else:
+            wait_for_settle(device_id, default_delay)
+
+
 def _get_adb_prefix(device_id: str | None) -> list:
     """Get ADB command prefix with optional device specifier."""
     if device_id:
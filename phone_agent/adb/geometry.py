@@ -0,0 +1,280 @@
+"""Per-device display geometry cache.
+
+The agent needs the device resolution on every step to map the model's
+relative coordinates to pixels. Resolution, density and rotation rarely
+change, so instead of spawning 'wm size' and 'dumpsys display' per step they
+are queried once (in a single adb shell round trip) and cached per device.
+
+Rotation changes reported by other components (e.g. the scrcpy stream) update
+the cached entry in place. Entries are dropped when a captured frame's
+orientation or aspect ratio no longer matches the cache, and after a TTL as a
+safety net for 'wm size' overrides.
+"""
+
+import os
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, replace
+
+from phone_agent.adb.unlock import parse_wm_size
+
+# Fallback geometry when the device cannot be queried
+DEFAULT_SIZE = (1080, 2400)
+
+# Separator between the outputs of the batched shell commands
+_SECTION = "__GEOMETRY__"
+
+# A size line of 'wm size' output ("Physical size: 1080x2400")
+_WM_SIZE_LINE = re.compile(r"(?:Physical|Override) size:\s*\d+x\d+")
+
+# Frames whose aspect ratio differs by more than this trigger a refresh
+# (screenshots are scaled proportionally, so a real mismatch is much larger)
+_ASPECT_TOLERANCE = 0.03
+
+
+@dataclass
+class DeviceGeometry:
+    """Display geometry of a device."""
+
+    width: int  # Natural (rotation 0) width in pixels
+    height: int  # Natural (rotation 0) height in pixels
+    density: int  # DPI, 0 if unknown
+    rotation: int  # 0=portrait, 1=landscape (90°), 2=reverse portrait, 3=landscape (270°)
+    fetched_at: float  # time.monotonic() of the query
+
+    @property
+    def is_landscape(self) -> bool:
+        return self.rotation in (1, 3)
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """(width, height) in the current orientation, as used for tap coordinates."""
+        short, long = sorted((self.width, self.height))
+        return (long, short) if self.is_landscape else (short, long)
+
+
+def parse_rotation(text: str) -> int:
+    """
+    Parse the display rotation from dumpsys/settings output.
+
+    Understands the numeric fields of 'dumpsys input', 'dumpsys window displays'
+    and 'dumpsys display', symbolic ROTATION_* names and bare settings values.
+
+    Returns:
+        Rotation 0-3, or -1 if none was found.
+    """
+    if not text:
+        return -1
+    patterns = (
+        r"SurfaceOrientation:\s*([0-3])",
+        r"Surface orientation:\s*([0-3])",
+        r"SurfaceOrientation(?:=|\s+)([0-3])",
+        r"mCurrentRotation(?:=|:\s*)([0-3])",
+        r"mRotation(?:=|:\s*)([0-3])",
+        r"mCurrentOrientation(?:=|:\s*)([0-3])",
+        r"orientation(?:=|:\s*|\s+)([0-3])",
+        r"rotation(?:=|:\s*)([0-3])",
+    )
+    for pattern in patterns:
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            return int(m.group(1))
+
+    # Some devices print symbolic rotation names
+    symbolic_patterns = (
+        r"mCurrentRotation(?:=|:\s*)ROTATION_(0|90|180|270)",
+        r"mRotation(?:=|:\s*)ROTATION_(0|90|180|270)",
+        r"rotation(?:=|:\s*)ROTATION_(0|90|180|270)",
+    )
+    for pattern in symbolic_patterns:
+        m = re.search(pattern, text, re.IGNORECASE)
+        if m:
+            return {"0": 0, "90": 1, "180": 2, "270": 3}[m.group(1)]
+
+    m = re.search(r"^\s*([0-3])\s*$", text.strip())
+    if m:
+        return int(m.group(1))
+    return -1
+
+
+def parse_wm_density(output: str) -> int:
+    """Parse 'wm density' output, preferring the override density."""
+    physical = 0
+    for line in output.splitlines():
+        m = re.search(r"(\d+)", line.split(":")[-1])
+        if not m:
+            continue
+        if "Override" in line:
+            return int(m.group(1))
+        if "Physical" in line:
+            physical = int(m.group(1))
+    return physical
+
+
+def parse_geometry(output: str) -> DeviceGeometry | None:
+    """
+    Parse the output of the batched geometry query (see GEOMETRY_SHELL_COMMAND).
+
+    Returns:
+        The geometry, or None if the output has no 'wm size' line (the query
+        failed or the device is offline).
+    """
+    sections = output.split(_SECTION)
+    size_out = sections[0] if sections else ""
+    if not _WM_SIZE_LINE.search(size_out):
+        return None
+    density_out = sections[1] if len(sections) > 1 else ""
+    rotation_out = sections[2] if len(sections) > 2 else ""
+    width, height = parse_wm_size(size_out)
+    rotation = parse_rotation(rotation_out)
+    return DeviceGeometry(
+        width=width,
+        height=height,
+        density=parse_wm_density(density_out),
+        rotation=max(rotation, 0),
+        fetched_at=time.monotonic(),
+    )
+
+
+# One shell round trip for size, density and rotation
+GEOMETRY_SHELL_COMMAND = (
+    f"wm size; echo {_SECTION}; wm density; echo {_SECTION}; "
+    "dumpsys display | grep mCurrentOrientation"
+)
+
+
+class GeometryCache:
+    """
+    Thread-safe cache of device geometry, keyed by device ID.
+
+    Args:
+        ttl: Seconds before a cached entry is re-queried (0 = never expires).
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = float(os.getenv("PHONE_AGENT_GEOMETRY_TTL", ttl))
+        self._lock = threading.Lock()
+        self._entries: dict[str, DeviceGeometry] = {}
+
+    def get(self, device_id: str | None = None) -> DeviceGeometry:
+        """Get the geometry of a device, querying it on a cache miss."""
+        cached = self._lookup(device_id)
+        if cached is not None:
+            return cached
+        try:
+            result = subprocess.run(
+                _get_adb_prefix(device_id) + ["shell", GEOMETRY_SHELL_COMMAND],
+                capture_output=True,
+                text=True,
+                timeout=5,
+            )
+            geometry = parse_geometry(result.stdout) if result.returncode == 0 else None
+            return self._store(device_id, geometry)
+        except Exception as e:
+            print(f"获取屏幕尺寸失败: {e}")
+            return _default_geometry()
+
+    async def aget(self, device_id: str | None = None) -> DeviceGeometry:
+        """Async variant of get(); a cache hit never leaves the event loop."""
+        cached = self._lookup(device_id)
+        if cached is not None:
+            return cached
+        from phone_agent.adb.aio import run_adb
+
+        try:
+            returncode, stdout, _ = await run_adb(
+                ["shell", GEOMETRY_SHELL_COMMAND], device_id, timeout=5
+            )
+            geometry = (
+                parse_geometry(stdout.decode("utf-8", errors="ignore")) if returncode == 0 else None
+            )
+            return self._store(device_id, geometry)
+        except Exception as e:
+            print(f"获取屏幕尺寸失败: {e}")
+            return _default_geometry()
+
+    def invalidate(self, device_id: str | None = None) -> None:
+        """Drop the cached geometry of a device (all devices if None)."""
+        with self._lock:
+            if device_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(device_id or "", None)
+
+    def update_rotation(self, device_id: str | None, rotation: int) -> None:
+        """Record a rotation observed elsewhere (e.g. the scrcpy stream)."""
+        if rotation < 0:
+            return
+        with self._lock:
+            entry = self._entries.get(device_id or "")
+            if entry is not None and entry.rotation != rotation:
+                self._entries[device_id or ""] = replace(entry, rotation=rotation)
+
+    def check_frame(self, device_id: str | None, width: int, height: int) -> bool:
+        """
+        Compare a captured frame with the cached geometry.
+
+        Screenshots are scaled proportionally, so a frame whose orientation or
+        aspect ratio differs from the cached size means the display changed
+        (rotation, resolution override, foldable posture) and the entry is dropped.
+
+        Returns:
+            True if the cached entry was invalidated.
+        """
+        if width <= 0 or height <= 0:
+            return False
+        with self._lock:
+            entry = self._entries.get(device_id or "")
+            if entry is None:
+                return False
+            cached_w, cached_h = entry.size
+            cached_aspect = cached_w / cached_h
+            if abs(width / height - cached_aspect) <= _ASPECT_TOLERANCE * cached_aspect:
+                return False
+            del self._entries[device_id or ""]
+        return True
+
+    def _lookup(self, device_id: str | None) -> DeviceGeometry | None:
+        with self._lock:
+            entry = self._entries.get(device_id or "")
+            if entry is None:
+                return None
+            if self.ttl > 0 and time.monotonic() - entry.fetched_at > self.ttl:
+                del self._entries[device_id or ""]
+                return None
+            return entry
+
+    def _store(self, device_id: str | None, geometry: DeviceGeometry | None) -> DeviceGeometry:
+        # A failed query falls back to the default without caching it, so the
+        # next call queries the device again
+        if geometry is None:
+            print(f"获取屏幕尺寸失败: 无法解析 wm size 输出，使用默认值 {DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]}")
+            return _default_geometry()
+        with self._lock:
+            self._entries[device_id or ""] = geometry
+        return geometry
+
+
+def _default_geometry() -> DeviceGeometry:
+    return DeviceGeometry(*DEFAULT_SIZE, density=0, rotation=0, fetched_at=time.monotonic())
+
+
+def _get_adb_prefix(device_id: str | None) -> list:
+    """Get ADB command prefix with optional device specifier."""
+    if device_id:
+        return ["adb", "-s", device_id]
+    return ["adb"]
+
+
+# Global geometry cache instance
+_geometry_cache: GeometryCache | None = None
+
+
+def get_geometry_cache() -> GeometryCache:
+    """Get the process-wide device geometry cache."""
+    global _geometry_cache
+    if _geometry_cache is None:
+        _geometry_cache = GeometryCache()
+    return _geometry_cache
@@ -1,23 +1,23 @@
 """Screenshot utilities for capturing Android device screen."""
 
-import base64
+import asyncio
 import os
 import subprocess
 import tempfile
 import threading
 import time
 import uuid
-from dataclasses import dataclass
-from io import BytesIO
-from typing import Tuple
-
-from PIL import Image
+from typing import Awaitable, Callable
 
 from phone_agent.config.screenshot import SCREENSHOT_CONFIG
+from phone_agent.imaging import Screenshot, encode_bytes, fallback_screenshot
+from phone_agent.profiler import SPAN_SCREENSHOT_CAPTURE, span
 
-# Global lock to prevent concurrent screenshot operations
-# This avoids conflicts between preview and task execution screenshots
-_screenshot_lock = threading.Lock()
+# Captures are single-flight per device: a caller that arrives while a capture
+# of the same device is running shares its result if the capture started at
+# most this long ago (seconds). Otherwise it waits and takes a new one, so the
+# agent never gets a frame from before its last action.
+SHARE_WINDOW = float(os.getenv("PHONE_AGENT_SCREENSHOT_SHARE_WINDOW", "0.3"))
 
 # Verbose logging flag
 _verbose = False
@@ -29,146 +29,217 @@ def set_screenshot_verbose(verbose: bool) -> None:
     _verbose = verbose
 
 
-def _compress_image(img: Image.Image) -> tuple[str, int, int]:
-    """
-    Compress an image for API transmission.
-    
-    - Resizes if larger than configured max dimension
-    - Converts to JPEG with configured quality
-    - Returns base64 encoded data and dimensions
-    """
-    width, height = img.size
-    original_size = width * height
-    
-    # Resize if too large (use configured max dimension)
-    max_dimension = SCREENSHOT_CONFIG.max_image_dimension
-    if width > max_dimension or height > max_dimension:
-        ratio = min(max_dimension / width, max_dimension / height)
-        new_width = int(width * ratio)
-        new_height = int(height * ratio)
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        width, height = new_width, new_height
-        if _verbose:
-            print(f"[Screenshot] Resized from {original_size} to {width}x{height}")
-    
-    # Convert RGBA to RGB (JPEG doesn't support alpha channel)
-    if img.mode == 'RGBA':
-        # Create white background
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[3])  # Use alpha channel as mask
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Compress as JPEG (use configured quality)
-    buffered = BytesIO()
-    img.save(buffered, format="JPEG", quality=SCREENSHOT_CONFIG.jpeg_quality, optimize=True)
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    
-    if _verbose:
-        compressed_size = len(buffered.getvalue())
-        print(f"[Screenshot] Compressed to JPEG: {compressed_size / 1024:.1f}KB")
-    
-    return base64_data, width, height
-
-
-@dataclass
-class Screenshot:
-    """Represents a captured screenshot."""
-
-    base64_data: str
-    width: int
-    height: int
-    is_sensitive: bool = False
-
-
 def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
     """
     Capture a screenshot from the connected Android device.
 
     Uses 'adb exec-out screencap -p' to output PNG directly to stdout,
-    avoiding temp file conflicts between preview and task execution.
+    avoiding temp file conflicts between preview and task execution. Devices
+    configured for the "raw" capture format transfer the uncompressed frame
+    instead, skipping the PNG encode on the device and the decode on the host.
 
     Args:
         device_id: Optional ADB device ID for multi-device setups.
         timeout: Timeout in seconds for screenshot operations.
 
     Returns:
-        Screenshot object containing base64 data and dimensions.
+        Screenshot object containing the encoded image and dimensions.
 
     Note:
         If the screenshot fails (e.g., on sensitive screens like payment pages),
         a black fallback image is returned with is_sensitive=True.
+
+        Concurrent calls for the same device (e.g. a preview and a task step)
+        share one capture; different devices are captured in parallel.
     """
+    return _single_flight(device_id, lambda: _capture_screenshot(device_id, timeout))
+
+
+class _Flight:
+    """One in-flight capture of a device, shared by the callers that join it."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.result: Screenshot | None = None
+
+
+# In-flight captures by device; at most one capture per device runs at a time
+_flights: dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _join_flight(device_id: str | None) -> tuple[_Flight, bool]:
+    """The device's in-flight capture and whether the caller has to run it."""
+    with _flights_lock:
+        flight = _flights.get(device_id or "")
+        if flight is not None:
+            return flight, False
+        flight = _flights[device_id or ""] = _Flight()
+        return flight, True
+
+
+def _land_flight(device_id: str | None, flight: _Flight) -> None:
+    with _flights_lock:
+        if _flights.get(device_id or "") is flight:
+            del _flights[device_id or ""]
+    flight.done.set()
+
+
+def _single_flight(device_id: str | None, capture: Callable[[], Screenshot]) -> Screenshot:
+    """Run capture() for the device unless a recent capture can be shared."""
+    while True:
+        flight, leader = _join_flight(device_id)
+        if leader:
+            break
+        shared = time.monotonic() - flight.started <= SHARE_WINDOW
+        flight.done.wait()
+        # A capture that raised has no result; take a new one
+        if shared and flight.result is not None:
+            return flight.result
+    try:
+        flight.result = capture()
+        return flight.result
+    finally:
+        _land_flight(device_id, flight)
+
+
+async def _asingle_flight(
+    device_id: str | None, capture: Callable[[], Awaitable[Screenshot]]
+) -> Screenshot:
+    """Async variant of _single_flight; flights are shared with blocking callers."""
+    while True:
+        flight, leader = _join_flight(device_id)
+        if leader:
+            break
+        shared = time.monotonic() - flight.started <= SHARE_WINDOW
+        await asyncio.to_thread(flight.done.wait)
+        if shared and flight.result is not None:
+            return flight.result
+    try:
+        flight.result = await capture()
+        return flight.result
+    finally:
+        _land_flight(device_id, flight)
+
+
+def _capture_screenshot(device_id: str | None, timeout: int) -> Screenshot:
+    """Capture and compress one screenshot (the body of get_screenshot)."""
     adb_prefix = _get_adb_prefix(device_id)
     start_time = time.time()
 
     if _verbose:
         print(f"[Screenshot] Starting capture for device: {device_id or 'default'}")
 
-    # Use lock to prevent concurrent screenshot operations
-    with _screenshot_lock:
-        if _verbose:
-            print(f"[Screenshot] Acquired lock, executing screencap...")
-
-        try:
-            # Method 1: Use exec-out to get PNG directly (no temp file on device)
-            # This avoids file conflicts between concurrent screenshot operations
+    try:
+        if SCREENSHOT_CONFIG.capture_format_for(device_id) == "raw":
+            with span(SPAN_SCREENSHOT_CAPTURE, format="raw"):
+                result = subprocess.run(
+                    adb_prefix + ["exec-out", "screencap"],
+                    capture_output=True,
+                    timeout=timeout,
+                )
+            if result.returncode == 0:
+                screenshot = _screenshot_from_raw(result.stdout, start_time)
+                if screenshot is not None:
+                    return screenshot
+
+        # Method 1: Use exec-out to get PNG directly (no temp file on device)
+        # This avoids file conflicts between concurrent screenshot operations
+        with span(SPAN_SCREENSHOT_CAPTURE):
             result = subprocess.run(
                 adb_prefix + ["exec-out", "screencap", "-p"],
                 capture_output=True,
                 timeout=timeout,
             )
 
-            if result.returncode != 0:
-                stderr = result.stderr.decode('utf-8', errors='ignore')
-                if _verbose:
-                    print(f"[Screenshot] exec-out failed: {stderr}")
-                # Fallback to traditional method
-                return _get_screenshot_traditional(device_id, timeout)
+        if result.returncode != 0:
+            stderr = result.stderr.decode('utf-8', errors='ignore')
+            if _verbose:
+                print(f"[Screenshot] exec-out failed: {stderr}")
+            # Fallback to traditional method
+            return _get_screenshot_traditional(device_id, timeout)
 
-            png_data = result.stdout
+        screenshot = _screenshot_from_png(result.stdout, start_time)
+        if screenshot is None:
+            return _get_screenshot_traditional(device_id, timeout)
+        return screenshot
 
-            # Check if we got valid data
-            if len(png_data) < 1000:
-                if _verbose:
-                    print(f"[Screenshot] Data too small ({len(png_data)} bytes), likely failed")
-                return _create_fallback_screenshot(is_sensitive=True)
+    except subprocess.TimeoutExpired:
+        if _verbose:
+            print(f"[Screenshot] Timeout after {timeout}s")
+        return _create_fallback_screenshot(is_sensitive=False)
 
-            # Check PNG magic bytes
-            if not png_data.startswith(b'\x89PNG'):
-                if _verbose:
-                    print(f"[Screenshot] Invalid PNG header, trying traditional method")
-                return _get_screenshot_traditional(device_id, timeout)
+    except Exception as e:
+        error_str = str(e)
+        # Only log unexpected errors
+        if "cannot identify" not in error_str and "truncated" not in error_str and "broken" not in error_str:
+            print(f"[Screenshot] Error: {e}")
+        elif _verbose:
+            print(f"[Screenshot] Image decode error: {e}")
+        return _create_fallback_screenshot(is_sensitive=False)
 
-            # Parse the image
-            img = Image.open(BytesIO(png_data))
-            orig_width, orig_height = img.size
 
-            # Compress image for API transmission
-            base64_data, width, height = _compress_image(img)
+def _screenshot_from_png(png_data: bytes, start_time: float) -> Screenshot | None:
+    """
+    Build a Screenshot from 'exec-out screencap -p' output.
 
-            elapsed = time.time() - start_time
-            if _verbose:
-                print(f"[Screenshot] Success: {orig_width}x{orig_height} -> {width}x{height}, {elapsed:.2f}s")
+    Returns:
+        The compressed screenshot, a fallback for empty output (secure screens),
+        or None if the output is not a PNG and the traditional method should be
+        tried instead.
+    """
+    # Check if we got valid data
+    if len(png_data) < 1000:
+        if _verbose:
+            print(f"[Screenshot] Data too small ({len(png_data)} bytes), likely failed")
+        return _create_fallback_screenshot(is_sensitive=True)
 
-            return Screenshot(
-                base64_data=base64_data, width=width, height=height, is_sensitive=False
-            )
+    # Check PNG magic bytes
+    if not png_data.startswith(b'\x89PNG'):
+        if _verbose:
+            print(f"[Screenshot] Invalid PNG header, trying traditional method")
+        return None
 
-        except subprocess.TimeoutExpired:
-            if _verbose:
-                print(f"[Screenshot] Timeout after {timeout}s")
-            return _create_fallback_screenshot(is_sensitive=False)
+    # Decode, resize and encode for API transmission
+    encoded = encode_bytes(png_data)
+    if encoded is None:
+        return None
+    width, height = encoded.width, encoded.height
 
-        except Exception as e:
-            error_str = str(e)
-            # Only log unexpected errors
-            if "cannot identify" not in error_str and "truncated" not in error_str and "broken" not in error_str:
-                print(f"[Screenshot] Error: {e}")
-            elif _verbose:
-                print(f"[Screenshot] Image decode error: {e}")
-            return _create_fallback_screenshot(is_sensitive=False)
+    elapsed = time.time() - start_time
+    if _verbose:
+        print(f"[Screenshot] Success: {width}x{height}, {len(encoded.data) / 1024:.1f}KB, {elapsed:.2f}s")
+
+    return Screenshot.from_encoded(encoded)
+
+
+def _screenshot_from_raw(raw_data: bytes, start_time: float) -> Screenshot | None:
+    """
+    Build a Screenshot from 'exec-out screencap' (raw) output.
+
+    Returns:
+        The compressed screenshot, a fallback for empty output (secure screens),
+        or None if the output cannot be read and the PNG capture should be
+        tried instead.
+    """
+    if len(raw_data) < 12:
+        if _verbose:
+            print(f"[Screenshot] Raw data too small ({len(raw_data)} bytes), likely failed")
+        return _create_fallback_screenshot(is_sensitive=True)
+
+    encoded = encode_bytes(raw_data)
+    if encoded is None:
+        if _verbose:
+            print(f"[Screenshot] Unsupported raw frame, trying PNG capture")
+        return None
+    width, height = encoded.width, encoded.height
+
+    elapsed = time.time() - start_time
+    if _verbose:
+        print(f"[Screenshot] Raw success: {width}x{height}, {len(encoded.data) / 1024:.1f}KB, {elapsed:.2f}s")
+
+    return Screenshot.from_encoded(encoded)
 
 
 def _get_screenshot_traditional(device_id: str | None = None, timeout: int = 10) -> Screenshot:
@@ -176,7 +247,6 @@ def _get_screenshot_traditional(device_id: str | None = None, timeout: int = 10)
     Fallback screenshot method using temp file on device.
     Used when exec-out doesn't work properly.
     """
-    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
     adb_prefix = _get_adb_prefix(device_id)
     # Use unique temp file name on device to avoid conflicts
     device_temp = f"/sdcard/tmp_{uuid.uuid4().hex[:8]}.png"
@@ -200,71 +270,78 @@ def _get_screenshot_traditional(device_id: str | None = None, timeout: int = 10)
                 print(f"[Screenshot] Sensitive screen detected")
             return _create_fallback_screenshot(is_sensitive=True)
 
-        # Pull screenshot to local temp path
-        subprocess.run(
-            adb_prefix + ["pull", device_temp, temp_path],
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-
-        # Clean up device temp file
-        subprocess.run(
-            adb_prefix + ["shell", "rm", "-f", device_temp],
-            capture_output=True,
-            timeout=3,
-        )
-
-        if not os.path.exists(temp_path):
+        png_data = _read_device_png(adb_prefix, device_temp)
+        if png_data is None:
             if _verbose:
-                print(f"[Screenshot] Failed to pull file")
+                print(f"[Screenshot] Failed to read {device_temp}")
             return _create_fallback_screenshot(is_sensitive=False)
 
         # Check file size
-        file_size = os.path.getsize(temp_path)
-        if file_size < 1000:
-            os.remove(temp_path)
+        if len(png_data) < 1000:
             if _verbose:
-                print(f"[Screenshot] File too small: {file_size} bytes")
+                print(f"[Screenshot] File too small: {len(png_data)} bytes")
             return _create_fallback_screenshot(is_sensitive=True)
 
-        # Read and encode image
-        img = Image.open(temp_path)
-        orig_width, orig_height = img.size
-
-        # Compress image for API transmission
-        base64_data, width, height = _compress_image(img)
-
-        # Cleanup local temp
-        os.remove(temp_path)
+        # Encode image for API transmission
+        encoded = encode_bytes(png_data)
+        if encoded is None:
+            if _verbose:
+                print(f"[Screenshot] Pulled file is not an image")
+            return _create_fallback_screenshot(is_sensitive=False)
 
         if _verbose:
-            print(f"[Screenshot] Traditional method success: {orig_width}x{orig_height} -> {width}x{height}")
+            print(f"[Screenshot] Traditional method success: {encoded.width}x{encoded.height}")
 
-        return Screenshot(
-            base64_data=base64_data, width=width, height=height, is_sensitive=False
-        )
+        return Screenshot.from_encoded(encoded)
 
     except Exception as e:
         error_str = str(e)
         if "cannot identify" not in error_str and "truncated" not in error_str:
             print(f"[Screenshot] Traditional method error: {e}")
-        # Clean up temp files
-        if os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-        # Try to clean device temp
+        return _create_fallback_screenshot(is_sensitive=False)
+
+    finally:
+        # Clean up device temp file
         try:
             subprocess.run(
                 adb_prefix + ["shell", "rm", "-f", device_temp],
                 capture_output=True,
                 timeout=3,
             )
-        except:
+        except Exception:
             pass
-        return _create_fallback_screenshot(is_sensitive=False)
+
+
+def _read_device_png(adb_prefix: list, device_path: str) -> bytes | None:
+    """
+    Read a PNG file from the device into memory.
+
+    Uses 'exec-out cat' (no local temp file); devices without exec-out fall
+    back to 'adb pull' through a local temp file.
+    """
+    result = subprocess.run(
+        adb_prefix + ["exec-out", "cat", device_path],
+        capture_output=True,
+        timeout=5,
+    )
+    if result.returncode == 0 and result.stdout.startswith(b"\x89PNG"):
+        return result.stdout
+
+    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
+    try:
+        subprocess.run(
+            adb_prefix + ["pull", device_path, temp_path],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        if not os.path.exists(temp_path):
+            return None
+        with open(temp_path, "rb") as f:
+            return f.read()
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
 def _get_adb_prefix(device_id: str | None) -> list:
@@ -275,20 +352,7 @@ def _get_adb_prefix(device_id: str | None) -> list:
 
 
 def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
-    """Create a black fallback image when screenshot fails."""
-    default_width, default_height = 1080, 2400
-
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
+    """Return the black fallback image used when screenshot fails."""
     if _verbose:
-        print(f"[Screenshot] Created fallback image (sensitive={is_sensitive})")
-
-    return Screenshot(
-        base64_data=base64_data,
-        width=default_width,
-        height=default_height,
-        is_sensitive=is_sensitive,
-    )
+        print(f"[Screenshot] Using fallback image (sensitive={is_sensitive})")
+    return fallback_screenshot(is_sensitive)
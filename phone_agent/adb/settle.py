@@ -0,0 +1,223 @@
+"""Screen-change-aware settle detection for Android devices.
+
+After an input event the UI needs some time to finish transitions before the
+next screenshot is useful. Instead of sleeping a fixed delay, the helpers in
+this module poll cheap low-resolution frames and return as soon as the screen
+stops changing (or a maximum wait is reached).
+
+Frames come from a live stream (see phone_agent.frame_source) when one is
+running. Otherwise each poll transfers a full raw 'screencap' frame (~10 MB at
+1080x2400), so the capture time is measured per device and polling is skipped
+on devices where it cannot beat the fixed delay (USB 2, Wi-Fi adb).
+"""
+
+import logging
+import subprocess
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image, ImageChops, ImageStat
+
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.frame_source import get_fresh_frame
+from phone_agent.imaging import raw_frame_to_image
+
+logger = logging.getLogger(__name__)
+
+# Thumbnail size used for frame comparison (portrait, roughly 1/30 of 1080x2400)
+THUMBNAIL_SIZE = (36, 80)
+
+# Streamed frames older than this (seconds) may predate the action; scrcpy
+# repeats the last frame every 100 ms on a static screen
+STREAM_FRAME_MAX_AGE = 0.25
+
+# Measured duration of a raw frame capture, by device (moving average)
+_capture_costs: dict[str, float] = {}
+_capture_costs_lock = threading.Lock()
+
+
+def record_capture_cost(device_id: str | None, seconds: float) -> None:
+    """Record how long a raw frame capture of the device took."""
+    with _capture_costs_lock:
+        previous = _capture_costs.get(device_id or "")
+        _capture_costs[device_id or ""] = (
+            seconds if previous is None else (previous + seconds) / 2
+        )
+
+
+def get_capture_cost(device_id: str | None) -> float | None:
+    """Average raw frame capture time of the device, or None if not measured yet."""
+    with _capture_costs_lock:
+        return _capture_costs.get(device_id or "")
+
+
+def polling_worthwhile(device_id: str | None, fallback_delay: float) -> bool:
+    """
+    Whether polling frames can end the wait before fallback_delay.
+
+    A settled screen needs stable_frames + 1 captures after min_delay; if the
+    device's measured capture time makes that slower than the fixed delay
+    (and no stream provides frames), sleeping the fixed delay is cheaper.
+    """
+    cost = get_capture_cost(device_id)
+    if cost is None or get_fresh_frame(device_id, STREAM_FRAME_MAX_AGE) is not None:
+        return True
+    config = TIMING_CONFIG.settle
+    best_case = (
+        config.min_delay
+        + (config.stable_frames + 1) * cost
+        + config.stable_frames * config.poll_interval
+    )
+    return best_case < fallback_delay
+
+
+def poll_budget_exceeded(device_id: str | None, elapsed: float) -> bool:
+    """Whether the next poll would end after the maximum settle delay."""
+    config = TIMING_CONFIG.settle
+    cost = get_capture_cost(device_id) or 0.0
+    return elapsed + config.poll_interval + cost > config.max_delay
+
+
+def streamed_thumbnail(device_id: str | None) -> Image.Image | None:
+    """A thumbnail of the device's latest streamed frame, or None if none is fresh."""
+    frame = get_fresh_frame(device_id, STREAM_FRAME_MAX_AGE)
+    if frame is None:
+        return None
+    try:
+        img = Image.open(BytesIO(frame.data))
+        # JPEG frames are decoded at a fraction of their size
+        img.draft("L", (THUMBNAIL_SIZE[0] * 4, THUMBNAIL_SIZE[1] * 4))
+        width, height = img.size
+        size = THUMBNAIL_SIZE if height >= width else THUMBNAIL_SIZE[::-1]
+        return img.convert("L").resize(size, Image.Resampling.BILINEAR)
+    except Exception as e:
+        logger.debug(f"Cannot decode streamed frame: {e}")
+        return None
+
+
+def capture_thumbnail(device_id: str | None = None, timeout: float = 5) -> Image.Image | None:
+    """
+    Capture a small grayscale thumbnail of the current screen.
+
+    Uses the latest streamed frame when one is fresh. Otherwise uses raw
+    'screencap' output (no PNG encoding on the device), which is much cheaper
+    than 'screencap -p' for the purpose of change detection; its transfer
+    time is recorded for polling_worthwhile().
+
+    Args:
+        device_id: Optional ADB device ID.
+        timeout: Timeout in seconds for the capture.
+
+    Returns:
+        Grayscale thumbnail, or None if the capture failed (e.g. secure screens).
+    """
+    thumbnail = streamed_thumbnail(device_id)
+    if thumbnail is not None:
+        return thumbnail
+
+    adb_prefix = _get_adb_prefix(device_id)
+    start = time.monotonic()
+    try:
+        result = subprocess.run(
+            adb_prefix + ["exec-out", "screencap"],
+            capture_output=True,
+            timeout=timeout,
+        )
+    except (subprocess.TimeoutExpired, OSError) as e:
+        logger.debug(f"Settle capture failed: {e}")
+        return None
+
+    if result.returncode != 0:
+        return None
+    record_capture_cost(device_id, time.monotonic() - start)
+    return thumbnail_from_raw(result.stdout)
+
+
+def thumbnail_from_raw(data: bytes) -> Image.Image | None:
+    """
+    Decode raw 'screencap' output into a small grayscale thumbnail.
+
+    Returns:
+        The thumbnail, or None if the data is not a valid raw frame.
+    """
+    img = raw_frame_to_image(data)
+    if img is None:
+        return None
+    width, height = img.size
+    size = THUMBNAIL_SIZE if height >= width else THUMBNAIL_SIZE[::-1]
+    return img.convert("L").resize(size, Image.Resampling.BILINEAR)
+
+
+def frame_difference(a: Image.Image, b: Image.Image) -> float:
+    """
+    Compute the mean absolute difference between two thumbnails.
+
+    Returns:
+        A value between 0 (identical) and 1 (completely different). Frames of
+        different sizes (e.g. after a rotation) count as completely different.
+    """
+    if a.size != b.size:
+        return 1.0
+    diff = ImageChops.difference(a, b)
+    return ImageStat.Stat(diff).mean[0] / 255.0
+
+
+def wait_for_settle(device_id: str | None = None, fallback_delay: float = 1.0) -> float:
+    """
+    Wait until the screen stops changing after an action.
+
+    If adaptive settling is disabled, this is a plain sleep of fallback_delay.
+    Otherwise frames are polled until `stable_frames` consecutive comparisons
+    fall within the configured threshold or the maximum delay is reached. When
+    frames cannot be captured, or capturing them is slower than the fixed
+    delay, (the remainder of) fallback_delay is slept instead.
+
+    Args:
+        device_id: Optional ADB device ID.
+        fallback_delay: Fixed delay used when adaptive settling is unavailable.
+
+    Returns:
+        The time actually waited, in seconds.
+    """
+    config = TIMING_CONFIG.settle
+    if not config.enabled or not polling_worthwhile(device_id, fallback_delay):
+        time.sleep(fallback_delay)
+        return fallback_delay
+
+    start = time.monotonic()
+    time.sleep(config.min_delay)
+
+    previous = capture_thumbnail(device_id)
+    stable_count = 0
+    while True:
+        elapsed = time.monotonic() - start
+        if previous is None:
+            # Capture unavailable: fall back to the fixed delay
+            time.sleep(max(0.0, fallback_delay - elapsed))
+            break
+        if poll_budget_exceeded(device_id, elapsed):
+            logger.debug(f"Screen did not settle within {config.max_delay:.1f}s")
+            break
+
+        time.sleep(config.poll_interval)
+        current = capture_thumbnail(device_id)
+        if current is not None:
+            if frame_difference(previous, current) <= config.diff_threshold:
+                stable_count += 1
+                if stable_count >= config.stable_frames:
+                    break
+            else:
+                stable_count = 0
+        previous = current
+
+    waited = time.monotonic() - start
+    logger.debug(f"Screen settled after {waited:.2f}s (fallback {fallback_delay:.1f}s)")
+    return waited
+
+
+def _get_adb_prefix(device_id: str | None) -> list:
+    """Get ADB command prefix with optional device specifier."""
+    if device_id:
+        return ["adb", "-s", device_id]
+    return ["adb"]
@@ -1,17 +1,50 @@
 """Main PhoneAgent class for orchestrating phone automation."""
 
+import asyncio
+import contextvars
 import json
 import logging
+import re
+import time
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Callable
 
 from phone_agent.actions import ActionHandler
-from phone_agent.actions.handler import do, finish, parse_action
+from phone_agent.actions.handler import ActionResult, do, finish, parse_action
 from phone_agent.config import get_messages, get_system_prompt
 from phone_agent.device_factory import get_device_factory
-from phone_agent.model import ModelClient, ModelConfig
-from phone_agent.model.client import MessageBuilder
+from phone_agent.events import AgentEvent, AgentEventType, EventSink, emit_event
+from phone_agent.model import (
+    CancellationToken,
+    ModelClient,
+    ModelConfig,
+    RequestCancelledError,
+)
+from phone_agent.model.client import MessageBuilder, ModelResponse
+from phone_agent.model.context import ContextManager, get_context_budget
+from phone_agent.model.hedging import HedgedModelClient
+from phone_agent.model.router import ModelRouter, RouterConfig
+from phone_agent.profiler import (
+    SPAN_ACTION,
+    SPAN_CURRENT_APP,
+    SPAN_MODEL,
+    SPAN_MODEL_QUEUE,
+    SPAN_MODEL_TTFT,
+    SPAN_SCREEN_SIZE,
+    SPAN_SCREENSHOT,
+    SPAN_STEP,
+    current_timeline,
+    record_span,
+    span,
+)
+from phone_agent.trajectory_cache import (
+    REPLAYABLE_ACTIONS,
+    TrajectoryStep,
+    get_trajectory_cache,
+    screen_hash,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +59,9 @@ class AgentConfig:
     system_prompt: str | None = None
     verbose: bool = True
     debug_mode: bool = False  # Enable tap preview before execution
+    pipelined: bool = False  # Overlap device I/O with model inference and post-action work
+    trajectory_cache: bool = False  # Replay recorded actions of earlier successful runs
+    early_action: bool = False  # Start device actions as soon as the call has streamed in
 
     def __post_init__(self):
         if self.system_prompt is None:
@@ -55,6 +91,9 @@ class PhoneAgent:
         agent_config: Configuration for the agent behavior.
         confirmation_callback: Optional callback for sensitive action confirmation.
         takeover_callback: Optional callback for takeover requests.
+        event_sink: Optional sink for structured progress events (see
+            phone_agent.events). When set, thinking, actions, token usage and
+            completion are reported there instead of being printed.
 
     Example:
         >>> from phone_agent import PhoneAgent
@@ -65,6 +104,9 @@ class PhoneAgent:
         >>> agent.run("Open WeChat and send a message to John")
     """
 
+    # Retries when the model returns an empty action
+    _max_empty_retries = 2
+
     def __init__(
         self,
         model_config: ModelConfig | None = None,
@@ -72,11 +114,49 @@ class PhoneAgent:
         confirmation_callback: Callable[[str], bool] | None = None,
         takeover_callback: Callable[[str], None] | None = None,
         tap_preview_callback: Callable[[int, int, int, int, str], tuple[bool, int, int]] | None = None,
+        event_sink: EventSink | None = None,
+        fast_model_config: ModelConfig | None = None,
+        router_config: RouterConfig | None = None,
+        hedge_model_config: ModelConfig | None = None,
     ):
         self.model_config = model_config or ModelConfig()
         self.agent_config = agent_config or AgentConfig()
-
-        self.model_client = ModelClient(self.model_config)
+        self.event_sink = event_sink
+        # Aborts the in-flight model request on request_stop()
+        self._cancel_token = CancellationToken()
+
+        self.model_client: ModelClient | HedgedModelClient = ModelClient(
+            self.model_config,
+            event_sink=self._forward_model_event if event_sink else None,
+            client_id=self.agent_config.device_id,
+            cancel_token=self._cancel_token,
+        )
+        if hedge_model_config is not None:
+            # Slow requests are also sent to a secondary endpoint; the first
+            # to stream wins (see phone_agent.model.hedging)
+            self.model_client = HedgedModelClient(
+                self.model_client,
+                ModelClient(
+                    hedge_model_config,
+                    event_sink=self._forward_model_event if event_sink else None,
+                    client_id=self.agent_config.device_id,
+                    cancel_token=self._cancel_token,
+                ),
+                cancel_token=self._cancel_token,
+            )
+        # With a fast model, routine steps go to it and the model above is
+        # only asked on escalation (see phone_agent.model.router)
+        self._router: ModelRouter | None = None
+        if fast_model_config is not None:
+            fast_client = ModelClient(
+                fast_model_config,
+                event_sink=self._forward_model_event if event_sink else None,
+                client_id=self.agent_config.device_id,
+                cancel_token=self._cancel_token,
+            )
+            self._router = ModelRouter(
+                self.model_client, fast_client, router_config, validate=_response_error
+            )
         self.action_handler = ActionHandler(
             device_id=self.agent_config.device_id,
             confirmation_callback=confirmation_callback,
@@ -85,21 +165,55 @@ class PhoneAgent:
         )
 
         self._context: list[dict[str, Any]] = []
+        self._context_manager = ContextManager(
+            get_context_budget(self.model_config.model_name, self.model_config.context_budget)
+        )
         self._step_count = 0
         self._stop_requested = False  # Stop flag for graceful termination
         self._action_history: list[str] = []  # Track recent actions for loop detection
         self._max_action_history = 10  # Keep last N actions
         self._loop_detected_count = 0  # Count consecutive loop detections
         self._max_loops_before_terminate = 2  # Terminate after this many loop detections
+        self._io_executor: ThreadPoolExecutor | None = None  # Device I/O workers (pipelined mode)
+        self._prefetched_state: Future | None = None  # Next step's (screenshot, current_app)
+        self._aprefetched_state: asyncio.Task | None = None  # Same, for the async path
+        self._trajectory_task: str | None = None  # Task being recorded/replayed (cache enabled)
+        self._cached_trajectory: list[TrajectoryStep] = []
+        self._recorded_trajectory: list[TrajectoryStep] = []
+        self._pending_trajectory_step: TrajectoryStep | None = None
+        self._trajectory_recordable = True  # False once a step cannot be replayed later
+        self._replaying = False  # Still following the cached trajectory
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+    @property
+    def _step_model(self) -> ModelClient | HedgedModelClient | ModelRouter:
+        """The client that answers agent steps (the router when tiered)."""
+        return self._router or self.model_client
 
     def request_stop(self) -> None:
-        """Request the agent to stop at the next step."""
+        """
+        Request the agent to stop at the next step.
+
+        A model request in flight is aborted right away (its stream is closed),
+        so the inference server stops generating for this task.
+        """
         self._stop_requested = True
+        self._cancel_token.cancel()
 
     def is_stop_requested(self) -> bool:
         """Check if stop has been requested."""
         return self._stop_requested
 
+    def _emit(self, event_type: AgentEventType, **data: Any) -> None:
+        """Send a progress event for the current step to the event sink."""
+        emit_event(self.event_sink, event_type, self._step_count, **data)
+
+    def _forward_model_event(self, event: AgentEvent) -> None:
+        """Stamp model client events with the current step and forward them."""
+        event.step = self._step_count
+        self.event_sink(event)
+
     def run(self, task: str) -> str:
         """
         Run the agent to complete a task.
@@ -111,8 +225,16 @@ class PhoneAgent:
             Final message from the agent.
         """
         self._context = []
+        self._context_manager.reset()
         self._step_count = 0
         self._stop_requested = False  # Reset stop flag
+        self._cancel_token.reset()
+        if self._router is not None:
+            self._router.reset()
+        self._start_trajectory(task)
+        completed = False
+
+        message = "Task stopped by user"
 
         # Set up ADB keyboard once at task start
         self.action_handler.setup_keyboard()
@@ -120,28 +242,36 @@ class PhoneAgent:
         try:
             # Check stop before first step
             if self._stop_requested:
-                return "Task stopped by user"
+                return message
 
             # First step with user prompt
             result = self._execute_step(task, is_first=True)
 
             if result.finished:
-                return result.message or "Task completed"
+                completed = result.success
+                message = result.message or "Task completed"
+                return message
 
             # Continue until finished or max steps reached
             while not result.finished and self._step_count < self.agent_config.max_steps:
                 # Check stop flag before each step
                 if self._stop_requested:
                     print("\n⏹️ Task stopped by user")
-                    return "Task stopped by user"
+                    return message
 
                 result = self._execute_step(is_first=False)
 
             if result.finished:
-                return result.message or "Task completed"
+                completed = result.success
+                message = result.message or "Task completed"
+                return message
 
-            return "Max steps reached"
+            message = "Max steps reached"
+            return message
         finally:
+            self._emit(AgentEventType.FINISHED, success=completed, message=message)
+            self._finish_trajectory(task, completed)
+            self._discard_prefetched_state()
             # Restore original keyboard when task ends
             self.action_handler.restore_keyboard()
 
@@ -170,30 +300,479 @@ class PhoneAgent:
 
         # Restore keyboard when task finishes
         if result.finished:
+            self._discard_prefetched_state()
             self.action_handler.restore_keyboard()
 
         return result
 
+    async def arun(self, task: str) -> str:
+        """
+        Run the agent to complete a task on the running event loop.
+
+        Same behavior as run(), but model streaming and device I/O are awaited
+        instead of blocking a thread, so one event loop can drive many agents
+        (one per device) concurrently.
+
+        Args:
+            task: Natural language description of the task.
+
+        Returns:
+            Final message from the agent.
+        """
+        self._context = []
+        self._context_manager.reset()
+        self._step_count = 0
+        self._stop_requested = False
+        self._cancel_token.reset()
+        if self._router is not None:
+            self._router.reset()
+        await asyncio.to_thread(self._start_trajectory, task)
+        completed = False
+
+        message = "Task stopped by user"
+
+        await asyncio.to_thread(self.action_handler.setup_keyboard)
+
+        try:
+            if self._stop_requested:
+                return message
+
+            result = await self._aexecute_step(task, is_first=True)
+
+            while not result.finished and self._step_count < self.agent_config.max_steps:
+                if self._stop_requested:
+                    print("\n⏹️ Task stopped by user")
+                    return message
+
+                result = await self._aexecute_step(is_first=False)
+
+            if result.finished:
+                completed = result.success
+                message = result.message or "Task completed"
+                return message
+
+            message = "Max steps reached"
+            return message
+        finally:
+            self._emit(AgentEventType.FINISHED, success=completed, message=message)
+            self._discard_prefetched_state()
+            await asyncio.to_thread(self._finish_trajectory, task, completed)
+            await asyncio.to_thread(self.action_handler.restore_keyboard)
+
+    async def astep(self, task: str | None = None) -> StepResult:
+        """
+        Execute a single step of the agent on the running event loop.
+
+        Args:
+            task: Task description (only needed for first step).
+
+        Returns:
+            StepResult with step details.
+        """
+        is_first = len(self._context) == 0
+
+        if is_first and not task:
+            raise ValueError("Task is required for the first step")
+
+        if is_first:
+            await asyncio.to_thread(self.action_handler.setup_keyboard)
+
+        result = await self._aexecute_step(task, is_first)
+
+        if result.finished:
+            self._discard_prefetched_state()
+            await asyncio.to_thread(self.action_handler.restore_keyboard)
+
+        return result
+
     def cleanup(self) -> None:
         """Clean up resources. Call this when task is cancelled or interrupted."""
+        self._discard_prefetched_state()
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=False)
+            self._io_executor = None
         self.action_handler.restore_keyboard()
 
     def reset(self) -> None:
         """Reset the agent state for a new task."""
+        self._discard_prefetched_state()
         self._context = []
+        self._context_manager.reset()
         self._step_count = 0
+        self._trajectory_task = None
+        self._stop_requested = False
+        self._cancel_token.reset()
+        if self._router is not None:
+            self._router.reset()
+
+    def _submit_io(self, fn: Callable, *args) -> Future:
+        """Run a device I/O call on the agent's worker pool (pipelined mode)."""
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=3, thread_name_prefix="phone-agent-io"
+            )
+        # Run in a copy of the caller's context so profiling spans land in
+        # the same timeline
+        return self._io_executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _capture_screen_state(self) -> tuple[Any, str]:
+        """
+        Capture the screenshot and foreground app for the current step.
+
+        In pipelined mode the capture for this step may already have been
+        started at the end of the previous step; otherwise both queries run
+        concurrently instead of back to back.
+        """
+        device_id = self.agent_config.device_id
+        device_factory = get_device_factory()
+
+        if not self.agent_config.pipelined:
+            with span(SPAN_SCREENSHOT):
+                screenshot = device_factory.get_screenshot(device_id)
+            with span(SPAN_CURRENT_APP):
+                current_app = device_factory.get_current_app(device_id)
+            return screenshot, current_app
+
+        prefetched, self._prefetched_state = self._prefetched_state, None
+        if prefetched is not None:
+            return prefetched.result()
+
+        screenshot_future = self._submit_io(
+            _timed(SPAN_SCREENSHOT, device_factory.get_screenshot), device_id
+        )
+        with span(SPAN_CURRENT_APP):
+            current_app = device_factory.get_current_app(device_id)
+        return screenshot_future.result(), current_app
+
+    def _prefetch_screen_state(self) -> None:
+        """Start capturing the next step's screen state in the background."""
+        device_id = self.agent_config.device_id
+        device_factory = get_device_factory()
+
+        screenshot_future = self._submit_io(
+            _timed(SPAN_SCREENSHOT, device_factory.get_screenshot), device_id
+        )
+        app_future = self._submit_io(
+            _timed(SPAN_CURRENT_APP, device_factory.get_current_app), device_id
+        )
+
+        def _join() -> tuple[Any, str]:
+            return screenshot_future.result(), app_future.result()
+
+        self._prefetched_state = self._submit_io(_join)
+
+    def _discard_prefetched_state(self) -> None:
+        """Drop a pending prefetch, e.g. when the task ends before it is used."""
+        prefetched, self._prefetched_state = self._prefetched_state, None
+        if prefetched is not None:
+            prefetched.cancel()
+        aprefetched, self._aprefetched_state = self._aprefetched_state, None
+        if aprefetched is not None:
+            # May be called from another thread (cleanup on cancellation)
+            aprefetched.get_loop().call_soon_threadsafe(aprefetched.cancel)
+
+    async def _acapture_screen_state(self) -> tuple[Any, str]:
+        """Async counterpart of _capture_screen_state."""
+        prefetched, self._aprefetched_state = self._aprefetched_state, None
+        if prefetched is not None:
+            return await prefetched
+        return await self._aread_screen_state()
+
+    async def _aread_screen_state(self) -> tuple[Any, str]:
+        device_id = self.agent_config.device_id
+        device_factory = get_device_factory()
+        screenshot, current_app = await asyncio.gather(
+            _atimed(SPAN_SCREENSHOT, device_factory.aget_screenshot(device_id)),
+            _atimed(SPAN_CURRENT_APP, device_factory.aget_current_app(device_id)),
+        )
+        return screenshot, current_app
+
+    def _start_trajectory(self, task: str) -> None:
+        """Load the cached trajectory for this task and start recording a new one."""
+        self._trajectory_task = None
+        self._cached_trajectory = []
+        self._recorded_trajectory = []
+        self._pending_trajectory_step = None
+        self._trajectory_recordable = True
+        self._replaying = False
+        self._cache_hits = 0
+        self._cache_misses = 0
+
+        if not self.agent_config.trajectory_cache:
+            return
+
+        try:
+            self._cached_trajectory = get_trajectory_cache().load(
+                task, self.agent_config.device_id
+            )
+        except Exception as e:
+            logger.warning(f"Trajectory cache unavailable: {e}")
+            return
+
+        self._trajectory_task = task
+        self._replaying = bool(self._cached_trajectory)
+        if self._replaying:
+            print(f"♻️ 找到已记录的轨迹 ({len(self._cached_trajectory)} 步)，将尝试复用")
+
+    def _replay_cached_step(self, screenshot: Any, current_app: str) -> ModelResponse | None:
+        """
+        Return the recorded response for this step if the screen matches.
+
+        Also remembers the current screen hash so the step can be recorded once
+        its action is known.
+        """
+        if self._trajectory_task is None:
+            return None
+
+        try:
+            current_hash = screen_hash(screenshot.data)
+        except Exception as e:
+            logger.debug(f"Cannot hash screenshot for trajectory cache: {e}")
+            self._trajectory_recordable = False
+            self._replaying = False
+            return None
+
+        self._pending_trajectory_step = TrajectoryStep(
+            screen_hash=current_hash, current_app=current_app, thinking="", action=""
+        )
+        if not self._replaying:
+            return None
+
+        index = self._step_count - 1
+        cached = self._cached_trajectory[index] if index < len(self._cached_trajectory) else None
+        if cached is not None and _action_name(cached.action) not in REPLAYABLE_ACTIONS:
+            # finish() and interactive actions are always decided by the model
+            self._replaying = False
+            return None
+
+        if get_trajectory_cache().match(cached, current_hash, current_app):
+            self._cache_hits += 1
+            print(f"♻️ 轨迹缓存命中: 第 {self._step_count} 步复用已记录动作")
+            return ModelResponse(
+                thinking=cached.thinking, action=cached.action, raw_content=cached.action
+            )
+
+        self._cache_misses += 1
+        self._replaying = False
+        print(f"🔍 轨迹缓存未命中: 第 {self._step_count} 步起由模型决策")
+        return None
+
+    def _finish_trajectory(self, task: str, success: bool) -> None:
+        """Persist the trajectory of a successful run and report cache counters."""
+        if self._trajectory_task is None:
+            return
+        self._trajectory_task = None
+
+        device_id = self.agent_config.device_id
+        try:
+            cache = get_trajectory_cache()
+            if success and self._trajectory_recordable:
+                cache.store(task, device_id, self._recorded_trajectory, hits=self._cache_hits)
+            elif self._cache_hits:
+                # A run that replayed cached steps and then failed: the recording
+                # no longer describes a working path
+                cache.invalidate(task, device_id)
+        except Exception as e:
+            logger.warning(f"Failed to update trajectory cache: {e}")
+
+        print(f"📦 轨迹缓存: 命中 {self._cache_hits} 步，未命中 {self._cache_misses} 步")
+
+    def _begin_step(self) -> None:
+        self._step_count += 1
+        timeline = current_timeline()
+        if timeline is not None:
+            timeline.step = self._step_count
+        self._emit(AgentEventType.STEP_STARTED)
 
     def _execute_step(
         self, user_prompt: str | None = None, is_first: bool = False
     ) -> StepResult:
         """Execute a single step of the agent loop."""
-        self._step_count += 1
+        self._begin_step()
+        with span(SPAN_STEP):
+            return self._run_step(user_prompt, is_first)
+
+    async def _aexecute_step(
+        self, user_prompt: str | None = None, is_first: bool = False
+    ) -> StepResult:
+        """Async counterpart of _execute_step; device and model I/O never block the loop."""
+        self._begin_step()
+        with span(SPAN_STEP):
+            return await self._arun_step(user_prompt, is_first)
+
+    def _check_geometry(self, screenshot: Any) -> None:
+        """Drop the cached device geometry if the frame shows it changed (e.g. rotation)."""
+        if getattr(screenshot, "is_sensitive", False):
+            return
+        from phone_agent.adb.geometry import get_geometry_cache
+
+        if get_geometry_cache().check_frame(
+            self.agent_config.device_id, screenshot.width, screenshot.height
+        ):
+            logger.info(
+                f"Screen geometry changed ({screenshot.width}x{screenshot.height}), refreshing"
+            )
 
+    def _run_step(self, user_prompt: str | None, is_first: bool) -> StepResult:
         # Capture current screen state
+        screenshot, current_app = self._capture_screen_state()
+        self._check_geometry(screenshot)
+
+        # The device resolution does not depend on the model output, so in
+        # pipelined mode it is queried while the model is streaming (it is
+        # usually a cache hit, see phone_agent.adb.geometry)
+        from phone_agent.adb.unlock import get_screen_size
+        screen_size_future = None
+        if self.agent_config.pipelined:
+            screen_size_future = self._submit_io(
+                _timed(SPAN_SCREEN_SIZE, get_screen_size), self.agent_config.device_id
+            )
+
+        def get_device_size() -> tuple[int, int]:
+            # Actual device resolution for coordinate conversion: screenshot.width/height
+            # may be compressed (e.g. 864x1920) but taps need e.g. 1080x2400
+            if screen_size_future is not None:
+                device_width, device_height = screen_size_future.result()
+            else:
+                with span(SPAN_SCREEN_SIZE):
+                    device_width, device_height = get_screen_size(self.agent_config.device_id)
+            logger.info(f"Using device resolution {device_width}x{device_height} for coordinate conversion (screenshot is {screenshot.width}x{screenshot.height})")
+            return device_width, device_height
+
+        # With early actions, a device action starts on a worker thread as soon
+        # as its call has streamed in, while the rest of the stream drains
+        early: dict[str, Any] = {}
+
+        def on_action(action_text: str) -> None:
+            action = self._parse_early_action(action_text, early)
+            if action is not None:
+                early["result"] = self._submit_io(
+                    lambda: self._execute_action(action, *get_device_size())
+                )
+
+        response = self._prepare_request(screenshot, current_app, user_prompt, is_first)
+
+        # Get model response with retry for empty responses
+        attempts = self._max_empty_retries + 1 if response is None else 0
+        for attempt in range(attempts):
+            # An action started by a rejected attempt has run; a retry starts afresh
+            self._drain_early_action(early)
+            if self._stop_requested:
+                return self._stopped_result()
+            try:
+                with span(SPAN_MODEL):
+                    response = self._step_model.request(
+                        self._context, on_action if self.agent_config.early_action else None
+                    )
+            except RequestCancelledError:
+                self._drain_early_action(early)
+                return self._stopped_result()
+            except Exception as e:
+                self._drain_early_action(early)
+                return self._model_error_result(e)
+            if self._accept_response(response, attempt):
+                break
+
+        if not self._early_action_matches(response, early):
+            self._drain_early_action(early)
+        action, stopped = self._prepare_action(response, early.get("action"))
+        if stopped is not None:
+            self._drain_early_action(early)
+            return stopped
+
+        if "result" in early:
+            result = early["result"].result()
+        else:
+            result = self._execute_action(action, *get_device_size())
+
+        # Start capturing the next frame right after the action has settled, so
+        # the bookkeeping and logging below overlap with the device round trip
+        finished = action.get("_metadata") == "finish" or result.should_finish
+        if self.agent_config.pipelined and not finished and not self._stop_requested:
+            self._prefetch_screen_state()
+
+        return self._complete_step(action, response, result, finished)
+
+    async def _arun_step(self, user_prompt: str | None, is_first: bool) -> StepResult:
         device_factory = get_device_factory()
-        screenshot = device_factory.get_screenshot(self.agent_config.device_id)
-        current_app = device_factory.get_current_app(self.agent_config.device_id)
 
+        screenshot, current_app = await self._acapture_screen_state()
+        self._check_geometry(screenshot)
+
+        # Query the device resolution while the model is streaming
+        screen_size_task = asyncio.create_task(
+            _atimed(SPAN_SCREEN_SIZE, device_factory.aget_screen_size(self.agent_config.device_id))
+        )
+        # With early actions, the device action starts as soon as its call has
+        # streamed in, while the rest of the stream drains
+        early: dict[str, Any] = {}
+        try:
+            # Screen hashing and token estimation are CPU work
+            response = await asyncio.to_thread(
+                self._prepare_request, screenshot, current_app, user_prompt, is_first
+            )
+
+            async def execute(action: dict[str, Any]) -> ActionResult:
+                device_width, device_height = await asyncio.shield(screen_size_task)
+                logger.info(f"Using device resolution {device_width}x{device_height} for coordinate conversion (screenshot is {screenshot.width}x{screenshot.height})")
+                return await self._aexecute_action(action, device_width, device_height)
+
+            def on_action(action_text: str) -> None:
+                action = self._parse_early_action(action_text, early)
+                if action is not None:
+                    early["result"] = asyncio.create_task(execute(action))
+
+            attempts = self._max_empty_retries + 1 if response is None else 0
+            for attempt in range(attempts):
+                await self._adrain_early_action(early)
+                if self._stop_requested:
+                    return self._stopped_result()
+                try:
+                    with span(SPAN_MODEL):
+                        response = await self._step_model.arequest(
+                            self._context, on_action if self.agent_config.early_action else None
+                        )
+                except RequestCancelledError:
+                    await self._adrain_early_action(early)
+                    return self._stopped_result()
+                except Exception as e:
+                    await self._adrain_early_action(early)
+                    return self._model_error_result(e)
+                if self._accept_response(response, attempt):
+                    break
+
+            if not self._early_action_matches(response, early):
+                await self._adrain_early_action(early)
+            action, stopped = self._prepare_action(response, early.get("action"))
+            if stopped is not None:
+                await self._adrain_early_action(early)
+                return stopped
+
+            if "result" in early:
+                result = await early["result"]
+            else:
+                result = await execute(action)
+        finally:
+            screen_size_task.cancel()
+            if "result" in early:
+                early["result"].cancel()  # Only pending if the step itself was cancelled
+
+        finished = action.get("_metadata") == "finish" or result.should_finish
+        if self.agent_config.pipelined and not finished and not self._stop_requested:
+            self._aprefetched_state = asyncio.create_task(self._aread_screen_state())
+
+        return self._complete_step(action, response, result, finished)
+
+    def _prepare_request(
+        self, screenshot: Any, current_app: str, user_prompt: str | None, is_first: bool
+    ) -> ModelResponse | None:
+        """
+        Add the current screen to the context and fit it to the token budget.
+
+        Returns:
+            The recorded response when the step is replayed from the trajectory
+            cache, otherwise None (the model has to be asked).
+        """
         # Build messages
         if is_first:
             self._context.append(
@@ -218,63 +797,103 @@ class PhoneAgent:
                 )
             )
 
-        # Get model response with retry for empty responses
-        max_retries = 2  # 最多重试2次
-        response = None
-
-        for attempt in range(max_retries + 1):
-            try:
-                msgs = get_messages(self.agent_config.lang)
-                if attempt > 0:
-                    print(f"\n⚠️ 模型返回空响应，正在重试 ({attempt}/{max_retries})...")
-
-                if self._stop_requested:
-                    return StepResult(
-                        success=False,
-                        finished=True,
-                        action=None,
-                        thinking="",
-                        message="Task stopped by user",
-                    )
-
-                response = self.model_client.request(self._context)
+        # Replay the recorded action if this screen matches a cached trajectory
+        response = self._replay_cached_step(screenshot, current_app)
+
+        # Keep the prompt under the token budget by summarizing old turns
+        self._context = self._context_manager.fit(self._context)
+        return response
+
+    def _accept_response(self, response: ModelResponse, attempt: int) -> bool:
+        """Log token usage and report whether the response is usable (non-empty)."""
+        # Break the model request down into queueing and time to first token
+        if response.total_time is not None:
+            start = time.time() - response.total_time
+            if response.queue_wait:
+                record_span(SPAN_MODEL_QUEUE, start - response.queue_wait, response.queue_wait)
+            if response.time_to_first_token is not None:
+                record_span(SPAN_MODEL_TTFT, start, response.time_to_first_token)
+
+        # Report token usage if available
+        if response.total_tokens > 0:
+            self._emit(
+                AgentEventType.TOKENS,
+                input_tokens=response.input_tokens,
+                cached_tokens=response.cached_tokens,
+                output_tokens=response.output_tokens,
+                total_tokens=response.total_tokens,
+                time_to_first_token=response.time_to_first_token,
+                total_time=response.total_time,
+                queue_wait=response.queue_wait,
+            )
+            if self.event_sink is None:
+                print(f"[TOKENS]{response.input_tokens},{response.output_tokens},{response.total_tokens}[/TOKENS]")
+
+        # 检查响应是否为空
+        if response.action and response.action.strip():
+            return True
+        if attempt < self._max_empty_retries:
+            print(f"⚠️ 模型返回空响应")
+            print(f"\n⚠️ 模型返回空响应，正在重试 ({attempt + 1}/{self._max_empty_retries})...")
+        return False
+
+    def _stopped_result(self) -> StepResult:
+        return StepResult(
+            success=False,
+            finished=True,
+            action=None,
+            thinking="",
+            message="Task stopped by user",
+        )
 
-                # Print token usage if available
-                if response.total_tokens > 0:
-                    print(f"[TOKENS]{response.input_tokens},{response.output_tokens},{response.total_tokens}[/TOKENS]")
+    def _model_error_result(self, error: Exception) -> StepResult:
+        if self.agent_config.verbose:
+            traceback.print_exc()
+        return StepResult(
+            success=False,
+            finished=True,
+            action=None,
+            thinking="",
+            message=f"Model error: {error}",
+        )
 
-                # 检查响应是否为空
-                if response.action and response.action.strip():
-                    break  # 响应非空，退出重试循环
-                elif attempt < max_retries:
-                    print(f"⚠️ 模型返回空响应")
-                    continue  # 继续重试
+    def _prepare_action(
+        self, response: ModelResponse, action: dict[str, Any] | None = None
+    ) -> tuple[dict[str, Any], StepResult | None]:
+        """
+        Parse and log the model's action.
 
-            except Exception as e:
-                if self.agent_config.verbose:
-                    traceback.print_exc()
-                return StepResult(
-                    success=False,
-                    finished=True,
-                    action=None,
-                    thinking="",
-                    message=f"Model error: {e}",
-                )
+        Args:
+            response: The model response.
+            action: The action already parsed and dispatched while the response
+                was streaming (early actions), if any.
 
+        Returns:
+            (action, stopped). stopped is set if a stop was requested while the
+            model was responding; the action must not be executed then.
+        """
         # Parse action from response
         try:
-            action = parse_action(response.action)
+            if action is None:
+                action = parse_action(response.action)
         except ValueError:
+            self._trajectory_recordable = False
             if self.agent_config.verbose:
                 traceback.print_exc()
             # If action is empty, provide meaningful error message
             error_msg = response.action if response.action.strip() else "模型返回了空的动作，可能是推理被截断"
             action = finish(message=error_msg)
 
-        if self.agent_config.verbose:
+        summary = _action_summary(action)
+        self._emit(
+            AgentEventType.ACTION_PARSED,
+            action=action,
+            summary=summary,
+            thinking=response.thinking,
+        )
+
+        if self.agent_config.verbose and self.event_sink is None:
             # Print thinking process (cleaned up for readability)
-            import re
-            
             # Remove XML tags and clean up formatting
             thinking = response.thinking
             # Remove all XML-like tags (including <think>, </think>, <answer>, </answer>, etc.)
@@ -289,22 +908,9 @@ class PhoneAgent:
             
             # Print action (simplified JSON)
             print(f"🎯 执行动作:")
-            # Simplify JSON output
-            simple_action = action.copy()
-            if "_metadata" in simple_action:
-                del simple_action["_metadata"]
-            
-            # Format as single line summary
-            action_type = simple_action.pop("action", "Unknown")
-            params = []
-            for k, v in simple_action.items():
-                params.append(f'{k}={json.dumps(v, ensure_ascii=False)}')
-            
-            summary = f"{action_type}({', '.join(params)})"
-            # Pretty print simplified JSON
             print(json.dumps({
                 "_metadata": action.get("_metadata", ""),
-                "action": action_type,
+                "action": action.get("action", "Unknown"),
                 "summary": summary
             }, ensure_ascii=False, indent=2))
             print("")
@@ -312,7 +918,7 @@ class PhoneAgent:
         # Check for stop request before executing action
         if self._stop_requested:
             print("\n⏹️ Task stopped by user (before execution)")
-            return StepResult(
+            return action, StepResult(
                 success=False,
                 finished=True,
                 action=action,
@@ -322,26 +928,131 @@ class PhoneAgent:
 
         # Remove image from context to save space
         self._context[-1] = MessageBuilder.remove_images_from_message(self._context[-1])
+        return action, None
 
-        # Get actual device screen resolution for coordinate conversion
-        # NOTE: screenshot.width/height may be compressed (e.g. 864x1920) 
-        # but we need real device resolution (e.g. 1080x2400) for accurate tap coordinates
-        from phone_agent.adb.unlock import get_screen_size
-        device_width, device_height = get_screen_size(self.agent_config.device_id)
-        logger.info(f"Using device resolution {device_width}x{device_height} for coordinate conversion (screenshot is {screenshot.width}x{screenshot.height})")
+    def _parse_early_action(
+        self, action_text: str, early: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        """
+        Parse an action call that streamed in before the response ended.
+
+        Returns the action if it may be dispatched right away (at most once per
+        step): only device actions with structured arguments qualify. Free text
+        (Type, Note, ...) could be cut short by an unescaped quote, and finish
+        and interactive actions gain nothing from starting early.
+        """
+        if "action" in early or self._stop_requested:
+            return None
+        try:
+            action = parse_action(action_text)
+        except ValueError:
+            return None
+        if action.get("_metadata") != "do" or action.get("action") not in _EARLY_ACTIONS:
+            return None
+        early["action"] = action
+        return action
+
+    @staticmethod
+    def _early_action_matches(response: ModelResponse | None, early: dict[str, Any]) -> bool:
+        """Whether the final response calls the action dispatched early (if any)."""
+        if "action" not in early:
+            return True
+        try:
+            return response is not None and parse_action(response.action) == early["action"]
+        except ValueError:
+            return False
+
+    def _drain_early_action(self, early: dict[str, Any]) -> None:
+        """
+        Wait for an early action whose result will not be used, and forget it.
+
+        A device action cannot be undone, so a step that ends without it (model
+        error, stop, retry or a different final action) waits until the device
+        is done instead of racing the next capture.
+        """
+        future = early.pop("result", None)
+        action = early.pop("action", None)
+        if future is None:
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            result = ActionResult(success=False, should_finish=False, message=str(e))
+        self._log_discarded_early_action(action, result)
+
+    async def _adrain_early_action(self, early: dict[str, Any]) -> None:
+        """Async counterpart of _drain_early_action."""
+        task = early.pop("result", None)
+        action = early.pop("action", None)
+        if task is None:
+            return
+        try:
+            result = await task
+        except Exception as e:
+            result = ActionResult(success=False, should_finish=False, message=str(e))
+        self._log_discarded_early_action(action, result)
+
+    def _log_discarded_early_action(self, action: dict[str, Any], result: ActionResult) -> None:
+        self._trajectory_recordable = False
+        logger.warning(
+            f"Early action {_action_summary(action)} was executed but not used "
+            f"(success={result.success}, message={result.message})"
+        )
 
-        # Execute action
+    def _execute_action(
+        self, action: dict[str, Any], device_width: int, device_height: int
+    ) -> ActionResult:
+        """Execute an action; an exception finishes the task with its message."""
         try:
-            result = self.action_handler.execute(
-                action, device_width, device_height
+            with span(SPAN_ACTION, action=action.get("action") or action.get("_metadata")):
+                return self.action_handler.execute(action, device_width, device_height)
+        except Exception as e:
+            if self.agent_config.verbose:
+                traceback.print_exc()
+            return self.action_handler.execute(
+                finish(message=str(e)), device_width, device_height
             )
+
+    async def _aexecute_action(
+        self, action: dict[str, Any], device_width: int, device_height: int
+    ) -> ActionResult:
+        """Async counterpart of _execute_action."""
+        try:
+            with span(SPAN_ACTION, action=action.get("action") or action.get("_metadata")):
+                return await self.action_handler.aexecute(action, device_width, device_height)
         except Exception as e:
             if self.agent_config.verbose:
                 traceback.print_exc()
-            result = self.action_handler.execute(
+            return self.action_handler.execute(
                 finish(message=str(e)), device_width, device_height
             )
 
+    def _complete_step(
+        self,
+        action: dict[str, Any],
+        response: ModelResponse,
+        result: ActionResult,
+        finished: bool,
+    ) -> StepResult:
+        """Record the executed action in the trajectory and context, and detect loops."""
+        self._emit(
+            AgentEventType.ACTION_EXECUTED,
+            action=action,
+            success=result.success,
+            should_finish=result.should_finish,
+            message=result.message,
+        )
+
+        # Record the step for the trajectory cache; failed steps are not worth replaying
+        if self._pending_trajectory_step is not None:
+            if result.success:
+                self._pending_trajectory_step.thinking = response.thinking
+                self._pending_trajectory_step.action = response.action
+                self._recorded_trajectory.append(self._pending_trajectory_step)
+            else:
+                self._trajectory_recordable = False
+            self._pending_trajectory_step = None
+
         # Add assistant response to context
         self._context.append(
             MessageBuilder.create_assistant_message(
@@ -414,6 +1125,8 @@ class PhoneAgent:
                 )
                 if self.agent_config.verbose:
                     print(f"🔄 {loop_msg}\n")
+            if self._router is not None:
+                self._router.escalate(f"检测到动作循环 {pattern_str}")
             # Clear history to allow fresh start
             self._action_history.clear()
         else:
@@ -421,10 +1134,7 @@ class PhoneAgent:
             if len(self._action_history) >= 4:
                 self._loop_detected_count = 0
 
-        # Check if finished
-        finished = action.get("_metadata") == "finish" or result.should_finish
-
-        if finished and self.agent_config.verbose:
+        if finished and self.agent_config.verbose and self.event_sink is None:
             msgs = get_messages(self.agent_config.lang)
             print(f"🎉 ✅ {msgs['task_completed']}: {result.message or action.get('message', msgs['done'])}\n")
 
@@ -516,16 +1226,17 @@ class PhoneAgent:
         if len(self._context) <= 2:
             return "任务已执行，但缺少详细执行记录。"
         
-        # Extract execution steps from conversation context
-        steps = []
-        step_num = 1
+        # Extract execution steps from conversation context, starting with the
+        # steps already folded into the history summary
+        steps = [
+            line for line in self._context_manager.folded_steps if line.startswith("步骤")
+        ]
+        step_num = self._context_manager.folded_step_count + 1
         
         for msg in self._context[1:]:  # Skip system message
             if msg.get('role') == 'assistant':
                 content = msg.get('content', '')
                 # Extract thinking and action from XML tags
-                import re
-                
                 # Try to extract thinking
                 think_match = re.search(r'<think>(.*?)</think>', content, re.DOTALL)
                 thinking = think_match.group(1).strip() if think_match else ""
@@ -589,7 +1300,6 @@ class PhoneAgent:
                 summary_text = response.thinking
             
             # Clean up XML tags if present
-            import re
             summary_text = re.sub(r'<[^>]+>', '', summary_text).strip()
             
             # Validate summary is not empty and reasonable length
@@ -619,3 +1329,46 @@ class PhoneAgent:
         return self._step_count
 
 
+# Actions that may start before the model response has finished streaming
+_EARLY_ACTIONS = frozenset(
+    {"Tap", "Double Tap", "Long Press", "Swipe", "Back", "Home", "Launch", "Wait"}
+)
+
+
+def _timed(name: str, fn: Callable) -> Callable:
+    """Wrap a blocking call so it records a profiling span."""
+    def run(*args):
+        with span(name):
+            return fn(*args)
+    return run
+
+
+async def _atimed(name: str, awaitable):
+    """Await a coroutine inside a profiling span."""
+    with span(name):
+        return await awaitable
+
+
+def _response_error(response: ModelResponse) -> str | None:
+    """Why a (fast-tier) response cannot be used as-is, for model routing."""
+    if not response.action or not response.action.strip():
+        return "空动作"
+    try:
+        parse_action(response.action)
+    except ValueError:
+        return "动作无法解析"
+    return None
+
+
+def _action_summary(action: dict[str, Any]) -> str:
+    """Format a parsed action as a one-line call, e.g. Tap(element=[500, 300])."""
+    params = {k: v for k, v in action.items() if k not in ("_metadata", "action")}
+    args = ", ".join(f"{k}={json.dumps(v, ensure_ascii=False)}" for k, v in params.items())
+    name = action.get("action") or action.get("_metadata") or "Unknown"
+    return f"{name}({args})"
+
+
+def _action_name(action: str) -> str | None:
+    """Extract the action name from a raw do(...) string without parsing it."""
+    match = re.search(r'action\s*=\s*"([^"]+)"', action)
+    return match.group(1) if match else None
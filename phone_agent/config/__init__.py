@@ -10,6 +10,7 @@ from phone_agent.config.timing import (
     ActionTimingConfig,
     ConnectionTimingConfig,
     DeviceTimingConfig,
+    SettleTimingConfig,
     TimingConfig,
     get_timing_config,
     update_timing_config,
@@ -76,6 +77,7 @@ __all__ = [
     "ActionTimingConfig",
     "DeviceTimingConfig",
     "ConnectionTimingConfig",
+    "SettleTimingConfig",
     "get_timing_config",
     "update_timing_config",
     "SCREENSHOT_CONFIG",
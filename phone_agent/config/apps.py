@@ -205,16 +205,45 @@ def get_app_name(package_name: str) -> str | None:
     """
     Get the app name from a package name.
 
+    Uses a reverse package -> name index. When several names map to the same
+    package, the first one in APP_PACKAGES wins.
+
     Args:
         package_name: The Android package name.
 
     Returns:
         The display name of the app, or None if not found.
     """
-    for name, package in APP_PACKAGES.items():
-        if package == package_name:
-            return name
-    return None
+    return _get_package_index().get(package_name)
+
+
+def register_apps(apps: dict[str, str]) -> None:
+    """
+    Add or update app name -> package mappings at runtime.
+
+    Args:
+        apps: Mapping of display names to Android package names.
+    """
+    global _package_index
+    APP_PACKAGES.update(apps)
+    _package_index = None
+
+
+# Reverse package -> app name index, rebuilt lazily after APP_PACKAGES changes
+_package_index: dict[str, str] | None = None
+_indexed_size = 0
+
+
+def _get_package_index() -> dict[str, str]:
+    global _package_index, _indexed_size
+    index = _package_index
+    # The size check catches entries added to APP_PACKAGES directly
+    if index is None or _indexed_size != len(APP_PACKAGES):
+        index = {}
+        for name, package in list(APP_PACKAGES.items()):
+            index.setdefault(package, name)
+        _package_index, _indexed_size = index, len(APP_PACKAGES)
+    return index
 
 
 def list_supported_apps() -> list[str]:
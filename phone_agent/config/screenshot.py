@@ -5,7 +5,11 @@ Users can customize these values by modifying this file or by setting environmen
 """
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+CAPTURE_FORMATS = ("png", "raw")
+IMAGE_FORMATS = ("jpeg", "webp")
+RESAMPLE_FILTERS = ("nearest", "box", "bilinear", "hamming", "bicubic", "lanczos")
 
 
 @dataclass
@@ -15,6 +19,17 @@ class ScreenshotConfig:
     # Image compression settings
     max_image_dimension: int = 1920  # Max width or height before resizing
     jpeg_quality: int = 70  # JPEG quality (0-100, higher = better quality, larger size)
+    image_format: str = "jpeg"  # Encoder sent to the model: "jpeg" or "webp"
+    resample: str = "lanczos"  # Resize filter (see RESAMPLE_FILTERS)
+    jpeg_optimize: bool = False  # Optimized Huffman tables: ~20% smaller JPEG, slower encode
+    # Worker processes for decoding/encoding (0 = encode in the calling thread)
+    encode_workers: int = 0
+
+    # Capture format: "png" (screencap -p, encoded on the device) or "raw"
+    # (uncompressed RGBA, no PNG encode/decode; faster on slow phones over USB)
+    capture_format: str = "png"
+    # Per-device overrides of capture_format, by device ID
+    device_capture_formats: dict[str, str] = field(default_factory=dict)
 
     def __post_init__(self):
         """Load values from config file, then environment variables if present."""
@@ -32,6 +47,14 @@ class ScreenshotConfig:
                     file_config = json.load(f)
                     self.max_image_dimension = file_config.get("max_image_dimension", self.max_image_dimension)
                     self.jpeg_quality = file_config.get("jpeg_quality", self.jpeg_quality)
+                    self.image_format = file_config.get("image_format", self.image_format)
+                    self.resample = file_config.get("resample", self.resample)
+                    self.jpeg_optimize = file_config.get("jpeg_optimize", self.jpeg_optimize)
+                    self.encode_workers = file_config.get("encode_workers", self.encode_workers)
+                    self.capture_format = file_config.get("capture_format", self.capture_format)
+                    self.device_capture_formats = file_config.get(
+                        "device_capture_formats", self.device_capture_formats
+                    )
             except Exception:
                 pass  # Fall back to defaults if file can't be loaded
         
@@ -42,12 +65,33 @@ class ScreenshotConfig:
         self.jpeg_quality = int(
             os.getenv("PHONE_AGENT_JPEG_QUALITY", self.jpeg_quality)
         )
+        self.image_format = os.getenv("PHONE_AGENT_IMAGE_FORMAT", self.image_format)
+        self.resample = os.getenv("PHONE_AGENT_IMAGE_RESAMPLE", self.resample)
+        if os.getenv("PHONE_AGENT_JPEG_OPTIMIZE"):
+            self.jpeg_optimize = os.getenv("PHONE_AGENT_JPEG_OPTIMIZE").lower() in ("1", "true", "yes")
+        self.encode_workers = int(
+            os.getenv("PHONE_AGENT_IMAGE_ENCODE_WORKERS", self.encode_workers)
+        )
+        self.capture_format = os.getenv("PHONE_AGENT_SCREENSHOT_FORMAT", self.capture_format)
         
         # Validate values
         if self.max_image_dimension < 480:
             raise ValueError("max_image_dimension must be at least 480")
         if not 1 <= self.jpeg_quality <= 100:
             raise ValueError("jpeg_quality must be between 1 and 100")
+        if self.image_format not in IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {', '.join(IMAGE_FORMATS)}")
+        if self.resample not in RESAMPLE_FILTERS:
+            raise ValueError(f"resample must be one of {', '.join(RESAMPLE_FILTERS)}")
+        if self.encode_workers < 0:
+            raise ValueError("encode_workers must not be negative")
+        for capture_format in [self.capture_format, *self.device_capture_formats.values()]:
+            if capture_format not in CAPTURE_FORMATS:
+                raise ValueError(f"capture_format must be one of {', '.join(CAPTURE_FORMATS)}")
+
+    def capture_format_for(self, device_id: str | None) -> str:
+        """Capture format of a device (its override, else the global format)."""
+        return self.device_capture_formats.get(device_id or "", self.capture_format)
 
 
 # Global screenshot configuration instance
@@ -96,6 +96,44 @@ class ConnectionTimingConfig:
         )
 
 
+@dataclass
+class SettleTimingConfig:
+    """Configuration for adaptive (screen-change-aware) post-action settling.
+
+    When enabled, the fixed post-action delays above become an upper bound for
+    the fallback path only: the device is polled for low-resolution frames and
+    the wait ends as soon as consecutive frames stop changing.
+    """
+
+    enabled: bool = False  # Use adaptive settling instead of fixed sleeps
+    min_delay: float = 0.2  # Always wait at least this long before polling
+    max_delay: float = 2.0  # Give up waiting for a stable screen after this long
+    poll_interval: float = 0.1  # Pause between two frame captures
+    stable_frames: int = 1  # Consecutive unchanged frame pairs required
+    diff_threshold: float = 0.01  # Mean grayscale difference (0-1) considered unchanged
+
+    def __post_init__(self):
+        """Load values from environment variables if present."""
+        self.enabled = os.getenv(
+            "PHONE_AGENT_ADAPTIVE_SETTLE", "1" if self.enabled else "0"
+        ) == "1"
+        self.min_delay = float(
+            os.getenv("PHONE_AGENT_SETTLE_MIN_DELAY", self.min_delay)
+        )
+        self.max_delay = float(
+            os.getenv("PHONE_AGENT_SETTLE_MAX_DELAY", self.max_delay)
+        )
+        self.poll_interval = float(
+            os.getenv("PHONE_AGENT_SETTLE_POLL_INTERVAL", self.poll_interval)
+        )
+        self.stable_frames = int(
+            os.getenv("PHONE_AGENT_SETTLE_STABLE_FRAMES", self.stable_frames)
+        )
+        self.diff_threshold = float(
+            os.getenv("PHONE_AGENT_SETTLE_DIFF_THRESHOLD", self.diff_threshold)
+        )
+
+
 @dataclass
 class TimingConfig:
     """Master timing configuration combining all timing settings."""
@@ -103,12 +141,14 @@ class TimingConfig:
     action: ActionTimingConfig
     device: DeviceTimingConfig
     connection: ConnectionTimingConfig
+    settle: SettleTimingConfig
 
     def __init__(self):
         """Initialize all timing configurations."""
         self.action = ActionTimingConfig()
         self.device = DeviceTimingConfig()
         self.connection = ConnectionTimingConfig()
+        self.settle = SettleTimingConfig()
 
 
 # Global timing configuration instance
@@ -130,6 +170,7 @@ def update_timing_config(
     action: ActionTimingConfig | None = None,
     device: DeviceTimingConfig | None = None,
     connection: ConnectionTimingConfig | None = None,
+    settle: SettleTimingConfig | None = None,
 ) -> None:
     """
     Update the global timing configuration.
@@ -138,6 +179,7 @@ def update_timing_config(
         action: New action timing configuration.
         device: New device timing configuration.
         connection: New connection timing configuration.
+        settle: New adaptive settle configuration.
 
     Example:
         >>> from phone_agent.config.timing import update_timing_config, ActionTimingConfig
@@ -154,12 +196,15 @@ def update_timing_config(
         TIMING_CONFIG.device = device
     if connection is not None:
         TIMING_CONFIG.connection = connection
+    if settle is not None:
+        TIMING_CONFIG.settle = settle
 
 
 __all__ = [
     "ActionTimingConfig",
     "DeviceTimingConfig",
     "ConnectionTimingConfig",
+    "SettleTimingConfig",
     "TimingConfig",
     "TIMING_CONFIG",
     "get_timing_config",
@@ -1,8 +1,13 @@
 """Device factory for selecting ADB or HDC based on device type."""
 
+import asyncio
+import time
 from enum import Enum
 from typing import Any
 
+from phone_agent.frame_source import get_frame_sources, get_streamed_screenshot
+from phone_agent.profiler import SPAN_SETTLE, span
+
 
 class DeviceType(Enum):
     """Type of device connection tool."""
@@ -46,7 +51,10 @@ class DeviceFactory:
         return self._module
 
     def get_screenshot(self, device_id: str | None = None, timeout: int = 10):
-        """Get screenshot from device."""
+        """Get screenshot from device (a fresh streamed frame if one is available)."""
+        screenshot = get_streamed_screenshot(device_id)
+        if screenshot is not None:
+            return screenshot
         return self.module.get_screenshot(device_id, timeout)
 
     def get_current_app(self, device_id: str | None = None) -> str:
@@ -125,6 +133,118 @@ class DeviceFactory:
         """Press Enter key."""
         return self.module.press_enter(device_id)
 
+    def wait_for_settle(self, device_id: str | None = None, fallback_delay: float = 1.0):
+        """Wait for the screen to settle, or sleep if the backend cannot detect it."""
+        with span(SPAN_SETTLE, delay=fallback_delay):
+            if hasattr(self.module, "wait_for_settle"):
+                return self.module.wait_for_settle(device_id, fallback_delay)
+            time.sleep(fallback_delay)
+            return fallback_delay
+
+    # Async variants. Backends that provide an `aio` module (ADB) run natively
+    # on the event loop; others fall back to the blocking call in a thread.
+
+    async def _acall(self, name: str, *args):
+        aio = getattr(self.module, "aio", None)
+        if aio is not None and hasattr(aio, name):
+            return await getattr(aio, name)(*args)
+        return await asyncio.to_thread(getattr(self, name), *args)
+
+    async def aget_screenshot(self, device_id: str | None = None, timeout: int = 10):
+        """Get screenshot from device (async)."""
+        if get_frame_sources():
+            screenshot = await asyncio.to_thread(get_streamed_screenshot, device_id)
+            if screenshot is not None:
+                return screenshot
+        return await self._acall("get_screenshot", device_id, timeout)
+
+    async def aget_current_app(self, device_id: str | None = None) -> str:
+        """Get current app name (async)."""
+        return await self._acall("get_current_app", device_id)
+
+    async def aget_screen_size(self, device_id: str | None = None) -> tuple[int, int]:
+        """Get screen size (async)."""
+        aio = getattr(self.module, "aio", None)
+        if aio is not None:
+            return await aio.get_screen_size(device_id)
+        from phone_agent.adb.unlock import get_screen_size
+
+        return await asyncio.to_thread(get_screen_size, device_id)
+
+    async def atap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Tap at coordinates (async)."""
+        return await self._acall("tap", x, y, device_id, delay)
+
+    async def adouble_tap(
+        self, x: int, y: int, device_id: str | None = None, delay: float | None = None
+    ):
+        """Double tap at coordinates (async)."""
+        return await self._acall("double_tap", x, y, device_id, delay)
+
+    async def along_press(
+        self,
+        x: int,
+        y: int,
+        duration_ms: int = 3000,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Long press at coordinates (async)."""
+        return await self._acall("long_press", x, y, duration_ms, device_id, delay)
+
+    async def aswipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration_ms: int | None = None,
+        device_id: str | None = None,
+        delay: float | None = None,
+    ):
+        """Swipe from start to end (async)."""
+        return await self._acall(
+            "swipe", start_x, start_y, end_x, end_y, duration_ms, device_id, delay
+        )
+
+    async def aback(self, device_id: str | None = None, delay: float | None = None):
+        """Press back button (async)."""
+        return await self._acall("back", device_id, delay)
+
+    async def ahome(self, device_id: str | None = None, delay: float | None = None):
+        """Press home button (async)."""
+        return await self._acall("home", device_id, delay)
+
+    async def alaunch_app(
+        self, app_name: str, device_id: str | None = None, delay: float | None = None
+    ) -> bool:
+        """Launch an app (async)."""
+        return await self._acall("launch_app", app_name, device_id, delay)
+
+    async def atype_text(self, text: str, device_id: str | None = None):
+        """Type text (async)."""
+        return await self._acall("type_text", text, device_id)
+
+    async def aclear_text(self, device_id: str | None = None):
+        """Clear text (async)."""
+        return await self._acall("clear_text", device_id)
+
+    async def apress_enter(self, device_id: str | None = None):
+        """Press Enter key (async)."""
+        return await self._acall("press_enter", device_id)
+
+    async def await_for_settle(
+        self, device_id: str | None = None, fallback_delay: float = 1.0
+    ):
+        """Wait for the screen to settle (async)."""
+        aio = getattr(self.module, "aio", None)
+        if aio is None:
+            return await asyncio.to_thread(self.wait_for_settle, device_id, fallback_delay)
+        with span(SPAN_SETTLE, delay=fallback_delay):
+            return await aio.wait_for_settle(device_id, fallback_delay)
+
     def list_devices(self):
         """List connected devices."""
         return self.module.list_devices()
@@ -0,0 +1,59 @@
+"""Structured progress events emitted by PhoneAgent and ModelClient.
+
+Consumers (e.g. the web app) pass an event sink to the agent and receive typed
+events instead of scraping printed output. Sinks are called synchronously from
+whatever thread or task runs the agent, so they should be cheap and hand the
+event off (e.g. with loop.call_soon_threadsafe) rather than do work inline.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class AgentEventType(str, Enum):
+    """Type of an agent event."""
+
+    STEP_STARTED = "step_started"  # data: {}
+    THINKING_DELTA = "thinking_delta"  # data: text
+    ACTION_PARSED = "action_parsed"  # data: action, summary, thinking
+    ACTION_EXECUTED = "action_executed"  # data: action, success, should_finish, message
+    TOKENS = "tokens"  # data: input_tokens, cached_tokens, output_tokens, total_tokens, time_to_first_token, total_time, queue_wait
+    FINISHED = "finished"  # data: success, message
+
+
+@dataclass
+class AgentEvent:
+    """A single agent progress event."""
+
+    type: AgentEventType
+    data: dict[str, Any] = field(default_factory=dict)
+    step: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "type": self.type.value,
+            "step": self.step,
+            "timestamp": self.timestamp,
+            **self.data,
+        }
+
+
+EventSink = Callable[[AgentEvent], None]
+
+
+def emit_event(
+    sink: EventSink | None, event_type: AgentEventType, step: int = 0, **data: Any
+) -> None:
+    """Deliver an event to a sink; a failing sink never breaks the agent."""
+    if sink is None:
+        return
+    try:
+        sink(AgentEvent(type=event_type, data=data, step=step))
+    except Exception as e:
+        logger.warning(f"Agent event sink failed on {event_type.value}: {e}")
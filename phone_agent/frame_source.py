@@ -0,0 +1,156 @@
+"""Screenshots served from live screen streams instead of screencap.
+
+`adb exec-out screencap -p` takes 0.5-2 s per call and encodes a
+full-resolution PNG on the device. When the device is already streaming
+(e.g. a scrcpy mirroring session in the web UI), its latest decoded frame is
+only tens of milliseconds old, so DeviceFactory.get_screenshot asks the
+registered frame sources first and falls back to screencap when none of them
+has a fresh frame.
+
+Sources register themselves (the web app registers its scrcpy service):
+
+    >>> register_frame_source(my_source)
+    >>> get_device_factory().get_screenshot(device_id)  # Served from my_source if fresh
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Iterator
+
+from PIL import Image
+
+from phone_agent.config.screenshot import SCREENSHOT_CONFIG
+from phone_agent.imaging import MIME_TYPES, Screenshot, encode_bytes
+
+logger = logging.getLogger(__name__)
+
+# Frames older than this (seconds) are not used; scrcpy repeats the last frame
+# every 100 ms on a static screen, so an older frame means a stalled stream
+FRAME_MAX_AGE = float(os.getenv("PHONE_AGENT_FRAME_MAX_AGE", "0.5"))
+
+
+@dataclass
+class Frame:
+    """An encoded (JPEG or PNG) frame of a device screen."""
+
+    data: bytes
+    timestamp: float  # time.monotonic() when the frame was decoded
+
+
+class FrameSource:
+    """
+    A provider of recent device frames.
+
+    Subclasses implement get_frame(); the hooks for keeping a stream alive
+    during a task run are optional.
+    """
+
+    name = "frame_source"
+
+    def get_frame(self, device_id: str | None) -> Frame | None:
+        """The latest frame of the device, or None if it is not streaming."""
+        raise NotImplementedError
+
+    async def acquire(self, device_id: str) -> bool:
+        """Start a stream for the device if none is running; returns whether one was started."""
+        return False
+
+    async def release(self, device_id: str) -> None:
+        """Stop a stream started by acquire() unless someone else is using it."""
+
+
+_sources: list[FrameSource] = []
+_sources_lock = threading.Lock()
+
+
+def register_frame_source(source: FrameSource) -> None:
+    """Serve screenshots from the source when it has a fresh frame."""
+    with _sources_lock:
+        if source not in _sources:
+            _sources.append(source)
+
+
+def unregister_frame_source(source: FrameSource) -> None:
+    with _sources_lock:
+        if source in _sources:
+            _sources.remove(source)
+
+
+def get_frame_sources() -> list[FrameSource]:
+    with _sources_lock:
+        return list(_sources)
+
+
+def iter_fresh_frames(
+    device_id: str | None, max_age: float = FRAME_MAX_AGE
+) -> Iterator[tuple[FrameSource, Frame, float]]:
+    """The (source, frame, age) of every source with a frame at most max_age seconds old."""
+    for source in get_frame_sources():
+        try:
+            frame = source.get_frame(device_id)
+        except Exception as e:
+            logger.debug(f"Frame source {source.name} failed: {e}")
+            continue
+        if frame is None or not frame.data:
+            continue
+        age = time.monotonic() - frame.timestamp
+        if age > max_age:
+            logger.debug(f"{source.name} frame of {device_id} is {age:.2f}s old, not used")
+            continue
+        yield source, frame, age
+
+
+def get_fresh_frame(device_id: str | None, max_age: float = FRAME_MAX_AGE) -> Frame | None:
+    """The first frame of the device at most max_age seconds old, or None."""
+    for _, frame, _ in iter_fresh_frames(device_id, max_age):
+        return frame
+    return None
+
+
+def get_streamed_screenshot(
+    device_id: str | None, max_age: float = FRAME_MAX_AGE
+) -> Screenshot | None:
+    """
+    A screenshot from the first source with a frame at most max_age seconds old.
+
+    Returns:
+        The screenshot, or None if no source has a fresh frame (the caller
+        falls back to screencap).
+    """
+    for source, frame, age in iter_fresh_frames(device_id, max_age):
+        screenshot = screenshot_from_frame(frame)
+        if screenshot is not None:
+            logger.debug(f"Screenshot of {device_id} served from {source.name} ({age * 1000:.0f}ms old)")
+            return screenshot
+    return None
+
+
+def screenshot_from_frame(frame: Frame) -> Screenshot | None:
+    """
+    Build a Screenshot from an encoded frame.
+
+    Frames already in the configured format and within the configured maximum
+    dimension are passed through without re-encoding; others are compressed
+    like screencap captures.
+    """
+    try:
+        img = Image.open(BytesIO(frame.data))  # Reads the header only
+        if (
+            img.format == SCREENSHOT_CONFIG.image_format.upper()
+            and max(img.size) <= SCREENSHOT_CONFIG.max_image_dimension
+        ):
+            return Screenshot(
+                data=frame.data,
+                width=img.width,
+                height=img.height,
+                mime_type=MIME_TYPES[SCREENSHOT_CONFIG.image_format],
+            )
+        encoded = encode_bytes(frame.data)
+    except Exception as e:
+        logger.debug(f"Cannot decode streamed frame: {e}")
+        return None
+    return Screenshot.from_encoded(encoded) if encoded is not None else None
@@ -1,63 +1,13 @@
 """Screenshot utilities for capturing HarmonyOS device screen."""
 
-import base64
 import os
 import subprocess
 import tempfile
 import uuid
-from dataclasses import dataclass
-from io import BytesIO
-from typing import Tuple
 
-from PIL import Image
 from phone_agent.hdc.connection import _run_hdc_command
 
-from phone_agent.config.screenshot import SCREENSHOT_CONFIG
-
-
-def _compress_image(img: Image.Image) -> tuple[str, int, int]:
-    """
-    Compress an image for API transmission.
-    
-    - Resizes if larger than configured max dimension
-    - Converts to JPEG with configured quality
-    - Returns base64 encoded data and dimensions
-    """
-    width, height = img.size
-    
-    # Resize if too large (use configured max dimension)
-    max_dimension = SCREENSHOT_CONFIG.max_image_dimension
-    if width > max_dimension or height > max_dimension:
-        ratio = min(max_dimension / width, max_dimension / height)
-        new_width = int(width * ratio)
-        new_height = int(height * ratio)
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        width, height = new_width, new_height
-    
-    # Convert RGBA to RGB (JPEG doesn't support alpha channel)
-    if img.mode == 'RGBA':
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[3])
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Compress as JPEG (use configured quality)
-    buffered = BytesIO()
-    img.save(buffered, format="JPEG", quality=SCREENSHOT_CONFIG.jpeg_quality, optimize=True)
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    
-    return base64_data, width, height
-
-
-@dataclass
-class Screenshot:
-    """Represents a captured screenshot."""
-
-    base64_data: str
-    width: int
-    height: int
-    is_sensitive: bool = False
+from phone_agent.imaging import Screenshot, encode_bytes, fallback_screenshot
 
 
 def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
@@ -69,7 +19,7 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
         timeout: Timeout in seconds for screenshot operations.
 
     Returns:
-        Screenshot object containing base64 data and dimensions.
+        Screenshot object containing the encoded image and dimensions.
 
     Note:
         If the screenshot fails (e.g., on sensitive screens like payment pages),
@@ -118,15 +68,16 @@ def get_screenshot(device_id: str | None = None, timeout: int = 10) -> Screensho
             return _create_fallback_screenshot(is_sensitive=False)
 
         # Read image and compress for API transmission
-        img = Image.open(temp_path)
-        base64_data, width, height = _compress_image(img)
+        with open(temp_path, "rb") as f:
+            encoded = encode_bytes(f.read())
 
         # Cleanup
         os.remove(temp_path)
 
-        return Screenshot(
-            base64_data=base64_data, width=width, height=height, is_sensitive=False
-        )
+        if encoded is None:
+            return _create_fallback_screenshot(is_sensitive=False)
+
+        return Screenshot.from_encoded(encoded)
 
     except Exception as e:
         print(f"Screenshot error: {e}")
@@ -141,17 +92,5 @@ def _get_hdc_prefix(device_id: str | None) -> list:
 
 
 def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
-    """Create a black fallback image when screenshot fails."""
-    default_width, default_height = 1080, 2400
-
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-    return Screenshot(
-        base64_data=base64_data,
-        width=default_width,
-        height=default_height,
-        is_sensitive=is_sensitive,
-    )
+    """Return the black fallback image used when screenshot fails."""
+    return fallback_screenshot(is_sensitive)
@@ -0,0 +1,327 @@
+"""Image resizing and encoding shared by the screenshot backends.
+
+Every backend (ADB, HDC, iOS, streamed frames) turns a captured frame into a
+small image for the model. This module does that in one place:
+
+- screen frames are opaque, so their alpha channel is dropped before the
+  resize (raw frames are wrapped without alpha, PNG frames are checked)
+  instead of resampling four channels and compositing on white afterwards,
+- large reductions (at least 2x, e.g. a lower max_image_dimension or a
+  high-resolution JPEG source) first shrink by an integer factor
+  (Image.draft for JPEG, Image.reduce via reducing_gap) before the resample
+  filter runs; the default 1080x2400 -> 1920 resize is too small for that,
+- the resample filter, output format (JPEG or WebP), quality and JPEG
+  optimize pass come from the screenshot configuration,
+- decoding and encoding captured bytes can run in a process pool
+  (`encode_workers`), so many devices capturing at once do not contend for
+  the GIL of the agent process.
+
+Screenshots keep the encoded bytes; base64 is produced once, on first use,
+where an image is serialized into a model request.
+"""
+
+import base64
+import logging
+import multiprocessing
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, replace
+from functools import cached_property, lru_cache
+from io import BytesIO
+
+from PIL import Image, UnidentifiedImageError
+
+from phone_agent.config.screenshot import SCREENSHOT_CONFIG, ScreenshotConfig
+from phone_agent.profiler import SPAN_SCREENSHOT_COMPRESS, SPAN_SCREENSHOT_DECODE, span
+
+logger = logging.getLogger(__name__)
+
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "hamming": Image.Resampling.HAMMING,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "png": "image/png"}
+
+# Integer pre-reduction keeps at least this multiple of the target size for
+# the resample filter, which is visually indistinguishable from a full resample
+REDUCING_GAP = 2.0
+
+# Android PixelFormat of the raw screencap header -> PIL raw mode
+# (the alpha of a screen frame is opaque, so every layout is read as RGBX)
+_RAW_PIXEL_FORMATS = {
+    1: "RGBX",  # RGBA_8888
+    2: "RGBX",  # RGBX_8888
+    5: "BGRX",  # BGRA_8888
+}
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """How a frame is resized and encoded."""
+
+    max_dimension: int = 1920  # Max width or height before resizing
+    quality: int = 70  # Encoder quality (1-100)
+    image_format: str = "jpeg"  # "jpeg" or "webp"
+    resample: str = "lanczos"  # Key of RESAMPLE_FILTERS
+    optimize: bool = False  # Optimized JPEG Huffman tables (~20% smaller, slower encode)
+    opaque: bool = False  # Drop alpha instead of compositing on white
+
+    @classmethod
+    def from_config(cls, config: ScreenshotConfig | None = None, **overrides) -> "EncodeOptions":
+        """Options from the (global) screenshot configuration."""
+        config = config or SCREENSHOT_CONFIG
+        options = cls(
+            max_dimension=config.max_image_dimension,
+            quality=config.jpeg_quality,
+            image_format=config.image_format,
+            resample=config.resample,
+            optimize=config.jpeg_optimize,
+        )
+        return replace(options, **overrides)
+
+
+@dataclass
+class EncodedImage:
+    """An encoded image ready for the model."""
+
+    data: bytes
+    width: int
+    height: int
+    mime_type: str
+
+
+@dataclass(frozen=True)
+class Screenshot:
+    """A captured screenshot: the encoded image and its dimensions."""
+
+    data: bytes = field(repr=False)  # Encoded image (bytes or a memoryview of them)
+    width: int
+    height: int
+    is_sensitive: bool = False
+    mime_type: str = "image/jpeg"
+
+    @classmethod
+    def from_encoded(cls, encoded: EncodedImage, is_sensitive: bool = False) -> "Screenshot":
+        return cls(
+            data=encoded.data,
+            width=encoded.width,
+            height=encoded.height,
+            is_sensitive=is_sensitive,
+            mime_type=encoded.mime_type,
+        )
+
+    @cached_property
+    def base64_data(self) -> str:
+        """The image base64-encoded (computed on first access, then cached)."""
+        return base64.b64encode(self.data).decode("ascii")
+
+
+# Size of the black frame returned when a capture fails
+FALLBACK_SIZE = (1080, 2400)
+
+
+@lru_cache(maxsize=None)
+def fallback_screenshot(
+    is_sensitive: bool = False, size: tuple[int, int] = FALLBACK_SIZE
+) -> Screenshot:
+    """The black screenshot for failed captures (encoded once per size and shared)."""
+    buffered = BytesIO()
+    Image.new("RGB", size, color="black").save(buffered, format="PNG")
+    return Screenshot(
+        data=buffered.getvalue(),
+        width=size[0],
+        height=size[1],
+        is_sensitive=is_sensitive,
+        mime_type="image/png",
+    )
+
+
+def fit_size(width: int, height: int, max_dimension: int) -> tuple[int, int]:
+    """Size scaled proportionally so neither side exceeds max_dimension."""
+    if width <= max_dimension and height <= max_dimension:
+        return width, height
+    ratio = min(max_dimension / width, max_dimension / height)
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def resize_to_fit(img: Image.Image, max_dimension: int, resample: str = "lanczos") -> Image.Image:
+    """
+    Shrink an image to fit max_dimension (images that fit are returned as is).
+
+    Reductions of 2x or more first shrink by an integer factor (cheap box
+    reduce) and run the resample filter on the smaller image; smaller
+    reductions run the filter on the full image.
+    """
+    size = fit_size(img.width, img.height, max_dimension)
+    if size == img.size:
+        return img
+    return img.resize(size, RESAMPLE_FILTERS[resample], reducing_gap=REDUCING_GAP)
+
+
+def encode_image(img: Image.Image, options: EncodeOptions | None = None) -> EncodedImage:
+    """Resize an image to the configured maximum and encode it."""
+    options = options or EncodeOptions.from_config()
+    img = resize_to_fit(img, options.max_dimension, options.resample)
+
+    # JPEG has no alpha channel (WebP does, but screenshots need none)
+    if img.mode == "RGBA" and not options.opaque:
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buffered = BytesIO()
+    if options.image_format == "webp":
+        # method 4 is the encoder's speed/size sweet spot (default 6 is ~2x slower)
+        img.save(buffered, format="WEBP", quality=options.quality, method=4)
+    else:
+        img.save(buffered, format="JPEG", quality=options.quality, optimize=options.optimize)
+    data = buffered.getvalue()
+    logger.debug(f"Encoded {img.width}x{img.height} {options.image_format}: {len(data) / 1024:.1f}KB")
+    return EncodedImage(
+        data=data, width=img.width, height=img.height, mime_type=MIME_TYPES[options.image_format]
+    )
+
+
+def raw_frame_to_image(data: bytes) -> Image.Image | None:
+    """
+    Wrap raw 'screencap' output (header + pixels) in an image without copying.
+
+    Returns:
+        An RGBX image (sharing the buffer of data unless the pixels are BGR),
+        or None if the data is not a raw frame in a supported pixel format.
+    """
+    if len(data) < 12:
+        return None
+
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    pixel_bytes = width * height * 4
+    header_size = len(data) - pixel_bytes
+    # Header is width, height, format (+ color space on Android 9+)
+    if pixel_bytes <= 0 or header_size not in (12, 16):
+        return None
+    rawmode = _RAW_PIXEL_FORMATS.get(pixel_format)
+    if rawmode is None:
+        return None
+
+    # frombuffer shares the memory for RGBX; BGR layouts are converted
+    return Image.frombuffer(
+        "RGBX", (width, height), memoryview(data)[header_size:], "raw", rawmode, 0, 1
+    )
+
+
+def decode_frame(data: bytes, max_dimension: int | None = None) -> Image.Image | None:
+    """
+    Decode a captured frame: raw screencap output or any format PIL reads.
+
+    JPEG frames are decoded at the smallest DCT scale that still covers
+    max_dimension. RGBA frames whose alpha is fully opaque (Android
+    'screencap -p' output) are converted to RGB, which is cheaper to resize.
+
+    Returns:
+        The image, or None if the data is not an image.
+    """
+    if bytes(data[:4]) != b"\x89PNG" and bytes(data[:2]) != b"\xff\xd8":
+        img = raw_frame_to_image(data)
+        if img is not None:
+            return img
+    try:
+        img = Image.open(BytesIO(data))
+    except UnidentifiedImageError:
+        return None
+    if img.format == "JPEG" and max_dimension:
+        img.draft("RGB", fit_size(img.width, img.height, max_dimension))
+    img.load()
+    if img.mode == "RGBA" and img.getchannel("A").getextrema() == (255, 255):
+        return img.convert("RGB")
+    return img
+
+
+def encode_bytes(data: bytes, options: EncodeOptions | None = None) -> EncodedImage | None:
+    """
+    Decode a captured frame and encode it for the model.
+
+    Runs in the encoder process pool when `encode_workers` is configured.
+
+    Returns:
+        The encoded image, or None if the data is not a supported image.
+    """
+    options = options or EncodeOptions.from_config()
+    pool = _get_pool()
+    if pool is not None:
+        try:
+            with span(SPAN_SCREENSHOT_COMPRESS, bytes=len(data), offloaded=True):
+                return pool.submit(_encode_bytes, bytes(data), options).result()
+        except BrokenProcessPool as e:
+            # A crashed worker breaks the whole pool; encode here and restart it on next use
+            logger.warning(f"Image encoder pool failed, encoding in-process: {e}")
+            _discard_pool(pool)
+    return _encode_bytes(data, options)
+
+
+def _encode_bytes(data: bytes, options: EncodeOptions) -> EncodedImage | None:
+    with span(SPAN_SCREENSHOT_DECODE, bytes=len(data)):
+        img = decode_frame(data, options.max_dimension)
+    if img is None:
+        return None
+    with span(SPAN_SCREENSHOT_COMPRESS):
+        return encode_image(img, options)
+
+
+def guess_mime_type(base64_data: str) -> str:
+    """MIME type of base64-encoded image data from its magic bytes (JPEG if unknown)."""
+    if base64_data.startswith("iVBOR"):
+        return "image/png"
+    if base64_data.startswith("UklGR"):
+        return "image/webp"
+    return "image/jpeg"
+
+
+# Encoder process pool, created on first use when encode_workers > 0
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool, _pool_workers
+    workers = SCREENSHOT_CONFIG.encode_workers
+    if workers <= 0 and _pool is None:
+        return None
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None and workers > 0:
+            # spawn: forking a process with live threads (adb, event loops) is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+            logger.info(f"Image encoding offloaded to {workers} worker processes")
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown_encoder_pool() -> None:
+    """Stop the encoder worker processes (they are restarted on demand)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
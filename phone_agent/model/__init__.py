@@ -1,5 +1,45 @@
 """Model client module for AI inference."""
 
+from phone_agent.model.cancellation import CancellationToken, RequestCancelledError
 from phone_agent.model.client import ModelClient, ModelConfig, ContextTooLargeError
+from phone_agent.model.context import ContextManager, estimate_tokens, get_context_budget
+from phone_agent.model.gateway import GatewayConfig, ModelGateway, get_model_gateway
+from phone_agent.model.hedging import HedgeConfig, HedgedModelClient
+from phone_agent.model.preflight import RequestLimits, RequestPreflight
+from phone_agent.model.pool import ClientPool, PoolConfig, get_client_pool
+from phone_agent.model.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    get_circuit_breaker,
+    get_retry_stats,
+)
+from phone_agent.model.router import ModelRouter, RouterConfig
 
-__all__ = ["ModelClient", "ModelConfig", "ContextTooLargeError"]
+__all__ = [
+    "ModelClient",
+    "ModelConfig",
+    "ContextTooLargeError",
+    "CancellationToken",
+    "RequestCancelledError",
+    "ContextManager",
+    "estimate_tokens",
+    "get_context_budget",
+    "GatewayConfig",
+    "ModelGateway",
+    "get_model_gateway",
+    "HedgeConfig",
+    "HedgedModelClient",
+    "ClientPool",
+    "PoolConfig",
+    "get_client_pool",
+    "RequestLimits",
+    "RequestPreflight",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RetryPolicy",
+    "get_circuit_breaker",
+    "get_retry_stats",
+    "ModelRouter",
+    "RouterConfig",
+]
@@ -0,0 +1,89 @@
+"""Cooperative cancellation of in-flight model requests."""
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelledError(Exception):
+    """Raised when a model request is aborted through its cancellation token."""
+
+    def __init__(self):
+        super().__init__("Model request cancelled")
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag with close callbacks.
+
+    The owner (e.g. PhoneAgent.request_stop) calls cancel() from any thread.
+    Streaming loops check `cancelled` per chunk, and register callbacks that
+    close their HTTP response, so a request blocked waiting for the next chunk
+    is aborted right away instead of streaming to completion.
+
+    Example:
+        >>> token = CancellationToken()
+        >>> unregister = token.register(stream.close)
+        >>> for chunk in stream:
+        ...     token.raise_if_cancelled()
+        >>> unregister()
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel and run the registered callbacks (once)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug(f"Cancellation callback failed: {e}")
+
+    def reset(self) -> None:
+        """Make the token usable again (e.g. for the agent's next task)."""
+        with self._lock:
+            self._event.clear()
+            self._callbacks = []
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run callback on cancellation (immediately if already cancelled).
+
+        Returns:
+            A function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until cancelled or the timeout elapses; returns whether it was cancelled."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelledError()
+
+    def _unregister(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
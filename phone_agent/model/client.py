@@ -1,11 +1,13 @@
 """Model client for AI inference supporting multiple protocols."""
 
+import asyncio
+import copy
 import json
+import logging
+import math
 import time
 from dataclasses import dataclass, field
-from typing import Any
-
-from openai import OpenAI
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator
 
 try:
     import anthropic
@@ -24,6 +26,20 @@ except ImportError:
     genai = None
 
 from phone_agent.config.i18n import get_message
+from phone_agent.events import AgentEventType, EventSink, emit_event
+from phone_agent.imaging import guess_mime_type
+from phone_agent.model.cancellation import CancellationToken, RequestCancelledError
+from phone_agent.model.gateway import get_model_gateway
+from phone_agent.model.pool import get_client_pool
+from phone_agent.model.preflight import RequestLimits, RequestPreflight
+from phone_agent.model.retry import RetryPolicy, acall_with_retries, call_with_retries
+from phone_agent.model.streaming import (
+    ActionCallback,
+    ActionCallDetector,
+    MarkerScanner,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class ContextTooLargeError(Exception):
@@ -49,6 +65,12 @@ class ModelConfig:
     extra_body: dict[str, Any] = field(default_factory=dict)
     lang: str = "cn"  # Language for UI messages: 'cn' or 'en'
     protocol: str = "openai"  # Protocol type: 'openai', 'ollama', 'anthropic', 'gemini'
+    context_budget: int | None = None  # Prompt token budget (None = per-model default)
+    max_concurrency: int | None = None  # Requests in flight to this endpoint (None = gateway default)
+    logprobs: bool = False  # Request token logprobs (OpenAI protocol) to report action confidence
+    prompt_cache: bool = True  # Mark the system prompt and history as cacheable (Anthropic cache_control)
+    request_limits: RequestLimits | None = None  # Hard request limits (None = protocol defaults)
+    retry_policy: RetryPolicy | None = None  # Retry/backoff and circuit breaker (None = defaults)
 
 
 @dataclass
@@ -61,11 +83,157 @@ class ModelResponse:
     # Performance metrics
     time_to_first_token: float | None = None  # Time to first token (seconds)
     time_to_thinking_end: float | None = None  # Time to thinking end (seconds)
+    time_to_action: float | None = None  # Time until the action call was complete (seconds)
     total_time: float | None = None  # Total inference time (seconds)
     # Token usage
     input_tokens: int = 0
+    # Prompt tokens served from the provider's prefix cache (part of input_tokens)
+    cached_tokens: int = 0
     output_tokens: int = 0
     total_tokens: int = 0
+    # Time spent waiting for a model gateway slot (seconds)
+    queue_wait: float = 0.0
+    # Geometric mean probability of the action tokens (needs ModelConfig.logprobs)
+    confidence: float | None = None
+    # Routing tier that answered ('fast' or 'strong'), when a ModelRouter is used
+    tier: str | None = None
+
+
+class _StreamState:
+    """
+    Accumulates a streamed completion and echoes the thinking part.
+
+    Text is printed (or sent as thinking_delta events when an event sink is
+    set) as it arrives until an action marker appears. Markers are found by an
+    incremental scanner shared by all streaming protocols; a possible partial
+    marker at the end of the text is held back so the marker itself is never
+    echoed. Each streamed character is scanned once and chunks are only joined
+    at the end.
+
+    After the marker, the action call is tracked until it is syntactically
+    complete and then handed to on_action, without waiting for the rest of
+    the stream (trailing tokens, usage chunk).
+
+    on_first_token is called once, when the first text arrives.
+    """
+
+    ACTION_MARKERS = ["finish(message=", "do(action="]
+
+    def __init__(
+        self,
+        start_time: float,
+        event_sink: EventSink | None = None,
+        on_action: ActionCallback | None = None,
+        on_first_token: Callable[[], None] | None = None,
+    ):
+        self.start_time = start_time
+        self.event_sink = event_sink
+        self.on_action = on_action
+        self.on_first_token = on_first_token
+        self.time_to_first_token: float | None = None
+        self.time_to_thinking_end: float | None = None
+        self.time_to_action: float | None = None
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.output_tokens = 0
+        self._parts: list[str] = []
+        self._held = ""  # Possible start of a marker, not echoed yet
+        self._scanner = MarkerScanner(self.ACTION_MARKERS)
+        self._in_action_phase = False
+        self._action = ActionCallDetector()
+        self._action_logprobs: list[float] = []
+
+    @property
+    def raw_content(self) -> str:
+        """The complete streamed text so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, content: str) -> None:
+        """Consume one streamed text delta."""
+        self._parts.append(content)
+
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.time() - self.start_time
+            if self.on_first_token is not None:
+                # May raise (e.g. a hedged request that lost the race) before
+                # anything is echoed
+                self.on_first_token()
+
+        if self._in_action_phase:
+            self._feed_action(content)
+            return
+
+        found = self._scanner.feed(content)
+        if found is not None:
+            end, marker = found
+            text = self._held + content[:end]
+            self._held = ""
+            self._echo(text[: len(text) - len(marker)])
+            if self.event_sink is None:
+                print()
+            self._in_action_phase = True
+            self.time_to_thinking_end = time.time() - self.start_time
+            self._feed_action(marker + content[end:])
+            return
+
+        text = self._held + content
+        split = len(text) - self._scanner.pending
+        self._held = text[split:]
+        if split > 0:
+            self._echo(text[:split])
+
+    def read_openai_usage(self, usage: Any) -> None:
+        """Take token counts from an OpenAI usage payload (vLLM/SGLang report cached tokens too)."""
+        self.input_tokens = usage.prompt_tokens or 0
+        self.output_tokens = usage.completion_tokens or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+    def read_anthropic_usage(self, usage: Any) -> None:
+        """Take token counts from an Anthropic usage payload."""
+        # Anthropic's input_tokens only counts tokens after the last cache breakpoint
+        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        self.input_tokens = (usage.input_tokens or 0) + cache_read + cache_write
+        self.output_tokens = usage.output_tokens or 0
+        self.cached_tokens = cache_read
+
+    def read_gemini_usage(self, usage: Any) -> None:
+        """Take token counts from Gemini usage metadata (the last chunk has the totals)."""
+        self.input_tokens = usage.prompt_token_count or 0
+        self.output_tokens = usage.candidates_token_count or 0
+        # Implicit context caching (Gemini 2.5+) reports its hits here
+        self.cached_tokens = getattr(usage, "cached_content_token_count", 0) or 0
+
+    def add_logprobs(self, logprobs: Any) -> None:
+        """Record the token logprobs of a chunk (OpenAI 'logprobs' field) once the action started."""
+        if self._in_action_phase and logprobs is not None and logprobs.content:
+            self._action_logprobs.extend(token.logprob for token in logprobs.content)
+
+    @property
+    def confidence(self) -> float | None:
+        """Geometric mean probability of the action tokens, if logprobs were streamed."""
+        if not self._action_logprobs:
+            return None
+        return math.exp(sum(self._action_logprobs) / len(self._action_logprobs))
+
+    def _feed_action(self, content: str) -> None:
+        if self._action.complete or not self._action.feed(content):
+            return
+        self.time_to_action = time.time() - self.start_time
+        if self.on_action is not None:
+            try:
+                self.on_action(self._action.text)
+            except Exception as e:
+                logger.warning(f"Early action callback failed: {e}")
+
+    def _echo(self, text: str) -> None:
+        if self.event_sink is None:
+            print(text, end="", flush=True)
+        elif text:
+            emit_event(self.event_sink, AgentEventType.THINKING_DELTA, text=text)
 
 
 class ModelClient:
@@ -80,10 +248,36 @@ class ModelClient:
 
     Args:
         config: Model configuration.
+        event_sink: Optional sink for thinking_delta events. When set, the
+            streamed thinking is sent there instead of being printed.
+        client_id: Identifies the caller (e.g. the device) for fair queueing in
+            the shared model gateway.
+        cancel_token: Optional token that aborts in-flight requests. Cancelled
+            requests close their HTTP stream (freeing the inference server) and
+            raise RequestCancelledError.
     """
 
-    def __init__(self, config: ModelConfig | None = None):
+    def __init__(
+        self,
+        config: ModelConfig | None = None,
+        event_sink: EventSink | None = None,
+        client_id: str | None = None,
+        cancel_token: CancellationToken | None = None,
+    ):
         self.config = config or ModelConfig()
+        self.event_sink = event_sink
+        self.client_id = client_id
+        self.cancel_token = cancel_token
+        self._on_first_token: Callable[[], None] | None = None
+        self._endpoint = f"{self.config.protocol.lower()}:{self.config.base_url}"
+        if self.config.max_concurrency:
+            get_model_gateway().set_limit(self._endpoint, self.config.max_concurrency)
+        self._preflight = RequestPreflight(
+            self._endpoint, self.config.protocol, self.config.request_limits
+        )
+        self._retry_policy = self.config.retry_policy or RetryPolicy()
+        self._client_kwargs: dict[str, Any] = {}
+        self._gemini_model = None
         self._init_client()
 
     def _init_client(self):
@@ -101,10 +295,10 @@ class ModelClient:
                 base_url = base_url[:-9]  # Remove /messages
             elif base_url.endswith('/v1'):
                 base_url = base_url[:-3]  # Remove /v1
-            self.client = anthropic.Anthropic(
-                api_key=self.config.api_key or "EMPTY",
-                base_url=base_url,
-            )
+            self._client_kwargs = {
+                "api_key": self.config.api_key or "EMPTY",
+                "base_url": base_url,
+            }
         elif protocol == "gemini":
             if not HAS_GEMINI:
                 raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
@@ -125,7 +319,7 @@ class ModelClient:
                     transport='rest',
                     client_options={'api_endpoint': base_url}
                 )
-            self.client = genai.GenerativeModel(self.config.model_name)
+            self._gemini_model = genai.GenerativeModel(self.config.model_name)
         else:
             # Default to OpenAI-compatible protocol (including Ollama)
             base_url = self._normalize_openai_like_base_url(self.config.base_url, protocol)
@@ -133,10 +327,22 @@ class ModelClient:
                 api_key = self.config.api_key or "ollama"
             else:
                 api_key = self.config.api_key or "EMPTY"
-            self.client = OpenAI(
-                base_url=base_url or self.config.base_url,
-                api_key=api_key,
-            )
+            self._client_kwargs = {
+                "base_url": base_url or self.config.base_url,
+                "api_key": api_key,
+            }
+
+    @property
+    def client(self):
+        """
+        SDK client of this endpoint.
+
+        OpenAI and Anthropic clients come from the process-wide client pool, so
+        agents talking to the same endpoint share keep-alive connections.
+        """
+        if self._gemini_model is not None:
+            return self._gemini_model
+        return get_client_pool().get(self.config.protocol, **self._client_kwargs)
 
     @staticmethod
     def _normalize_openai_like_base_url(base_url: str, protocol: str) -> str:
@@ -146,168 +352,312 @@ class ModelClient:
             normalized = f"{normalized}/v1"
         return normalized
 
-    def request(self, messages: list[dict[str, Any]]) -> ModelResponse:
+    def request(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
         """
         Send a request to the model.
 
         Args:
             messages: List of message dictionaries in OpenAI format.
+            on_action: Optional callback receiving the action call text as soon
+                as it has streamed in completely, before the request returns.
+                Called on the requesting thread.
 
         Returns:
             ModelResponse containing thinking and action.
 
         Raises:
             ValueError: If the response cannot be parsed.
+            RequestCancelledError: If the cancel token fired.
+            ContextTooLargeError: If the endpoint rejects the request as too
+                large even after shrinking it.
         """
         protocol = self.config.protocol.lower()
+        messages = self._preflight.fit(messages)
+
+        self._raise_if_cancelled()
+        with get_model_gateway().slot(
+            self._endpoint, self.client_id, self.cancel_token
+        ) as queue_wait:
+            self._print_queue_wait(queue_wait)
+            while True:
+                try:
+                    if protocol == "anthropic":
+                        response = self._request_anthropic(messages, on_action)
+                    elif protocol == "gemini":
+                        response = self._request_gemini(messages, on_action)
+                    else:
+                        response = self._request_openai(messages, on_action)
+                    break
+                except ContextTooLargeError as e:
+                    messages = self._shrink_rejected(messages, e)
+        response.queue_wait = queue_wait
+        return response
+
+    async def arequest(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """
+        Send a request to the model without blocking the event loop.
 
-        if protocol == "anthropic":
-            return self._request_anthropic(messages)
-        elif protocol == "gemini":
-            return self._request_gemini(messages)
-        else:
-            return self._request_openai(messages)
+        OpenAI-compatible and Anthropic endpoints use the SDKs' async clients;
+        Gemini, whose SDK has no streaming async client here, runs in a worker
+        thread.
+
+        Args:
+            messages: List of message dictionaries in OpenAI format.
+            on_action: Optional callback receiving the complete action call
+                text early (see request()). Called on the event loop.
+
+        Returns:
+            ModelResponse containing thinking and action.
+        """
+        protocol = self.config.protocol.lower()
+        # Downscaling images is CPU work
+        messages = await asyncio.to_thread(self._preflight.fit, messages)
+
+        self._raise_if_cancelled()
+        async with get_model_gateway().aslot(
+            self._endpoint, self.client_id, self.cancel_token
+        ) as queue_wait:
+            self._print_queue_wait(queue_wait)
+            while True:
+                try:
+                    if protocol == "anthropic":
+                        response = await self._arequest_anthropic(messages, on_action)
+                    elif protocol == "gemini":
+                        response = await asyncio.to_thread(
+                            self._request_gemini, messages, self._on_loop(on_action)
+                        )
+                    else:
+                        response = await self._arequest_openai(messages, on_action)
+                    break
+                except ContextTooLargeError as e:
+                    messages = await asyncio.to_thread(self._shrink_rejected, messages, e)
+        response.queue_wait = queue_wait
+        return response
+
+    def fork(
+        self,
+        cancel_token: CancellationToken | None,
+        on_first_token: Callable[[], None] | None = None,
+    ) -> "ModelClient":
+        """
+        Return a client for one request that shares this client's connections.
+
+        Used to race requests (see phone_agent.model.hedging): each fork has its
+        own cancel token, so one can be aborted without touching the others,
+        and on_first_token reports when its stream starts producing text.
+        """
+        forked = copy.copy(self)
+        forked.cancel_token = cancel_token
+        forked._on_first_token = on_first_token
+        return forked
+
+    def _shrink_rejected(
+        self, messages: list[dict[str, Any]], error: ContextTooLargeError
+    ) -> list[dict[str, Any]]:
+        """Shrink a request the endpoint rejected as too large, or re-raise if it cannot be."""
+        smaller = self._preflight.after_rejection(messages)
+        if smaller is None:
+            raise error
+        print("📦 请求体积超出服务限制，已压缩后重试")
+        return smaller
+
+    @staticmethod
+    def _on_loop(on_action: ActionCallback | None) -> ActionCallback | None:
+        """Wrap a callback so a worker thread calls it on the running event loop."""
+        if on_action is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return lambda action_text: loop.call_soon_threadsafe(on_action, action_text)
+
+    def _raise_if_cancelled(self) -> None:
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def _iter_stream(self, items: Iterable, close: Callable[[], None]) -> Iterator:
+        """
+        Iterate a streaming response, aborting it when the request is cancelled.
+
+        The cancel token closes the HTTP response from whichever thread cancels,
+        which also unblocks a read waiting for the next chunk.
+        """
+        token = self.cancel_token
+        if token is None:
+            yield from items
+            return
+        unregister = token.register(close)
+        try:
+            for item in items:
+                token.raise_if_cancelled()
+                yield item
+        except RequestCancelledError:
+            raise
+        except Exception:
+            # Reading a response closed by cancel() fails with a transport error
+            token.raise_if_cancelled()
+            raise
+        finally:
+            unregister()
+        token.raise_if_cancelled()
+
+    async def _aiter_stream(
+        self, items: AsyncIterator, aclose: Callable[[], Awaitable[None]]
+    ) -> AsyncIterator:
+        """Async variant of _iter_stream; the stream is also closed when the task is cancelled."""
+        token = self.cancel_token
+        try:
+            async for item in items:
+                if token is not None:
+                    token.raise_if_cancelled()
+                yield item
+        except BaseException:
+            await aclose()
+            raise
+
+    @staticmethod
+    def _print_queue_wait(queue_wait: float) -> None:
+        if queue_wait >= 0.1:
+            print(f"⏳ 等待模型服务空闲: {queue_wait:.2f}s")
+
+    def _lease_client(self):
+        """The pooled SDK client of this endpoint, kept open for the request."""
+        return get_client_pool().lease(self.config.protocol, **self._client_kwargs)
+
+    def _alease_client(self):
+        """The pooled async SDK client of this endpoint for the running event loop."""
+        return get_client_pool().alease(self.config.protocol, **self._client_kwargs)
+
+    def _openai_request_kwargs(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """Build the streaming chat.completions arguments."""
+        return dict(
+            messages=messages,
+            model=self.config.model_name,
+            max_tokens=self.config.max_tokens,
+            temperature=self.config.temperature,
+            top_p=self.config.top_p,
+            frequency_penalty=self.config.frequency_penalty,
+            extra_body=self.config.extra_body,
+            stream=True,
+            stream_options={"include_usage": True},
+            **({"logprobs": True} if self.config.logprobs else {}),
+        )
+
+    def _anthropic_request_kwargs(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """Build the messages.stream arguments, converting from OpenAI format."""
+        system_content, anthropic_messages = self._to_anthropic_messages(messages)
+        system: Any = system_content if system_content else anthropic.NOT_GIVEN
+        if self.config.prompt_cache:
+            system = self._mark_prompt_cache(system_content, anthropic_messages)
+        return dict(
+            model=self.config.model_name,
+            max_tokens=self.config.max_tokens,
+            system=system,
+            messages=anthropic_messages,
+            temperature=self.config.temperature,
+            top_p=self.config.top_p,
+        )
 
-    def _request_openai(self, messages: list[dict[str, Any]]) -> ModelResponse:
+    def _request_openai(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
         """Send request using OpenAI protocol with retry logic."""
-        from openai import APIStatusError, APIConnectionError, APITimeoutError
-        
+        from openai import APIStatusError
+
         start_time = time.time()
-        time_to_first_token = None
-        time_to_thinking_end = None
-        input_tokens = 0
-        output_tokens = 0
-
-        raw_content = ""
-        buffer = ""
-        action_markers = ["finish(message=", "do(action="]
-        in_action_phase = False
-        first_token_received = False
-        
-        max_retries = 3
-        last_error = None
-        
-        for attempt in range(max_retries):
+
+        def attempt() -> _StreamState:
             try:
-                if attempt > 0:
-                    print(f"\n⚠️ API 请求失败，正在重试 ({attempt + 1}/{max_retries})...")
-                    time.sleep(1)  # Brief pause before retry
-                
-                stream = self.client.chat.completions.create(
-                    messages=messages,
-                    model=self.config.model_name,
-                    max_tokens=self.config.max_tokens,
-                    temperature=self.config.temperature,
-                    top_p=self.config.top_p,
-                    frequency_penalty=self.config.frequency_penalty,
-                    extra_body=self.config.extra_body,
-                    stream=True,
-                    stream_options={"include_usage": True},
+                stream = client.chat.completions.create(
+                    **self._openai_request_kwargs(messages)
                 )
+            except APIStatusError as e:
+                self._raise_if_too_large(e)
+                raise
+
+            # Reset for each attempt
+            state = _StreamState(start_time, self.event_sink, on_action, self._on_first_token)
+            for chunk in self._iter_stream(stream, stream.close):
+                # Capture usage from final chunk
+                if hasattr(chunk, 'usage') and chunk.usage:
+                    state.read_openai_usage(chunk.usage)
+                if len(chunk.choices) == 0:
+                    continue
+                if chunk.choices[0].delta.content is not None:
+                    state.feed(chunk.choices[0].delta.content)
+                state.add_logprobs(getattr(chunk.choices[0], "logprobs", None))
+            return state
+
+        with self._lease_client() as client:
+            return self._finish_response(self._call_with_retries(attempt))
+
+    async def _arequest_openai(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Async variant of _request_openai."""
+        from openai import APIStatusError
 
-                # Reset for each attempt
-                raw_content = ""
-                buffer = ""
-                in_action_phase = False
-                first_token_received = False
-
-                for chunk in stream:
-                    # Capture usage from final chunk
-                    if hasattr(chunk, 'usage') and chunk.usage:
-                        input_tokens = chunk.usage.prompt_tokens or 0
-                        output_tokens = chunk.usage.completion_tokens or 0
-                    if len(chunk.choices) == 0:
-                        continue
-                    if chunk.choices[0].delta.content is not None:
-                        content = chunk.choices[0].delta.content
-                        raw_content += content
-
-                        if not first_token_received:
-                            time_to_first_token = time.time() - start_time
-                            first_token_received = True
-
-                        if in_action_phase:
-                            continue
-
-                        buffer += content
-
-                        marker_found = False
-                        for marker in action_markers:
-                            if marker in buffer:
-                                thinking_part = buffer.split(marker, 1)[0]
-                                print(thinking_part, end="", flush=True)
-                                print()
-                                in_action_phase = True
-                                marker_found = True
-
-                                if time_to_thinking_end is None:
-                                    time_to_thinking_end = time.time() - start_time
-                                break
-
-                        if marker_found:
-                            continue
-
-                        is_potential_marker = False
-                        for marker in action_markers:
-                            for i in range(1, len(marker)):
-                                if buffer.endswith(marker[:i]):
-                                    is_potential_marker = True
-                                    break
-                            if is_potential_marker:
-                                break
-
-                        if not is_potential_marker:
-                            print(buffer, end="", flush=True)
-                            buffer = ""
-
-                # Success - break out of retry loop
-                break
-                
+        start_time = time.time()
+
+        async def attempt() -> _StreamState:
+            try:
+                stream = await client.chat.completions.create(
+                    **self._openai_request_kwargs(messages)
+                )
             except APIStatusError as e:
-                last_error = e
-                error_msg = str(e)
-                if "length limit" in error_msg.lower() or "too large" in error_msg.lower():
-                    print(f"\n❌ 请求体积过大 (尝试 {attempt + 1}/{max_retries})")
-                    if attempt == max_retries - 1:
-                        raise ContextTooLargeError(original_error=e)
-                else:
-                    print(f"\n❌ API 错误 (尝试 {attempt + 1}/{max_retries}): {error_msg[:100]}")
-                    if attempt == max_retries - 1:
-                        raise
-                continue
-                
-            except (APIConnectionError, APITimeoutError) as e:
-                last_error = e
-                print(f"\n❌ API 连接错误 (尝试 {attempt + 1}/{max_retries}): {type(e).__name__}")
-                if attempt == max_retries - 1:
-                    raise
-                continue
+                self._raise_if_too_large(e)
+                raise
+
+            state = _StreamState(start_time, self.event_sink, on_action, self._on_first_token)
+            async for chunk in self._aiter_stream(stream, stream.close):
+                if hasattr(chunk, 'usage') and chunk.usage:
+                    state.read_openai_usage(chunk.usage)
+                if len(chunk.choices) == 0:
+                    continue
+                if chunk.choices[0].delta.content is not None:
+                    state.feed(chunk.choices[0].delta.content)
+                state.add_logprobs(getattr(chunk.choices[0], "logprobs", None))
+            return state
+
+        async with self._alease_client() as client:
+            return self._finish_response(await self._acall_with_retries(attempt))
 
-        total_time = time.time() - start_time
-        thinking, action = self._parse_response(raw_content)
-        self._print_metrics(time_to_first_token, time_to_thinking_end, total_time, input_tokens, output_tokens)
+    @staticmethod
+    def _raise_if_too_large(e: Exception) -> None:
+        """Turn a size rejection into ContextTooLargeError; it is never retried unchanged."""
+        error_msg = str(e).lower()
+        too_large = "length limit" in error_msg or "too large" in error_msg
+        if too_large or getattr(e, "status_code", None) == 413:
+            # The same payload would be rejected again; the caller shrinks it
+            print("\n❌ 请求体积过大")
+            raise ContextTooLargeError(original_error=e)
+
+    def _call_with_retries(self, attempt: Callable[[], "_StreamState"]) -> "_StreamState":
+        """Run one streaming attempt under the retry policy and the endpoint's breaker."""
+        return call_with_retries(
+            attempt, self._endpoint, self._retry_policy, self.cancel_token, self._print_retry
+        )
 
-        return ModelResponse(
-            thinking=thinking,
-            action=action,
-            raw_content=raw_content,
-            time_to_first_token=time_to_first_token,
-            time_to_thinking_end=time_to_thinking_end,
-            total_time=total_time,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
+    async def _acall_with_retries(
+        self, attempt: Callable[[], Awaitable["_StreamState"]]
+    ) -> "_StreamState":
+        """Async variant of _call_with_retries."""
+        return await acall_with_retries(
+            attempt, self._endpoint, self._retry_policy, self.cancel_token, self._print_retry
         )
 
-    def _request_anthropic(self, messages: list[dict[str, Any]]) -> ModelResponse:
-        """Send request using Anthropic protocol with retry logic."""
-        start_time = time.time()
-        time_to_first_token = None
-        time_to_thinking_end = None
-        input_tokens = 0
-        output_tokens = 0
+    def _print_retry(self, attempt: int, error: BaseException, delay: float) -> None:
+        max_attempts = self._retry_policy.max_attempts
+        print(f"\n❌ API 错误 (尝试 {attempt}/{max_attempts}): {type(error).__name__}: {str(error)[:100]}")
+        print(f"⚠️ API 请求失败，{delay:.1f}s 后重试 ({attempt + 1}/{max_attempts})...")
 
-        # Convert OpenAI format messages to Anthropic format
+    @staticmethod
+    def _to_anthropic_messages(
+        messages: list[dict[str, Any]]
+    ) -> tuple[str, list[dict[str, Any]]]:
+        """Convert OpenAI format messages to an Anthropic system prompt and messages."""
         system_content = ""
         anthropic_messages = []
 
@@ -351,127 +701,120 @@ class ModelClient:
                 "content": content,
             })
 
-        # Stream response with retry logic
-        raw_content = ""
-        buffer = ""
-        action_markers = ["finish(message=", "do(action="]
-        in_action_phase = False
-        first_token_received = False
-        
-        max_retries = 3
-        last_error = None
-        
-        for attempt in range(max_retries):
+        return system_content, anthropic_messages
+
+    @staticmethod
+    def _mark_prompt_cache(
+        system_content: str, anthropic_messages: list[dict[str, Any]]
+    ) -> Any:
+        """
+        Add cache_control breakpoints for the parts of the prompt that repeat.
+
+        The system prompt is identical on every step, and the agent's history
+        only ever grows (images are stripped from a screen right after it was
+        answered), so everything up to the last assistant reply is the prefix
+        of the next request too. Marking the system prompt and that reply
+        lets the next step read both from the cache; only the current screen
+        is processed from scratch.
+
+        Returns:
+            The system parameter (as cacheable text blocks).
+        """
+        ephemeral = {"type": "ephemeral"}
+        for message in reversed(anthropic_messages[:-1]):
+            if message["role"] == "assistant" and message["content"]:
+                message["content"][-1] = {**message["content"][-1], "cache_control": ephemeral}
+                break
+        if not system_content:
+            return anthropic.NOT_GIVEN
+        return [{"type": "text", "text": system_content, "cache_control": ephemeral}]
+
+    def _request_anthropic(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Send request using Anthropic protocol with retry logic."""
+        start_time = time.time()
+        request_kwargs = self._anthropic_request_kwargs(messages)
+
+        def attempt() -> _StreamState:
+            # Reset for each attempt
+            state = _StreamState(start_time, self.event_sink, on_action, self._on_first_token)
             try:
-                if attempt > 0:
-                    print(f"\n⚠️ API 请求失败，正在重试 ({attempt + 1}/{max_retries})...")
-                    time.sleep(1)  # Brief pause before retry
-                
-                stream_context = self.client.messages.stream(
-                    model=self.config.model_name,
-                    max_tokens=self.config.max_tokens,
-                    system=system_content if system_content else anthropic.NOT_GIVEN,
-                    messages=anthropic_messages,
-                    temperature=self.config.temperature,
-                    top_p=self.config.top_p,
-                )
-                
-                # Reset for each attempt
-                raw_content = ""
-                buffer = ""
-                in_action_phase = False
-                first_token_received = False
-
-                with stream_context as stream:
-                    for text in stream.text_stream:
-                        raw_content += text
-
-                        if not first_token_received:
-                            time_to_first_token = time.time() - start_time
-                            first_token_received = True
-
-                        if in_action_phase:
-                            continue
-
-                        buffer += text
-
-                        marker_found = False
-                        for marker in action_markers:
-                            if marker in buffer:
-                                thinking_part = buffer.split(marker, 1)[0]
-                                print(thinking_part, end="", flush=True)
-                                print()
-                                in_action_phase = True
-                                marker_found = True
-
-                                if time_to_thinking_end is None:
-                                    time_to_thinking_end = time.time() - start_time
-                                break
-
-                        if marker_found:
-                            continue
-
-                        is_potential_marker = False
-                        for marker in action_markers:
-                            for i in range(1, len(marker)):
-                                if buffer.endswith(marker[:i]):
-                                    is_potential_marker = True
-                                    break
-                            if is_potential_marker:
-                                break
-
-                        if not is_potential_marker:
-                            print(buffer, end="", flush=True)
-                            buffer = ""
+                with client.messages.stream(**request_kwargs) as stream:
+                    for text in self._iter_stream(stream.text_stream, stream.close):
+                        state.feed(text)
 
                     # Get final message for usage stats
                     final_message = stream.get_final_message()
                     if final_message and final_message.usage:
-                        input_tokens = final_message.usage.input_tokens or 0
-                        output_tokens = final_message.usage.output_tokens or 0
-                
-                # Success - break out of retry loop
-                break
-                
+                        state.read_anthropic_usage(final_message.usage)
             except anthropic.RequestTooLargeError as e:
-                last_error = e
-                print(f"\n❌ 请求体积过大 (尝试 {attempt + 1}/{max_retries})")
-                if attempt == max_retries - 1:
-                    # All retries exhausted, raise user-friendly error
-                    raise ContextTooLargeError(original_error=e)
-                # Continue to next retry
-                continue
-                
-            except (anthropic.APIConnectionError, anthropic.APITimeoutError) as e:
-                last_error = e
-                print(f"\n❌ API 连接错误 (尝试 {attempt + 1}/{max_retries}): {type(e).__name__}")
-                if attempt == max_retries - 1:
-                    raise  # Re-raise the last error
-                continue
+                # The same payload would be rejected again; the caller shrinks it
+                print("\n❌ 请求体积过大")
+                raise ContextTooLargeError(original_error=e)
+            return state
+
+        with self._lease_client() as client:
+            return self._finish_response(self._call_with_retries(attempt))
+
+    async def _arequest_anthropic(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Async variant of _request_anthropic."""
+        start_time = time.time()
+        request_kwargs = self._anthropic_request_kwargs(messages)
 
-        total_time = time.time() - start_time
-        thinking, action = self._parse_response(raw_content)
-        self._print_metrics(time_to_first_token, time_to_thinking_end, total_time, input_tokens, output_tokens)
+        async def attempt() -> _StreamState:
+            state = _StreamState(start_time, self.event_sink, on_action, self._on_first_token)
+            try:
+                async with client.messages.stream(**request_kwargs) as stream:
+                    async for text in self._aiter_stream(stream.text_stream, stream.close):
+                        state.feed(text)
+
+                    final_message = await stream.get_final_message()
+                    if final_message and final_message.usage:
+                        state.read_anthropic_usage(final_message.usage)
+            except anthropic.RequestTooLargeError as e:
+                print("\n❌ 请求体积过大")
+                raise ContextTooLargeError(original_error=e)
+            return state
+
+        async with self._alease_client() as client:
+            return self._finish_response(await self._acall_with_retries(attempt))
+
+    def _finish_response(self, state: "_StreamState") -> ModelResponse:
+        """Parse a completed stream, print metrics and build the response."""
+        total_time = time.time() - state.start_time
+        thinking, action = self._parse_response(state.raw_content)
+        self._print_metrics(
+            state.time_to_first_token,
+            state.time_to_thinking_end,
+            total_time,
+            state.input_tokens,
+            state.output_tokens,
+            state.cached_tokens,
+        )
 
         return ModelResponse(
             thinking=thinking,
             action=action,
-            raw_content=raw_content,
-            time_to_first_token=time_to_first_token,
-            time_to_thinking_end=time_to_thinking_end,
+            raw_content=state.raw_content,
+            time_to_first_token=state.time_to_first_token,
+            time_to_thinking_end=state.time_to_thinking_end,
+            time_to_action=state.time_to_action,
             total_time=total_time,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
+            input_tokens=state.input_tokens,
+            cached_tokens=state.cached_tokens,
+            output_tokens=state.output_tokens,
+            total_tokens=state.input_tokens + state.output_tokens,
+            confidence=state.confidence,
         )
 
-    def _request_gemini(self, messages: list[dict[str, Any]]) -> ModelResponse:
-        """Send request using Gemini protocol."""
-        start_time = time.time()
-        input_tokens = 0
-        output_tokens = 0
+    @staticmethod
+    def _to_gemini_contents(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Convert OpenAI format messages to Gemini contents."""
+        import base64
 
-        # Convert messages to Gemini format
         gemini_contents = []
         for msg in messages:
             role = msg.get("role", "")
@@ -491,54 +834,53 @@ class ModelClient:
                     elif item.get("type") == "image_url":
                         image_url = item.get("image_url", {}).get("url", "")
                         if image_url.startswith("data:image/"):
-                            import base64
                             data_parts = image_url.split(",", 1)
                             if len(data_parts) == 2:
+                                # Keep the encoder's MIME type (e.g. image/jpeg)
+                                mime_type = data_parts[0].split(";")[0].replace("data:", "")
                                 image_data = base64.b64decode(data_parts[1])
-                                parts.append({"mime_type": "image/png", "data": image_data})
+                                parts.append({"mime_type": mime_type, "data": image_data})
             else:
                 parts.append(str(content))
 
             gemini_role = "user" if role == "user" else "model"
             gemini_contents.append({"role": gemini_role, "parts": parts})
+        return gemini_contents
 
-        # Generate response (Gemini doesn't support streaming in the same way)
-        response = self.client.generate_content(
-            gemini_contents,
-            generation_config=genai.types.GenerationConfig(
-                max_output_tokens=self.config.max_tokens,
-                temperature=self.config.temperature,
-                top_p=self.config.top_p,
-            ),
-        )
-
-        total_time = time.time() - start_time
-        raw_content = response.text if response.text else ""
-
-        # Get token usage from Gemini response
-        if hasattr(response, 'usage_metadata') and response.usage_metadata:
-            input_tokens = response.usage_metadata.prompt_token_count or 0
-            output_tokens = response.usage_metadata.candidates_token_count or 0
-
-        # Print content
-        print(raw_content)
-
-        thinking, action = self._parse_response(raw_content)
-        self._print_metrics(None, None, total_time, input_tokens, output_tokens)
+    def _request_gemini(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Send a streaming request using Gemini protocol with retry logic."""
+        start_time = time.time()
+        contents = self._to_gemini_contents(messages)
 
-        return ModelResponse(
-            thinking=thinking,
-            action=action,
-            raw_content=raw_content,
-            time_to_first_token=None,
-            time_to_thinking_end=None,
-            total_time=total_time,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
-        )
+        def attempt() -> _StreamState:
+            response = self.client.generate_content(
+                contents,
+                generation_config=genai.types.GenerationConfig(
+                    max_output_tokens=self.config.max_tokens,
+                    temperature=self.config.temperature,
+                    top_p=self.config.top_p,
+                ),
+                stream=True,
+            )
 
-    def _print_metrics(self, time_to_first_token, time_to_thinking_end, total_time, input_tokens=0, output_tokens=0):
+            state = _StreamState(start_time, self.event_sink, on_action, self._on_first_token)
+            # The SDK cannot abort a stream, so cancellation applies at the next chunk
+            for chunk in self._iter_stream(response, lambda: None):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    text = ""  # Chunk without text parts (e.g. only a finish reason)
+                if text:
+                    state.feed(text)
+                if getattr(chunk, "usage_metadata", None):
+                    state.read_gemini_usage(chunk.usage_metadata)
+            return state
+
+        return self._finish_response(self._call_with_retries(attempt))
+
+    def _print_metrics(self, time_to_first_token, time_to_thinking_end, total_time, input_tokens=0, output_tokens=0, cached_tokens=0):
         """Print performance metrics."""
         lang = self.config.lang
         print()
@@ -552,6 +894,8 @@ class ModelClient:
         print(f"{get_message('total_inference_time', lang)}:          {total_time:.3f}s")
         if input_tokens > 0 or output_tokens > 0:
             print(f"📊 Tokens: {input_tokens} in + {output_tokens} out = {input_tokens + output_tokens} total")
+        if cached_tokens > 0:
+            print(f"💾 Cached: {cached_tokens}/{input_tokens} prompt tokens ({cached_tokens / max(input_tokens, 1):.0%})")
         print("=" * 50)
 
     def _parse_response(self, content: str) -> tuple[str, str]:
@@ -625,7 +969,9 @@ class MessageBuilder:
             content.append(
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"},
+                    "image_url": {
+                        "url": f"data:{guess_mime_type(image_base64)};base64,{image_base64}"
+                    },
                 }
             )
 
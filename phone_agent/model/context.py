@@ -0,0 +1,298 @@
+"""Token-budgeted conversation context management.
+
+The agent appends one user/assistant turn per step. Instead of letting the
+history grow until the API rejects the request, the ContextManager estimates
+the prompt size before every request and, once it crosses a high watermark,
+folds the oldest turns into a compact step summary built locally from their
+<think>/<answer> pairs, until the prompt is back under a low watermark.
+"""
+
+import base64
+import io
+import json
+import logging
+import math
+import os
+import re
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Default prompt budgets (input tokens) by model name fragment. Checked in
+# order, so more specific fragments come first. These are working budgets, not
+# the model's context window: keeping the prompt small keeps TTFT and cost low.
+DEFAULT_CONTEXT_BUDGETS: list[tuple[str, int]] = [
+    ("autoglm-phone", 16000),
+    ("glm-4.5v", 24000),
+    ("glm-4v", 6000),
+    ("qwen", 24000),
+    ("gpt-4o", 32000),
+    ("claude", 32000),
+    ("gemini", 32000),
+]
+FALLBACK_CONTEXT_BUDGET = 16000
+
+# Vision encoders typically emit one token per 28x28 pixel patch
+IMAGE_PATCH_SIZE = 28
+# Used when the image dimensions cannot be read from the data URL
+DEFAULT_IMAGE_TOKENS = 1500
+# Per-message overhead for role markers and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "[历史摘要]"
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+def get_context_budget(model_name: str, configured: int | None = None) -> int:
+    """
+    Resolve the prompt token budget for a model.
+
+    Priority: explicit configuration, PHONE_AGENT_CONTEXT_BUDGET, then the
+    per-model defaults table.
+    """
+    if configured:
+        return configured
+    env_budget = os.getenv("PHONE_AGENT_CONTEXT_BUDGET")
+    if env_budget:
+        return int(env_budget)
+    name = (model_name or "").lower()
+    for fragment, budget in DEFAULT_CONTEXT_BUDGETS:
+        if fragment in name:
+            return budget
+    return FALLBACK_CONTEXT_BUDGET
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text.
+
+    CJK characters are roughly one token each; other text averages about four
+    characters per token. This deliberately errs on the high side.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def estimate_image_tokens(url: str) -> int:
+    """Estimate the token cost of an image from its data URL."""
+    if not url.startswith("data:") or "," not in url:
+        return DEFAULT_IMAGE_TOKENS
+    try:
+        from PIL import Image
+
+        # The header is enough to read the dimensions; avoid decoding the image
+        head = url.split(",", 1)[1][:8192]
+        head = head[: len(head) - len(head) % 4]
+        with Image.open(io.BytesIO(base64.b64decode(head))) as img:
+            width, height = img.size
+    except Exception:
+        return DEFAULT_IMAGE_TOKENS
+    return math.ceil(width / IMAGE_PATCH_SIZE) * math.ceil(height / IMAGE_PATCH_SIZE)
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """Estimate the token count of a single chat message."""
+    content = message.get("content")
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    if isinstance(content, str):
+        return tokens + estimate_text_tokens(content)
+    for item in content or []:
+        if item.get("type") == "text":
+            tokens += estimate_text_tokens(item.get("text", ""))
+        elif item.get("type") == "image_url":
+            tokens += estimate_image_tokens(item.get("image_url", {}).get("url", ""))
+    return tokens
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """Estimate the prompt token count of a message list."""
+    return sum(estimate_message_tokens(m) for m in messages)
+
+
+def _message_text(message: dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    return "\n".join(
+        item.get("text", "") for item in content or [] if item.get("type") == "text"
+    )
+
+
+class ContextManager:
+    """
+    Keeps the agent's conversation under a token budget.
+
+    The system prompt and the first user message (which carries the task) are
+    always kept verbatim, as is the most recent user message (the current
+    screen). Older turns are folded into a step summary appended to the task
+    message.
+
+    Args:
+        budget: Prompt token budget.
+        high_watermark: Fraction of the budget that triggers compaction.
+        low_watermark: Fraction of the budget compaction reduces the prompt to.
+    """
+
+    def __init__(
+        self, budget: int, high_watermark: float = 0.85, low_watermark: float = 0.6
+    ):
+        self.budget = budget
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.folded_steps: list[str] = []  # Summary lines of folded turns
+        self._dropped_steps = 0  # Oldest summary lines dropped to fit the budget
+        self._step_number = 0
+        self._app: str | None = None  # App of the screen before the next folded reply
+
+    @property
+    def folded_step_count(self) -> int:
+        """Number of agent steps folded into the summary so far."""
+        return self._step_number
+
+    def reset(self) -> None:
+        """Forget the summary of a previous task."""
+        self.folded_steps = []
+        self._dropped_steps = 0
+        self._step_number = 0
+        self._app = None
+
+    def fit(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Return messages that fit the budget, compacting old turns if needed.
+
+        Args:
+            messages: Full conversation (system prompt first).
+
+        Returns:
+            The same list if it is under the high watermark, otherwise a
+            compacted copy.
+        """
+        before = estimate_tokens(messages)
+        if before <= self.budget * self.high_watermark:
+            return messages
+
+        target = self.budget * self.low_watermark
+        head, body = messages[:2], list(messages[2:])
+        task_message = _strip_summary(head[-1]) if len(head) > 1 else None
+
+        # Images of everything but the current screen are the cheapest to drop
+        for i, message in enumerate(body[:-1]):
+            if isinstance(message.get("content"), list):
+                body[i] = {**message, "content": [
+                    item for item in message["content"] if item.get("type") == "text"
+                ]}
+
+        # Fold whole turns (an assistant reply and the messages up to the next
+        # reply), oldest first, so the kept history still starts with a reply.
+        # The first reply's screen lives in the task message kept in the head.
+        if self._step_number == 0 and task_message is not None:
+            self._app = self._extract_app(_message_text(task_message))
+        folded = 0
+        while self._estimate(head, body) > target:
+            end = next(
+                (i for i, m in enumerate(body) if i > 0 and m.get("role") == "assistant"), None
+            )
+            if end is None:
+                break
+            self._fold_turn(body[:end])
+            del body[:end]
+            folded += 1
+
+        # A very long task can outgrow the budget with the summary alone
+        while self.folded_steps and self._estimate(head, body) > self.budget:
+            self.folded_steps.pop(0)
+            self._dropped_steps += 1
+
+        result = self._compose(head, body)
+        after = estimate_tokens(result)
+        logger.info(
+            f"Context compacted: folded {folded} turns, ~{before} -> {after} tokens "
+            f"(budget {self.budget})"
+        )
+        if after > self.budget:
+            logger.warning(f"Context still exceeds budget after compaction: {after} > {self.budget}")
+        return result
+
+    def _compose(
+        self, head: list[dict[str, Any]], body: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        Head and body with the summary appended to the task message.
+
+        The summary is part of the task message rather than a message of its
+        own, so the conversation keeps alternating user and assistant turns.
+        """
+        if len(head) < 2:
+            return head + body
+        task_message = _strip_summary(head[-1])
+        if self.folded_steps:
+            task_message = _append_text(task_message, self._summary_text())
+        return head[:-1] + [task_message] + body
+
+    def _estimate(self, head: list[dict[str, Any]], body: list[dict[str, Any]]) -> int:
+        return estimate_tokens(self._compose(head, body))
+
+    def _fold_turn(self, turn: list[dict[str, Any]]) -> None:
+        """Append summary lines for one turn (the model reply, its feedback and the next screen)."""
+        for message in turn:
+            text = _message_text(message)
+            if message.get("role") == "assistant":
+                self._step_number += 1
+                self.folded_steps.append(self._summarize_reply(text, self._app))
+            elif text.startswith("[系统反馈]"):
+                self.folded_steps.append(f"  ⚠ {text[len('[系统反馈]'):].strip()[:80]}")
+            else:
+                self._app = self._extract_app(text) or self._app
+
+    def _summarize_reply(self, text: str, app: str | None) -> str:
+        think_match = re.search(r"<think>(.*?)</think>", text, re.DOTALL)
+        answer_match = re.search(r"<answer>(.*?)</answer>", text, re.DOTALL)
+        thinking = think_match.group(1).strip() if think_match else ""
+        action = answer_match.group(1).strip() if answer_match else text.strip()
+
+        line = f"步骤{self._step_number}: "
+        if app:
+            line += f"[{app}] "
+        if thinking:
+            line += re.split(r"[。.\n]", thinking, maxsplit=1)[0][:80]
+        return f"{line} -> {action[:120]}"
+
+    @staticmethod
+    def _extract_app(text: str) -> str | None:
+        match = re.search(r"\{.*\"current_app\".*\}", text)
+        if not match:
+            return None
+        try:
+            return json.loads(match.group(0)).get("current_app")
+        except ValueError:
+            return None
+
+    def _summary_text(self) -> str:
+        lines = [f"{SUMMARY_PREFIX} 以下是之前已执行步骤的摘要（截图已省略）："]
+        if self._dropped_steps:
+            lines.append(f"(更早的 {self._dropped_steps} 条记录已省略)")
+        lines.extend(self.folded_steps)
+        return "\n".join(lines)
+
+
+def _strip_summary(message: dict[str, Any]) -> dict[str, Any]:
+    """The message without a summary appended by a previous compaction."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return {**message, "content": content.split(f"\n\n{SUMMARY_PREFIX}", 1)[0]}
+    if isinstance(content, list):
+        return {**message, "content": [
+            item for item in content
+            if not (item.get("type") == "text" and item.get("text", "").startswith(SUMMARY_PREFIX))
+        ]}
+    return message
+
+
+def _append_text(message: dict[str, Any], text: str) -> dict[str, Any]:
+    content = message.get("content")
+    if isinstance(content, list):
+        return {**message, "content": content + [{"type": "text", "text": text}]}
+    return {**message, "content": f"{content or ''}\n\n{text}"}
@@ -0,0 +1,290 @@
+"""Shared gateway that schedules model requests per inference endpoint.
+
+Every PhoneAgent owns a ModelClient, so fanning a task out to many devices
+means many independent streaming requests against the same server. The
+gateway sits between the clients and the endpoints:
+
+- when a limit is set (`max_concurrency`, per-endpoint `set_limit`), at most
+  that many requests are in flight per endpoint; the rest wait,
+- waiting requests are granted round-robin across clients (devices), so one
+  device retrying or hedging cannot starve the others,
+- with a batch window, grants are released together at the end of a short
+  window, so servers with batched prefill (vLLM, sglang) see bursts they can
+  batch instead of a trickle of single requests,
+- the time each request spent waiting is reported back to the caller.
+
+Both blocking (thread) and asyncio callers share the same slots.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator
+
+from phone_agent.model.cancellation import CancellationToken, RequestCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GatewayConfig:
+    """Configuration for the model gateway."""
+
+    # Requests in flight per endpoint (0 = unlimited)
+    max_concurrency: int = 0
+    # Window for coalescing grants into one burst (0 = grant immediately)
+    batch_window: float = 0.0
+
+    def __post_init__(self):
+        self.max_concurrency = int(
+            os.getenv("PHONE_AGENT_GATEWAY_CONCURRENCY", self.max_concurrency)
+        )
+        self.batch_window = (
+            float(os.getenv("PHONE_AGENT_GATEWAY_BATCH_WINDOW_MS", self.batch_window * 1000))
+            / 1000
+        )
+
+
+class _Waiter:
+    """A request waiting for a slot; woken from whichever thread grants it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.enqueued_at = time.monotonic()
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future: asyncio.Future | None = loop.create_future() if loop else None
+        self.granted = False
+        self.cancelled = False
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _Endpoint:
+    """Slot accounting and fair queue for one endpoint."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.queues: "OrderedDict[str, deque[_Waiter]]" = OrderedDict()
+        self.dispatch_pending = False
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def has_free_slot(self) -> bool:
+        return self.limit <= 0 or self.active < self.limit
+
+    def pop_next(self) -> _Waiter | None:
+        """Next waiter in round-robin order over clients."""
+        while self.queues:
+            client_id, queue = next(iter(self.queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self.queues.move_to_end(client_id)
+            else:
+                del self.queues[client_id]
+            if not waiter.cancelled:
+                return waiter
+        return None
+
+
+class ModelGateway:
+    """
+    Per-endpoint concurrency limiter with fair queueing across clients.
+
+    Args:
+        config: Gateway configuration.
+
+    Example:
+        >>> gateway = get_model_gateway()
+        >>> with gateway.slot("http://localhost:8000/v1", "device-1") as wait:
+        ...     ...  # send the request; wait is the queueing delay in seconds
+    """
+
+    def __init__(self, config: GatewayConfig | None = None):
+        self.config = config or GatewayConfig()
+        self._lock = threading.Lock()
+        self._endpoints: dict[str, _Endpoint] = {}
+
+    def set_limit(self, endpoint: str, max_concurrency: int) -> None:
+        """Override the concurrency limit of one endpoint."""
+        with self._lock:
+            self._get_endpoint(endpoint).limit = max_concurrency
+        self._dispatch(endpoint)
+
+    @contextmanager
+    def slot(
+        self,
+        endpoint: str,
+        client_id: str | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> Iterator[float]:
+        """
+        Hold a request slot for an endpoint, blocking until one is granted.
+
+        Yields:
+            Time spent waiting for the slot, in seconds.
+
+        Raises:
+            RequestCancelledError: If the cancel token fired while queued.
+        """
+        waiter = _Waiter()
+        self._enqueue(endpoint, client_id, waiter)
+        # Cancelling wakes the waiter, so a queued request stops right away
+        unregister = cancel_token.register(waiter.wake) if cancel_token else lambda: None
+        try:
+            waiter.event.wait()
+            _raise_if_cancelled(cancel_token)
+        except BaseException:
+            self._abandon(endpoint, waiter)
+            raise
+        finally:
+            unregister()
+        wait = self._record_wait(endpoint, waiter)
+        try:
+            yield wait
+        finally:
+            self._release(endpoint)
+
+    @asynccontextmanager
+    async def aslot(
+        self,
+        endpoint: str,
+        client_id: str | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> AsyncIterator[float]:
+        """Async variant of slot(); waits on the event loop instead of a thread."""
+        waiter = _Waiter(asyncio.get_running_loop())
+        self._enqueue(endpoint, client_id, waiter)
+        unregister = cancel_token.register(waiter.wake) if cancel_token else lambda: None
+        try:
+            await waiter.future
+            _raise_if_cancelled(cancel_token)
+        except BaseException:
+            self._abandon(endpoint, waiter)
+            raise
+        finally:
+            unregister()
+        wait = self._record_wait(endpoint, waiter)
+        try:
+            yield wait
+        finally:
+            self._release(endpoint)
+
+    def get_stats(self) -> dict[str, dict]:
+        """Per-endpoint counters: limit, active, queued, requests and wait times."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "limit": state.limit,
+                    "active": state.active,
+                    "queued": state.queued,
+                    "requests": state.requests,
+                    "avg_wait": state.total_wait / state.requests if state.requests else 0.0,
+                    "max_wait": state.max_wait,
+                }
+                for endpoint, state in self._endpoints.items()
+            }
+
+    def _get_endpoint(self, endpoint: str) -> _Endpoint:
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            state = _Endpoint(self.config.max_concurrency)
+            self._endpoints[endpoint] = state
+        return state
+
+    def _enqueue(self, endpoint: str, client_id: str | None, waiter: _Waiter) -> None:
+        with self._lock:
+            state = self._get_endpoint(endpoint)
+            state.queues.setdefault(client_id or "", deque()).append(waiter)
+            if self.config.batch_window > 0:
+                if state.dispatch_pending:
+                    return
+                state.dispatch_pending = True
+                timer = threading.Timer(
+                    self.config.batch_window, self._dispatch, args=(endpoint, True)
+                )
+                timer.daemon = True
+                timer.start()
+                return
+        self._dispatch(endpoint)
+
+    def _dispatch(self, endpoint: str, from_timer: bool = False) -> None:
+        """Grant free slots to waiting requests in round-robin order."""
+        woken = []
+        with self._lock:
+            state = self._get_endpoint(endpoint)
+            if from_timer:
+                state.dispatch_pending = False
+            elif state.dispatch_pending:
+                return  # The batch window will grant these together
+            while state.has_free_slot():
+                waiter = state.pop_next()
+                if waiter is None:
+                    break
+                state.active += 1
+                waiter.granted = True
+                woken.append(waiter)
+        for waiter in woken:
+            waiter.wake()
+
+    def _release(self, endpoint: str) -> None:
+        with self._lock:
+            self._endpoints[endpoint].active -= 1
+        self._dispatch(endpoint)
+
+    def _abandon(self, endpoint: str, waiter: _Waiter) -> None:
+        """Handle a waiter cancelled while queued (or granted but not yet running)."""
+        with self._lock:
+            waiter.cancelled = True
+            granted = waiter.granted
+        if granted:
+            self._release(endpoint)
+
+    def _record_wait(self, endpoint: str, waiter: _Waiter) -> float:
+        wait = time.monotonic() - waiter.enqueued_at
+        with self._lock:
+            state = self._endpoints[endpoint]
+            state.requests += 1
+            state.total_wait += wait
+            state.max_wait = max(state.max_wait, wait)
+        if wait > 1.0:
+            logger.info(f"Model request waited {wait:.2f}s for a slot on {endpoint}")
+        return wait
+
+
+def _raise_if_cancelled(cancel_token: CancellationToken | None) -> None:
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+# Global gateway instance
+_gateway: ModelGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def get_model_gateway() -> ModelGateway:
+    """Get the process-wide model gateway."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = ModelGateway()
+    return _gateway
@@ -0,0 +1,346 @@
+"""Hedged model requests: race a slow primary endpoint against a secondary one.
+
+Shared inference servers have long latency tails, mostly in time to first
+token (queueing, prefill behind other requests). A hedged request is sent to
+the primary endpoint first; if no text has streamed in by a deadline derived
+from the primary's recent time-to-first-token percentile, the same request is
+also sent to the secondary endpoint. The first leg to stream text wins and the
+other is cancelled (its HTTP stream is closed), so only one response is ever
+echoed or acted on.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from phone_agent.model.cancellation import CancellationToken, RequestCancelledError
+from phone_agent.model.client import ModelClient, ModelResponse
+from phone_agent.model.streaming import ActionCallback
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+# Worker threads for the legs of sync hedged requests, shared by all clients
+# (each request needs two, plus a cancelled loser that is still unwinding)
+HEDGE_WORKERS = int(os.getenv("PHONE_AGENT_HEDGE_WORKERS", "32"))
+
+
+@dataclass
+class HedgeConfig:
+    """Configuration for hedged requests."""
+
+    # Time-to-first-token percentile of the primary used as hedging deadline
+    percentile: float = 0.95
+    # Lower bound of the deadline (seconds), so fast endpoints are not hedged on jitter
+    min_deadline: float = 1.0
+    # Deadline until enough samples have been collected (seconds)
+    initial_deadline: float = 5.0
+    # Samples needed before the percentile is trusted
+    min_samples: int = 10
+
+    def __post_init__(self):
+        self.percentile = float(os.getenv("PHONE_AGENT_HEDGE_PERCENTILE", self.percentile))
+        self.min_deadline = float(os.getenv("PHONE_AGENT_HEDGE_MIN_DEADLINE", self.min_deadline))
+        self.initial_deadline = float(
+            os.getenv("PHONE_AGENT_HEDGE_INITIAL_DEADLINE", self.initial_deadline)
+        )
+        self.min_samples = int(os.getenv("PHONE_AGENT_HEDGE_MIN_SAMPLES", self.min_samples))
+
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token samples of one endpoint."""
+
+    def __init__(self, window: int = 100):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """The q-quantile (0..1) of the samples, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+# Trackers are shared by all clients of an endpoint (e.g. agents of parallel tasks)
+_trackers: dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(client: ModelClient) -> LatencyTracker:
+    """Get the time-to-first-token tracker of a client's endpoint and model."""
+    key = f"{client.config.protocol.lower()}:{client.config.base_url}#{client.config.model_name}"
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = LatencyTracker()
+        return tracker
+
+
+class _Race:
+    """Picks the winner of a hedged request: the first leg to stream text."""
+
+    def __init__(self, notify: Callable[[], None]):
+        self._lock = threading.Lock()
+        self._notify = notify
+        self._aborts: dict[str, Callable[[], None]] = {}
+        self.start = time.perf_counter()
+        self.winner: str | None = None
+        self.won_at: float | None = None
+
+    def add(self, leg: str, abort: Callable[[], None]) -> None:
+        with self._lock:
+            self._aborts[leg] = abort
+
+    def claim(self, leg: str) -> None:
+        """First-token callback of a leg; aborts the leg if another one won."""
+        with self._lock:
+            if self.winner is None:
+                self.winner = leg
+                self.won_at = time.perf_counter() - self.start
+                losers = [abort for other, abort in self._aborts.items() if other != leg]
+            elif self.winner != leg:
+                raise RequestCancelledError()
+            else:
+                return
+        for abort in losers:
+            abort()
+        self._notify()
+
+    def abort_all(self, keep: str | None = None) -> None:
+        with self._lock:
+            aborts = [abort for leg, abort in self._aborts.items() if leg != keep]
+        for abort in aborts:
+            abort()
+
+
+class HedgedModelClient:
+    """
+    Sends requests to a primary client and hedges slow ones to a secondary.
+
+    Drop-in for ModelClient in the agent (request/arequest/config). With the
+    sync API, both legs run on worker threads, so on_action is called from a
+    worker thread rather than the requesting one.
+
+    Args:
+        primary: Client of the primary endpoint.
+        secondary: Client of the secondary endpoint.
+        config: Hedging configuration.
+        cancel_token: Optional token aborting both legs.
+
+    Example:
+        >>> client = HedgedModelClient(ModelClient(primary_config), ModelClient(backup_config))
+        >>> response = client.request(messages)
+    """
+
+    def __init__(
+        self,
+        primary: ModelClient,
+        secondary: ModelClient,
+        config: HedgeConfig | None = None,
+        cancel_token: CancellationToken | None = None,
+    ):
+        self.primary = primary
+        self.secondary = secondary
+        self.settings = config or HedgeConfig()
+        self.cancel_token = cancel_token
+        self._legs = {PRIMARY: primary, SECONDARY: secondary}
+
+    @property
+    def config(self):
+        """Model configuration of the primary endpoint."""
+        return self.primary.config
+
+    def deadline(self) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        tracker = get_latency_tracker(self.primary)
+        if len(tracker) < self.settings.min_samples:
+            return self.settings.initial_deadline
+        return max(self.settings.min_deadline, tracker.percentile(self.settings.percentile))
+
+    def request(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Send a request, hedging it to the secondary endpoint if the primary is slow."""
+        self._raise_if_cancelled()
+        deadline = self.deadline()
+        changed = threading.Condition()
+
+        def notify() -> None:
+            with changed:
+                changed.notify_all()
+
+        race = _Race(notify)
+        futures: dict[str, Future] = {}
+
+        def start(leg: str) -> None:
+            token = CancellationToken()
+            forked = self._legs[leg].fork(token, lambda: race.claim(leg))
+            race.add(leg, token.cancel)
+            # Keep context variables (task log routing) on the worker thread
+            context = contextvars.copy_context()
+            futures[leg] = _get_executor().submit(
+                context.run, forked.request, messages, on_action
+            )
+            futures[leg].add_done_callback(lambda _: notify())
+
+        unregister = self._register_cancel(race)
+        try:
+            start(PRIMARY)
+            with changed:
+                changed.wait_for(lambda: race.winner or futures[PRIMARY].done(), deadline)
+            if self._should_hedge(race, futures[PRIMARY]):
+                self._print_hedge(futures[PRIMARY], deadline)
+                start(SECONDARY)
+                with changed:
+                    changed.wait_for(lambda: self._settled(race, futures))
+            self._raise_if_cancelled()
+            leg = race.winner or self._first_success(futures)
+            response = futures[leg].result()
+        finally:
+            unregister()
+            race.abort_all(keep=race.winner)
+        self._record(race, leg, response, hedged=SECONDARY in futures)
+        return response
+
+    async def arequest(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Async variant of request(); both legs run as tasks on the event loop."""
+        self._raise_if_cancelled()
+        deadline = self.deadline()
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        # Legs may finish on worker threads (Gemini) and aborts may come from any thread
+        race = _Race(lambda: loop.call_soon_threadsafe(changed.set))
+        tasks: dict[str, asyncio.Task] = {}
+
+        def on_done(task: asyncio.Task) -> None:
+            if not task.cancelled():
+                task.exception()  # Retrieved: losers end with RequestCancelledError
+            changed.set()
+
+        def start(leg: str) -> None:
+            token = CancellationToken()
+            forked = self._legs[leg].fork(token, lambda: race.claim(leg))
+            task = asyncio.create_task(forked.arequest(messages, on_action))
+            task.add_done_callback(on_done)
+            race.add(leg, lambda: (token.cancel(), loop.call_soon_threadsafe(task.cancel)))
+            tasks[leg] = task
+
+        async def wait_until(predicate: Callable[[], Any], timeout: float | None = None) -> None:
+            end = None if timeout is None else loop.time() + timeout
+            while not predicate():
+                changed.clear()
+                if predicate():
+                    return
+                remaining = None if end is None else end - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return
+
+        unregister = self._register_cancel(race)
+        try:
+            start(PRIMARY)
+            await wait_until(lambda: race.winner or tasks[PRIMARY].done(), deadline)
+            if self._should_hedge(race, tasks[PRIMARY]):
+                self._print_hedge(tasks[PRIMARY], deadline)
+                start(SECONDARY)
+                await wait_until(lambda: self._settled(race, tasks))
+            self._raise_if_cancelled()
+            leg = race.winner or self._first_success(tasks)
+            try:
+                response = await tasks[leg]
+            except asyncio.CancelledError:
+                self._raise_if_cancelled()  # Aborted through the cancel token
+                raise
+        finally:
+            unregister()
+            race.abort_all(keep=race.winner)
+        self._record(race, leg, response, hedged=SECONDARY in tasks)
+        return response
+
+    def _raise_if_cancelled(self) -> None:
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def _register_cancel(self, race: _Race) -> Callable[[], None]:
+        if self.cancel_token is None:
+            return lambda: None
+        return self.cancel_token.register(race.abort_all)
+
+    def _should_hedge(self, race: _Race, primary: Future | asyncio.Task) -> bool:
+        """Hedge if the primary has not streamed yet, or failed without streaming."""
+        self._raise_if_cancelled()
+        if race.winner is not None:
+            return False
+        return not _succeeded(primary)
+
+    @staticmethod
+    def _settled(race: _Race, legs: dict[str, Future | asyncio.Task]) -> bool:
+        if race.winner is not None:
+            return True
+        # A leg that returns without streaming text never claims; the first success wins
+        return all(leg.done() for leg in legs.values()) or any(
+            _succeeded(leg) for leg in legs.values()
+        )
+
+    @staticmethod
+    def _first_success(legs: dict[str, Future | asyncio.Task]) -> str:
+        for name, leg in legs.items():
+            if _succeeded(leg):
+                return name
+        return PRIMARY  # All failed: report the primary's error
+
+    def _print_hedge(self, primary: Future | asyncio.Task, deadline: float) -> None:
+        reason = "请求失败" if primary.done() else f"{deadline:.2f}s 内无首 token"
+        print(
+            f"⚡ 对冲请求: 主服务 {self.primary.config.model_name} {reason}，"
+            f"同时请求备用服务 {self.secondary.config.model_name} ({self.secondary.config.base_url})"
+        )
+
+    def _record(self, race: _Race, leg: str, response: ModelResponse, hedged: bool) -> None:
+        elapsed = race.won_at if race.won_at is not None else time.perf_counter() - race.start
+        # If the secondary won, the primary was slower than this; recording the
+        # lower bound keeps its percentile from drifting towards fast requests
+        get_latency_tracker(self.primary).record(elapsed)
+        if hedged:
+            winner = self._legs[leg].config.model_name
+            print(f"⚡ 对冲请求: {leg} ({winner}) 胜出，首 token {elapsed:.2f}s")
+
+
+def _succeeded(leg: Future | asyncio.Task) -> bool:
+    return leg.done() and not leg.cancelled() and leg.exception() is None
+
+
+# Global leg executor, created on first use
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_WORKERS, thread_name_prefix="model-hedge"
+                )
+    return _executor
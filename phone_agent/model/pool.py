@@ -0,0 +1,231 @@
+"""Process-wide pool of model SDK clients.
+
+Every SDK client owns an HTTP connection pool. Building one per agent (and per
+decompose request or service test) means a fresh DNS lookup, TCP connection
+and TLS handshake for every task. The pool hands out one client per
+(protocol, base_url, api_key), so keep-alive connections are reused across
+agents and requests. Clients nobody has used for a while are closed; a client
+leased for a request (see ClientPool.lease) is never closed while it is in use,
+however long its stream runs.
+
+Async clients are bound to the event loop they were created on, so they are
+pooled per loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolConfig:
+    """Configuration for pooled SDK clients."""
+
+    # Connections per client (all requests to one endpoint share them)
+    max_connections: int = 100
+    # Idle connections kept open per client
+    max_keepalive_connections: int = 20
+    # Seconds an idle connection is kept open
+    keepalive_expiry: float = 60.0
+    # Seconds after which an unused client is closed (0 = never)
+    idle_ttl: float = 600.0
+
+    def __post_init__(self):
+        self.max_connections = int(
+            os.getenv("PHONE_AGENT_HTTP_MAX_CONNECTIONS", self.max_connections)
+        )
+        self.max_keepalive_connections = int(
+            os.getenv("PHONE_AGENT_HTTP_MAX_KEEPALIVE", self.max_keepalive_connections)
+        )
+        self.keepalive_expiry = float(
+            os.getenv("PHONE_AGENT_HTTP_KEEPALIVE_EXPIRY", self.keepalive_expiry)
+        )
+        self.idle_ttl = float(os.getenv("PHONE_AGENT_CLIENT_IDLE_TTL", self.idle_ttl))
+
+
+class _Entry:
+    __slots__ = ("client", "loop", "last_used", "leases")
+
+    def __init__(self, client: Any, loop: asyncio.AbstractEventLoop | None):
+        self.client = client
+        self.loop = loop
+        self.last_used = time.monotonic()
+        self.leases = 0  # Requests currently using the client
+
+
+class ClientPool:
+    """
+    Shares SDK clients (and their keep-alive connections) by endpoint.
+
+    Args:
+        config: Pool configuration.
+
+    Example:
+        >>> pool = get_client_pool()
+        >>> with pool.lease("openai", "http://localhost:8000/v1", "EMPTY") as client:
+        ...     client.chat.completions.create(...)
+    """
+
+    def __init__(self, config: PoolConfig | None = None):
+        self.config = config or PoolConfig()
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, _Entry] = {}
+        self._last_sweep = time.monotonic()
+        self._created = 0
+        self._reused = 0
+
+    def get(self, protocol: str, base_url: str, api_key: str) -> Any:
+        """Get the sync client (OpenAI or anthropic.Anthropic) of an endpoint."""
+        return self._get(protocol, base_url, api_key, None).client
+
+    def get_async(self, protocol: str, base_url: str, api_key: str) -> Any:
+        """Get the async client of an endpoint for the running event loop."""
+        return self._get(protocol, base_url, api_key, asyncio.get_running_loop()).client
+
+    @contextmanager
+    def lease(self, protocol: str, base_url: str, api_key: str) -> Iterator[Any]:
+        """Get the sync client of an endpoint, kept open until the block exits."""
+        entry = self._get(protocol, base_url, api_key, None, lease=True)
+        try:
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    @asynccontextmanager
+    async def alease(self, protocol: str, base_url: str, api_key: str) -> AsyncIterator[Any]:
+        """Async variant of lease() for the running event loop."""
+        entry = self._get(protocol, base_url, api_key, asyncio.get_running_loop(), lease=True)
+        try:
+            yield entry.client
+        finally:
+            self._release(entry)
+
+    def evict_idle(self) -> int:
+        """Close clients unused (and not leased) for longer than idle_ttl; returns how many."""
+        if self.config.idle_ttl <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._last_sweep = now
+            stale = [
+                key
+                for key, entry in self._clients.items()
+                if (entry.leases == 0 and now - entry.last_used > self.config.idle_ttl)
+                or (entry.loop is not None and entry.loop.is_closed())
+            ]
+            entries = [self._clients.pop(key) for key in stale]
+        for entry in entries:
+            self._close(entry)
+        if entries:
+            logger.info(f"Closed {len(entries)} idle model client(s)")
+        return len(entries)
+
+    def close(self) -> None:
+        """Close all pooled clients."""
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "leased": sum(1 for entry in self._clients.values() if entry.leases),
+                "created": self._created,
+                "reused": self._reused,
+            }
+
+    def _get(
+        self,
+        protocol: str,
+        base_url: str,
+        api_key: str,
+        loop: asyncio.AbstractEventLoop | None,
+        lease: bool = False,
+    ) -> _Entry:
+        family = "anthropic" if protocol.lower() == "anthropic" else "openai"
+        key = (family, base_url, api_key, loop)
+        now = time.monotonic()
+        if self.config.idle_ttl > 0 and now - self._last_sweep > self.config.idle_ttl / 10:
+            self.evict_idle()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = _Entry(self._create(family, base_url, api_key, loop is not None), loop)
+                self._clients[key] = entry
+                self._created += 1
+            else:
+                self._reused += 1
+            entry.last_used = now
+            if lease:
+                entry.leases += 1
+            return entry
+
+    def _release(self, entry: _Entry) -> None:
+        with self._lock:
+            entry.leases -= 1
+            # The idle time of a client starts when its last request ends
+            entry.last_used = time.monotonic()
+
+    def _create(self, family: str, base_url: str, api_key: str, is_async: bool) -> Any:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+        # The SDKs' own httpx subclasses keep their default timeouts, proxy
+        # handling and redirects; only the connection limits are changed
+        if family == "anthropic":
+            import anthropic
+
+            if is_async:
+                sdk_class, http_class = anthropic.AsyncAnthropic, anthropic.DefaultAsyncHttpxClient
+            else:
+                sdk_class, http_class = anthropic.Anthropic, anthropic.DefaultHttpxClient
+        else:
+            import openai
+
+            if is_async:
+                sdk_class, http_class = openai.AsyncOpenAI, openai.DefaultAsyncHttpxClient
+            else:
+                sdk_class, http_class = openai.OpenAI, openai.DefaultHttpxClient
+        return sdk_class(base_url=base_url, api_key=api_key, http_client=http_class(limits=limits))
+
+    @staticmethod
+    def _close(entry: _Entry) -> None:
+        try:
+            if entry.loop is None:
+                entry.client.close()
+            elif not entry.loop.is_closed():
+                # Async clients are closed on their own loop
+                entry.loop.call_soon_threadsafe(
+                    lambda: entry.loop.create_task(entry.client.close())
+                )
+        except Exception as e:
+            logger.debug(f"Failed to close model client: {e}")
+
+
+# Global pool instance
+_pool: ClientPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    """Get the process-wide model client pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ClientPool()
+    return _pool
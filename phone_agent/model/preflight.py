@@ -0,0 +1,261 @@
+"""Pre-flight request size checks.
+
+Endpoints reject oversized requests (HTTP 413, "too large", vLLM's
+per-prompt image limit). Sending the same multi-MB payload again cannot
+succeed, so requests are checked against the endpoint's limits before they
+are sent and shrunk deterministically when needed:
+
+1. drop images from all but the latest message that has one,
+2. downscale the current screenshot (down to a minimum size),
+3. trim the oldest history turns (the system prompt and task message stay).
+
+Limits come from the model configuration, per-protocol defaults, and what an
+endpoint has rejected before: after a size rejection the byte limit of that
+endpoint is lowered below the rejected size, so the retry (and every later
+request) is sent smaller.
+"""
+
+import base64
+import io
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Any
+
+from phone_agent.model.context import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Fraction of a rejected request size used as the endpoint's new byte limit
+REJECTED_SIZE_FACTOR = 0.75
+# Screenshots are not downscaled below this short side (pixels)
+MIN_IMAGE_SIDE = 360
+# Scale factor per downscaling round
+DOWNSCALE_FACTOR = 0.75
+
+
+@dataclass(frozen=True)
+class RequestLimits:
+    """Hard request limits of an endpoint (None = unlimited)."""
+
+    max_bytes: int | None = None  # Serialized request size
+    max_images: int | None = None  # Images per request
+    max_tokens: int | None = None  # Estimated prompt tokens
+
+
+# Documented API limits; OpenAI-compatible servers (vLLM, proxies) vary too
+# much for a default and are learned from rejections
+DEFAULT_LIMITS: dict[str, RequestLimits] = {
+    "anthropic": RequestLimits(max_bytes=32 * 1024 * 1024, max_images=100),
+    "gemini": RequestLimits(max_bytes=20 * 1024 * 1024),
+}
+
+# Byte limits learned from rejections, by endpoint
+_learned_bytes: dict[str, int] = {}
+_learned_lock = threading.Lock()
+
+
+def estimate_request_bytes(messages: list[dict[str, Any]]) -> int:
+    """Approximate serialized size of a message list (text and data URLs)."""
+    size = 0
+    for message in messages:
+        size += 32  # Role and JSON structure
+        content = message.get("content")
+        if isinstance(content, str):
+            size += len(content.encode("utf-8"))
+            continue
+        for item in content or []:
+            if item.get("type") == "text":
+                size += len(item.get("text", "").encode("utf-8")) + 32
+            elif item.get("type") == "image_url":
+                size += len(item.get("image_url", {}).get("url", "")) + 48
+    return size
+
+
+def count_images(messages: list[dict[str, Any]]) -> int:
+    return sum(len(_image_indices(message)) for message in messages)
+
+
+def _image_indices(message: dict[str, Any]) -> list[int]:
+    content = message.get("content")
+    if not isinstance(content, list):
+        return []
+    return [i for i, item in enumerate(content) if item.get("type") == "image_url"]
+
+
+def _without_images(message: dict[str, Any]) -> dict[str, Any]:
+    return {
+        **message,
+        "content": [item for item in message["content"] if item.get("type") != "image_url"],
+    }
+
+
+def downscale_data_url(url: str, factor: float = DOWNSCALE_FACTOR) -> str | None:
+    """
+    Re-encode an image data URL at a smaller size.
+
+    Returns:
+        The smaller data URL (JPEG), or None if the image is already at the
+        minimum size or cannot be decoded.
+    """
+    if not url.startswith("data:image/") or "," not in url:
+        return None
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(base64.b64decode(url.split(",", 1)[1]))) as img:
+            width, height = img.size
+            if min(width, height) * factor < MIN_IMAGE_SIDE:
+                return None
+            resized = img.convert("RGB").resize(
+                (int(width * factor), int(height * factor)), Image.Resampling.LANCZOS
+            )
+        buffered = io.BytesIO()
+        resized.save(buffered, format="JPEG", quality=75, optimize=True)
+    except Exception as e:
+        logger.debug(f"Cannot downscale image: {e}")
+        return None
+    return "data:image/jpeg;base64," + base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+class RequestPreflight:
+    """
+    Fits requests to an endpoint's limits before they are sent.
+
+    Args:
+        endpoint: Endpoint key (rejections are remembered per endpoint).
+        protocol: Protocol name, selects the default limits.
+        limits: Configured limits; fields left None fall back to the defaults.
+
+    Example:
+        >>> preflight = RequestPreflight("openai:http://localhost:8000/v1", "openai")
+        >>> messages = preflight.fit(messages)
+    """
+
+    def __init__(self, endpoint: str, protocol: str, limits: RequestLimits | None = None):
+        self.endpoint = endpoint
+        defaults = DEFAULT_LIMITS.get(protocol.lower(), RequestLimits())
+        limits = limits or RequestLimits()
+        self.configured = RequestLimits(
+            max_bytes=limits.max_bytes or defaults.max_bytes,
+            max_images=limits.max_images if limits.max_images is not None else defaults.max_images,
+            max_tokens=limits.max_tokens or defaults.max_tokens,
+        )
+
+    @property
+    def limits(self) -> RequestLimits:
+        """Effective limits: the configured ones, tightened by past rejections."""
+        learned = _learned_bytes.get(self.endpoint)
+        if learned is None:
+            return self.configured
+        max_bytes = min(learned, self.configured.max_bytes or learned)
+        return replace(self.configured, max_bytes=max_bytes)
+
+    def fit(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Return messages within the limits.
+
+        The input list and its messages are not modified; shrunk messages are
+        copies. Requests that fit are returned as is.
+        """
+        limits = self.limits
+        violations = self._violations(messages, limits)
+        if not violations:
+            return messages
+
+        before = self._describe(messages)
+        messages = list(messages)
+        for shrink in (self._drop_old_images, self._downscale_current, self._trim_history):
+            while self._violations(messages, limits) and shrink(messages, limits):
+                pass
+            if not self._violations(messages, limits):
+                break
+
+        remaining = self._violations(messages, limits)
+        print(f"📦 请求预检: {before} 超出{'/'.join(violations)}限制，已压缩为 {self._describe(messages)}")
+        if remaining:
+            logger.warning(f"Request still exceeds {', '.join(remaining)} limit of {self.endpoint}")
+        return messages
+
+    def after_rejection(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]] | None:
+        """
+        Learn from a size rejection and shrink the request below the rejected size.
+
+        Returns:
+            The smaller messages, or None if they cannot be made smaller (the
+            request must not be sent again unchanged).
+        """
+        size = estimate_request_bytes(messages)
+        with _learned_lock:
+            learned = int(size * REJECTED_SIZE_FACTOR)
+            _learned_bytes[self.endpoint] = min(learned, _learned_bytes.get(self.endpoint, learned))
+        logger.info(f"{self.endpoint} rejected a {size // 1024} KB request, limiting to {learned // 1024} KB")
+        smaller = self.fit(messages)
+        if estimate_request_bytes(smaller) >= size:
+            return None
+        return smaller
+
+    @staticmethod
+    def _violations(messages: list[dict[str, Any]], limits: RequestLimits) -> list[str]:
+        violations = []
+        if limits.max_bytes is not None and estimate_request_bytes(messages) > limits.max_bytes:
+            violations.append("体积")
+        if limits.max_images is not None and count_images(messages) > limits.max_images:
+            violations.append("图片数")
+        if limits.max_tokens is not None and estimate_tokens(messages) > limits.max_tokens:
+            violations.append("token")
+        return violations
+
+    @staticmethod
+    def _describe(messages: list[dict[str, Any]]) -> str:
+        return (
+            f"{estimate_request_bytes(messages) // 1024} KB / {count_images(messages)} 张图 / "
+            f"约 {estimate_tokens(messages)} tokens"
+        )
+
+    @staticmethod
+    def _drop_old_images(messages: list[dict[str, Any]], limits: RequestLimits) -> bool:
+        """Strip the images of the oldest message that has any; the latest keeps its own."""
+        with_images = [i for i, message in enumerate(messages) if _image_indices(message)]
+        if not with_images or (len(with_images) == 1 and limits.max_images != 0):
+            return False
+        messages[with_images[0]] = _without_images(messages[with_images[0]])
+        return True
+
+    @staticmethod
+    def _downscale_current(messages: list[dict[str, Any]], limits: RequestLimits) -> bool:
+        """Downscale the images of the latest message that has any by one step."""
+        for index in range(len(messages) - 1, -1, -1):
+            image_indices = _image_indices(messages[index])
+            if not image_indices:
+                continue
+            content = list(messages[index]["content"])
+            changed = False
+            for i in image_indices:
+                smaller = downscale_data_url(content[i].get("image_url", {}).get("url", ""))
+                if smaller is not None:
+                    content[i] = {"type": "image_url", "image_url": {"url": smaller}}
+                    changed = True
+            if changed:
+                messages[index] = {**messages[index], "content": content}
+            return changed
+        return False
+
+    @staticmethod
+    def _trim_history(messages: list[dict[str, Any]], limits: RequestLimits) -> bool:
+        """
+        Remove the oldest turn after the system prompt and the task message.
+
+        A turn runs from an assistant reply up to the next reply (its feedback
+        and the following screen), as ContextManager.fit folds them, so the
+        kept history still starts with a reply and ends with the current screen.
+        """
+        head = 2 if messages and messages[0].get("role") == "system" else 1
+        end = next(
+            (i for i in range(head + 1, len(messages)) if messages[i].get("role") == "assistant"),
+            None,
+        )
+        if end is None:
+            return False
+        del messages[head:end]
+        return True
@@ -0,0 +1,367 @@
+"""Retry policy and per-endpoint circuit breakers for model requests.
+
+A failed model request is retried only when the failure is the endpoint's
+(connection errors, timeouts, 408/409/429 and 5xx responses); client errors
+such as 400/401 or a request that is too large fail right away. Retries wait
+with exponential backoff and jitter, so parallel devices hitting a
+rate-limited provider spread out instead of retrying in lockstep, and a
+`Retry-After` / `retry-after-ms` header from the server takes precedence.
+
+Every endpoint has one circuit breaker shared by all clients in the process.
+After `breaker_threshold` consecutive endpoint failures it opens and requests
+fail fast with CircuitOpenError for `breaker_cooldown` seconds; then a single
+probe request is let through, which closes the breaker on success or opens it
+again on failure.
+"""
+
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, TypeVar
+
+from phone_agent.model.cancellation import CancellationToken
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status codes worth retrying besides 5xx
+RETRYABLE_STATUS = frozenset({408, 409, 425, 429})
+
+# Exception class names of transport failures across the SDKs (openai,
+# anthropic, httpx); matched by name so no SDK has to be imported
+TRANSPORT_ERRORS = frozenset(
+    {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException"}
+)
+
+# Called before sleeping for a retry: (attempt that failed, error, delay)
+RetryCallback = Callable[[int, BaseException, float], None]
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint's circuit breaker rejects a request."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+        super().__init__(f"模型服务连续请求失败，已暂停请求，约 {retry_in:.1f}s 后恢复 ({endpoint})")
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a failed model request.
+
+    Subclass and override is_retryable() / delay() for custom behaviour.
+    """
+
+    # Attempts per request, including the first one
+    max_attempts: int = 3
+    # Backoff before the first retry (seconds), doubled per retry
+    base_delay: float = 1.0
+    # Upper bound of the backoff (seconds)
+    max_delay: float = 30.0
+    # Randomize each backoff within [delay / 2, delay]
+    jitter: bool = True
+    # Give up instead of waiting when the server asks for a longer Retry-After
+    max_retry_after: float = 60.0
+    # Consecutive endpoint failures that open the breaker (0 = never open)
+    breaker_threshold: int = 5
+    # Seconds the open breaker rejects requests before letting a probe through
+    breaker_cooldown: float = 30.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RetryPolicy":
+        """Build a policy from stored settings; unknown and empty keys are ignored."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known and v not in (None, "")})
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Whether the error is the endpoint's fault (and may go away on retry)."""
+        status = get_status_code(error)
+        if status is not None:
+            return status >= 500 or status in RETRYABLE_STATUS
+        return any(cls.__name__ in TRANSPORT_ERRORS for cls in type(error).__mro__) or (
+            isinstance(error, (ConnectionError, TimeoutError))
+        )
+
+    def delay(self, attempt: int, error: BaseException) -> float | None:
+        """
+        Seconds to wait before retrying after the given (1-based) attempt failed.
+
+        Returns:
+            The delay, or None to give up.
+        """
+        if attempt >= self.max_attempts:
+            return None
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        if self.jitter:
+            backoff = random.uniform(backoff / 2, backoff)
+        return backoff
+
+
+def get_status_code(error: BaseException) -> int | None:
+    """HTTP status of an SDK error (openai/anthropic status_code, google api_core code)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(error, "code", None)
+    return int(status) if isinstance(status, int) else None
+
+
+def get_retry_after(error: BaseException) -> float | None:
+    """Seconds the server asked to wait (Retry-After or retry-after-ms header)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            return max(0.0, float(retry_after_ms) / 1000)
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+            return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        logger.debug(f"Ignoring unparsable Retry-After header: {headers.get('retry-after')}")
+        return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker of one endpoint."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._requests = 0
+        self._failures = 0
+        self._retries = 0
+        self._rejected = 0
+        self._times_opened = 0
+        self._last_error = ""
+        self._last_retry_delay = 0.0
+
+    def before_request(self, policy: RetryPolicy) -> None:
+        """
+        Admit a request attempt.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half open with its
+                probe request still running.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._open_until - time.monotonic()
+                if remaining > 0:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.endpoint, remaining)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.endpoint, policy.breaker_cooldown)
+                self._probe_in_flight = True
+            self._requests += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit breaker of {self.endpoint} closed")
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, error: BaseException, policy: RetryPolicy) -> None:
+        """Count an endpoint failure; opens the breaker at the policy's threshold."""
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._last_error = f"{type(error).__name__}: {str(error)[:200]}"
+            self._probe_in_flight = False
+            threshold = policy.breaker_threshold
+            if self.state == self.HALF_OPEN or (
+                threshold > 0 and self._consecutive_failures >= threshold
+            ):
+                if self.state != self.OPEN:
+                    self._times_opened += 1
+                    logger.warning(
+                        f"Circuit breaker of {self.endpoint} opened after "
+                        f"{self._consecutive_failures} consecutive failures"
+                    )
+                self.state = self.OPEN
+                self._open_until = time.monotonic() + policy.breaker_cooldown
+
+    def record_other(self) -> None:
+        """End an attempt that failed for reasons other than the endpoint (e.g. cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_retry(self, delay: float) -> None:
+        with self._lock:
+            self._retries += 1
+            self._last_retry_delay = delay
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def get_stats(self) -> dict[str, Any]:
+        """Breaker state and retry counters."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._consecutive_failures,
+                "open_for": max(0.0, self._open_until - time.monotonic())
+                if self.state == self.OPEN
+                else 0.0,
+                "requests": self._requests,
+                "failures": self._failures,
+                "retries": self._retries,
+                "rejected": self._rejected,
+                "times_opened": self._times_opened,
+                "last_error": self._last_error,
+                "last_retry_delay": self._last_retry_delay,
+            }
+
+
+# Breakers are shared by all clients of an endpoint (e.g. agents of parallel tasks)
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Get the process-wide circuit breaker of an endpoint."""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+
+def get_retry_stats() -> dict[str, dict[str, Any]]:
+    """Breaker state and retry counters of every endpoint seen so far."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.endpoint: breaker.get_stats() for breaker in breakers}
+
+
+def call_with_retries(
+    attempt: Callable[[], T],
+    endpoint: str,
+    policy: RetryPolicy,
+    cancel_token: CancellationToken | None = None,
+    on_retry: RetryCallback | None = None,
+) -> T:
+    """
+    Call attempt() until it succeeds or the policy gives up.
+
+    The backoff sleep is interrupted when the cancel token fires.
+
+    Raises:
+        CircuitOpenError: If the endpoint's breaker rejects an attempt.
+        Exception: The last error once the policy gives up.
+    """
+    breaker = get_circuit_breaker(endpoint)
+    number = 0
+    while True:
+        number += 1
+        breaker.before_request(policy)
+        try:
+            result = attempt()
+        except BaseException as e:
+            delay = _after_failure(breaker, policy, number, e)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(number, e, delay)
+            if cancel_token is None:
+                time.sleep(delay)
+            else:
+                cancel_token.wait(delay)
+                cancel_token.raise_if_cancelled()
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retries(
+    attempt: Callable[[], Awaitable[T]],
+    endpoint: str,
+    policy: RetryPolicy,
+    cancel_token: CancellationToken | None = None,
+    on_retry: RetryCallback | None = None,
+) -> T:
+    """Async variant of call_with_retries()."""
+    breaker = get_circuit_breaker(endpoint)
+    number = 0
+    while True:
+        number += 1
+        breaker.before_request(policy)
+        try:
+            result = await attempt()
+        except BaseException as e:
+            delay = _after_failure(breaker, policy, number, e)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(number, e, delay)
+            await _asleep(delay, cancel_token)
+            continue
+        breaker.record_success()
+        return result
+
+
+def _after_failure(
+    breaker: CircuitBreaker, policy: RetryPolicy, number: int, error: BaseException
+) -> float | None:
+    """Record a failed attempt; returns the retry delay, or None to re-raise."""
+    if not isinstance(error, Exception) or not policy.is_retryable(error):
+        breaker.record_other()
+        return None
+    breaker.record_failure(error, policy)
+    if breaker.is_open:
+        return None
+    delay = policy.delay(number, error)
+    if delay is not None:
+        breaker.record_retry(delay)
+    return delay
+
+
+async def _asleep(delay: float, cancel_token: CancellationToken | None) -> None:
+    """Sleep on the event loop, waking early when the cancel token fires."""
+    if cancel_token is None:
+        await asyncio.sleep(delay)
+        return
+    loop = asyncio.get_running_loop()
+    woken = loop.create_future()
+
+    def wake() -> None:
+        if not woken.done():
+            woken.set_result(None)
+
+    unregister = cancel_token.register(lambda: loop.call_soon_threadsafe(wake))
+    try:
+        await asyncio.wait({woken}, timeout=delay)
+    finally:
+        unregister()
+        woken.cancel()
+    cancel_token.raise_if_cancelled()
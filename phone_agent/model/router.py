@@ -0,0 +1,176 @@
+"""Tiered model routing: a fast model for routine steps, the strong model on escalation.
+
+Most agent steps are trivial (Back, Wait, obvious taps) and do not need the
+large model. The router sends steps to a cheap, fast model and escalates to
+the strong model when:
+
+- the fast model's response is unusable (e.g. the action cannot be parsed);
+  the same step is then re-asked to the strong model,
+- the fast model's confidence (geometric mean probability of the action
+  tokens, from logprobs) is below `min_confidence`; same as above,
+- the caller reports trouble, e.g. the agent's loop detection fired.
+
+After an escalation the strong model keeps answering for `escalation_steps`
+steps before routing falls back to the fast model. Every routing decision and
+the latency of each tier is printed, so it shows up in the task logs.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from phone_agent.model.client import ModelClient, ModelResponse
+from phone_agent.model.streaming import ActionCallback
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+
+@dataclass
+class RouterConfig:
+    """Configuration for tiered model routing."""
+
+    # Steps answered by the strong model after an escalation
+    escalation_steps: int = 3
+    # Escalate when the fast model's action confidence is below this (0 = off)
+    min_confidence: float = 0.0
+
+    def __post_init__(self):
+        self.escalation_steps = int(
+            os.getenv("PHONE_AGENT_ROUTER_ESCALATION_STEPS", self.escalation_steps)
+        )
+        self.min_confidence = float(
+            os.getenv("PHONE_AGENT_ROUTER_MIN_CONFIDENCE", self.min_confidence)
+        )
+
+
+class ModelRouter:
+    """
+    Routes agent steps between a fast and a strong model client.
+
+    Args:
+        strong: Client of the strong model.
+        fast: Client of the fast model.
+        config: Routing configuration.
+        validate: Returns why a response is unusable (e.g. unparseable
+            action), or None if it is fine.
+
+    Example:
+        >>> router = ModelRouter(ModelClient(strong_config), ModelClient(fast_config))
+        >>> response = router.request(messages)
+        >>> router.escalate("loop detected")
+    """
+
+    def __init__(
+        self,
+        strong: ModelClient,
+        fast: ModelClient,
+        config: RouterConfig | None = None,
+        validate: Callable[[ModelResponse], str | None] | None = None,
+    ):
+        self.strong = strong
+        self.fast = fast
+        self.settings = config or RouterConfig()
+        self.validate = validate
+        self._escalated_steps = 0
+        if self.settings.min_confidence > 0:
+            # Confidence is derived from the action tokens' logprobs
+            self.fast.config.logprobs = True
+
+    @property
+    def config(self):
+        """Model configuration of the strong tier (the task's primary model)."""
+        return self.strong.config
+
+    def reset(self) -> None:
+        """Forget escalations, e.g. when a new task starts."""
+        self._escalated_steps = 0
+
+    def escalate(self, reason: str, steps: int | None = None) -> None:
+        """Route the next steps to the strong model."""
+        steps = self.settings.escalation_steps if steps is None else steps
+        self._escalated_steps = max(self._escalated_steps, steps)
+        print(
+            f"🔀 模型路由: 升级到强模型 {self.strong.config.model_name}（{reason}），"
+            f"接下来 {steps} 步使用强模型"
+        )
+
+    def request(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Send a step to the current tier, re-asking the strong model if needed."""
+        if self._escalated_steps > 0:
+            self._escalated_steps -= 1
+            return self._timed(TIER_STRONG, self.strong.request, messages, on_action)
+
+        response = self._timed(
+            TIER_FAST, self.fast.request, messages, self._fast_on_action(on_action)
+        )
+        reason = self._escalation_reason(response)
+        if reason is None:
+            return response
+        self.escalate(reason)
+        self._escalated_steps -= 1  # This step is the first of them
+        return self._timed(TIER_STRONG, self.strong.request, messages, on_action)
+
+    async def arequest(
+        self, messages: list[dict[str, Any]], on_action: ActionCallback | None = None
+    ) -> ModelResponse:
+        """Async variant of request()."""
+        if self._escalated_steps > 0:
+            self._escalated_steps -= 1
+            return await self._atimed(TIER_STRONG, self.strong.arequest, messages, on_action)
+
+        response = await self._atimed(
+            TIER_FAST, self.fast.arequest, messages, self._fast_on_action(on_action)
+        )
+        reason = self._escalation_reason(response)
+        if reason is None:
+            return response
+        self.escalate(reason)
+        self._escalated_steps -= 1
+        return await self._atimed(TIER_STRONG, self.strong.arequest, messages, on_action)
+
+    def _fast_on_action(self, on_action: ActionCallback | None) -> ActionCallback | None:
+        # With confidence gating, the fast model's action is only trusted once
+        # the whole response has been checked
+        return None if self.settings.min_confidence > 0 else on_action
+
+    def _escalation_reason(self, response: ModelResponse) -> str | None:
+        if self.validate is not None:
+            reason = self.validate(response)
+            if reason:
+                return reason
+        if (
+            self.settings.min_confidence > 0
+            and response.confidence is not None
+            and response.confidence < self.settings.min_confidence
+        ):
+            return f"置信度低 {response.confidence:.2f} < {self.settings.min_confidence:.2f}"
+        return None
+
+    def _client(self, tier: str) -> ModelClient:
+        return self.strong if tier == TIER_STRONG else self.fast
+
+    def _timed(self, tier: str, request: Callable, messages, on_action) -> ModelResponse:
+        start = time.perf_counter()
+        response = request(messages, on_action)
+        self._report(tier, response, time.perf_counter() - start)
+        return response
+
+    async def _atimed(self, tier: str, arequest: Callable, messages, on_action) -> ModelResponse:
+        start = time.perf_counter()
+        response = await arequest(messages, on_action)
+        self._report(tier, response, time.perf_counter() - start)
+        return response
+
+    def _report(self, tier: str, response: ModelResponse, elapsed: float) -> None:
+        response.tier = tier
+        confidence = (
+            f", 置信度 {response.confidence:.2f}" if response.confidence is not None else ""
+        )
+        print(
+            f"🔀 模型路由: {tier} ({self._client(tier).config.model_name}) "
+            f"用时 {elapsed:.2f}s{confidence}"
+        )
@@ -0,0 +1,155 @@
+"""Incremental parsing helpers for streamed model output."""
+
+import re
+from typing import Callable
+
+# Called with the action call text (e.g. 'do(action="Tap", element=[500, 300])')
+# as soon as it is syntactically complete, before the stream has ended
+ActionCallback = Callable[[str], None]
+
+
+class ActionCallDetector:
+    """
+    Detects the end of a streamed action call such as do(action="Tap", element=[1, 2]).
+
+    Feed the text from the action marker onwards, chunk by chunk. Bracket depth
+    is tracked outside string literals, so the call is reported complete as
+    soon as its closing parenthesis arrives, however the text is split into
+    chunks. Each character is looked at once.
+    """
+
+    _OPENING = "([{"
+    _CLOSING = ")]}"
+
+    def __init__(self):
+        self._parts: list[str] = []
+        self._depth = 0
+        self._quote: str | None = None
+        self._escaped = False
+        self.complete = False
+
+    @property
+    def text(self) -> str:
+        """The call text consumed so far (the full call once complete)."""
+        return "".join(self._parts)
+
+    def feed(self, text: str) -> bool:
+        """
+        Consume the next piece of the call.
+
+        Returns:
+            True once the call is complete; text after the closing parenthesis
+            is ignored.
+        """
+        if self.complete:
+            return True
+        for i, ch in enumerate(text):
+            if self._quote is not None:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch == '"' or ch == "'":
+                self._quote = ch
+            elif ch in self._OPENING:
+                self._depth += 1
+            elif ch in self._CLOSING:
+                self._depth -= 1
+                if self._depth <= 0:
+                    self._parts.append(text[: i + 1])
+                    self.complete = True
+                    return True
+        self._parts.append(text)
+        return False
+
+
+class MarkerScanner:
+    """
+    Incremental multi-marker scanner (Aho-Corasick automaton).
+
+    Finds the first occurrence of any marker in text that arrives in chunks,
+    looking at each character once however the markers are split across
+    chunks. The automaton state doubles as the length of the longest chunk
+    suffix that could still become a marker, which callers hold back instead
+    of re-checking every marker prefix against a growing buffer.
+
+    Example:
+        >>> scanner = MarkerScanner(["do(action=", "finish(message="])
+        >>> scanner.feed("I will tap. do(act")
+        >>> scanner.pending
+        6
+        >>> scanner.feed('ion="Tap"')
+        (4, 'do(action=')
+    """
+
+    def __init__(self, markers: list[str]):
+        self.markers = list(markers)
+        self._state = 0
+        # Trie of the markers: transitions, output marker and depth per state
+        goto: list[dict[str, int]] = [{}]
+        output: list[str | None] = [None]
+        depth = [0]
+        for marker in self.markers:
+            state = 0
+            for ch in marker:
+                if ch not in goto[state]:
+                    goto.append({})
+                    output.append(None)
+                    depth.append(depth[state] + 1)
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            output[state] = marker
+
+        # Breadth-first failure links, folded into a complete transition table
+        # so feeding a character is a single dict lookup
+        fail = [0] * len(goto)
+        delta: list[dict[str, int]] = [dict(goto[0])] + [{} for _ in goto[1:]]
+        queue = list(goto[0].values())
+        while queue:
+            state = queue.pop(0)
+            delta[state] = dict(delta[fail[state]])
+            if output[state] is None:
+                output[state] = output[fail[state]]
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                delta[state][ch] = child
+                queue.append(child)
+        self._delta = delta
+        self._output = output
+        self._depth = depth
+        # Finds the next character that can start a marker (C-speed skipping)
+        self._start = re.compile("|".join(re.escape(ch) for ch in goto[0]))
+
+    @property
+    def pending(self) -> int:
+        """Length of the text suffix seen so far that may be the start of a marker."""
+        return self._depth[self._state]
+
+    def feed(self, text: str) -> tuple[int, str] | None:
+        """
+        Scan the next chunk.
+
+        Returns:
+            (end, marker) for the first completed marker, where end is the index
+            in this chunk just past the marker; None if no marker completed.
+        """
+        delta = self._delta
+        output = self._output
+        state = self._state
+        i = 0
+        n = len(text)
+        while i < n:
+            if state == 0:
+                match = self._start.search(text, i)
+                if match is None:
+                    break
+                i = match.start()
+            state = delta[state].get(text[i], 0)
+            i += 1
+            if output[state] is not None:
+                self._state = 0
+                return i, output[state]
+        self._state = state
+        return None
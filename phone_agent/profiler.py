@@ -0,0 +1,235 @@
+"""Per-step latency profiling for agent runs.
+
+A Timeline collects timed spans (screenshot capture, image decode/compress,
+current app query, screen size, model request, action execution, post-action
+settle, ...) for one task on one device. The active timeline is carried in a
+context variable, so instrumented code anywhere below the agent records into
+it without explicit plumbing, and concurrent agents (threads or asyncio tasks)
+keep separate timelines. When no timeline is active, spans cost next to nothing.
+
+Timelines can be summarized per phase or exported in the Chrome trace event
+format (load in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator
+
+# Span names used by the agent and device layers
+SPAN_STEP = "step"
+SPAN_SCREENSHOT = "screenshot"
+SPAN_SCREENSHOT_CAPTURE = "screenshot.capture"
+SPAN_SCREENSHOT_DECODE = "screenshot.decode"
+SPAN_SCREENSHOT_COMPRESS = "screenshot.compress"
+SPAN_CURRENT_APP = "current_app"
+SPAN_SCREEN_SIZE = "screen_size"
+SPAN_MODEL_QUEUE = "model.queue"
+SPAN_MODEL_TTFT = "model.ttft"
+SPAN_MODEL = "model.total"
+SPAN_ACTION = "action"
+SPAN_SETTLE = "action.settle"
+
+
+@dataclass
+class Span:
+    """A timed phase of an agent step."""
+
+    name: str
+    start: float  # Epoch seconds
+    duration: float  # Seconds
+    step: int
+    track: str  # Thread or asyncio task the span ran on
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class Timeline:
+    """
+    Spans recorded for one task on one device.
+
+    Args:
+        task_id: Task the timeline belongs to.
+        device_id: Device the agent ran on.
+    """
+
+    def __init__(self, task_id: str | None = None, device_id: str | None = None):
+        self.task_id = task_id
+        self.device_id = device_id
+        self.created_at = time.time()
+        self.step = 0  # Current agent step, set by the agent
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, duration: float, **args: Any) -> None:
+        """Record a span that has already been measured."""
+        span = Span(
+            name=name,
+            start=start,
+            duration=max(0.0, duration),
+            step=self.step,
+            track=_current_track(),
+            args=args,
+        )
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Per-phase totals: count, total and average seconds, sorted by total."""
+        totals: dict[str, dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            entry = totals.setdefault(span.name, {"count": 0, "total": 0.0})
+            entry["count"] += 1
+            entry["total"] += span.duration
+        for entry in totals.values():
+            entry["avg"] = entry["total"] / entry["count"]
+        return dict(sorted(totals.items(), key=lambda item: -item[1]["total"]))
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            spans = [asdict(span) for span in self.spans]
+        return {
+            "task_id": self.task_id,
+            "device_id": self.device_id,
+            "created_at": self.created_at,
+            "steps": self.step,
+            "summary": self.summary(),
+            "spans": spans,
+        }
+
+    def to_chrome_trace(self, pid: int = 1) -> dict[str, Any]:
+        """
+        Export as Chrome trace events (complete 'X' events, microseconds).
+
+        Args:
+            pid: Process ID to show the device as; use distinct values when
+                merging the traces of several devices.
+        """
+        tids: dict[str, int] = {}
+        events: list[dict[str, Any]] = [{
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": self.device_id or "device"},
+        }]
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span.track not in tids:
+                tids[span.track] = len(tids) + 1
+                events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tids[span.track],
+                    "args": {"name": span.track},
+                })
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".", 1)[0],
+                "ph": "X",
+                "ts": int(span.start * 1_000_000),
+                "dur": int(span.duration * 1_000_000),
+                "pid": pid,
+                "tid": tids[span.track],
+                "args": {"step": span.step, **span.args},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_current_timeline: contextvars.ContextVar[Timeline | None] = contextvars.ContextVar(
+    "current_timeline", default=None
+)
+
+
+def current_timeline() -> Timeline | None:
+    """Get the timeline spans are currently recorded into, if any."""
+    return _current_timeline.get()
+
+
+def set_timeline(timeline: Timeline | None) -> contextvars.Token:
+    """Make a timeline current for this context; pass the token to reset_timeline."""
+    return _current_timeline.set(timeline)
+
+
+def reset_timeline(token: contextvars.Token) -> None:
+    _current_timeline.reset(token)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Time the enclosed block into the current timeline (no-op without one)."""
+    timeline = _current_timeline.get()
+    if timeline is None:
+        yield
+        return
+    start_wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timeline.record(name, start_wall, time.perf_counter() - start, **args)
+
+
+def record_span(name: str, start: float, duration: float, **args: Any) -> None:
+    """Record an already measured span into the current timeline, if any."""
+    timeline = _current_timeline.get()
+    if timeline is not None:
+        timeline.record(name, start, duration, **args)
+
+
+def _current_track() -> str:
+    try:
+        import asyncio
+
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return task.get_name()
+    return threading.current_thread().name
+
+
+class TimelineStore:
+    """
+    Keeps the timelines of recent tasks in memory.
+
+    Args:
+        max_tasks: Number of most recent tasks to keep.
+    """
+
+    def __init__(self, max_tasks: int = 50):
+        self.max_tasks = max_tasks
+        self._tasks: "OrderedDict[str, dict[str, Timeline]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str, device_id: str | None) -> Timeline:
+        """Create and store the timeline of a task on a device."""
+        timeline = Timeline(task_id, device_id)
+        with self._lock:
+            self._tasks.setdefault(task_id, {})[device_id or ""] = timeline
+            self._tasks.move_to_end(task_id)
+            while len(self._tasks) > self.max_tasks:
+                self._tasks.popitem(last=False)
+        return timeline
+
+    def get(self, task_id: str) -> dict[str, Timeline]:
+        """Timelines of a task, keyed by device ID."""
+        with self._lock:
+            return dict(self._tasks.get(task_id, {}))
+
+
+# Global timeline store instance
+_timeline_store: TimelineStore | None = None
+
+
+def get_timeline_store() -> TimelineStore:
+    """Get the global timeline store."""
+    global _timeline_store
+    if _timeline_store is None:
+        _timeline_store = TimelineStore()
+    return _timeline_store
@@ -0,0 +1,303 @@
+"""Trajectory replay cache for repeated tasks.
+
+Scheduled tasks usually run the same instruction on the same device every
+time. When a run succeeds, its step-by-step actions are recorded together with
+a perceptual hash of the screen each action was decided on. On the next run,
+a step whose screen (and foreground app) matches the recording is replayed
+directly instead of asking the model again. The first mismatch hands control
+back to the model for the rest of the run.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Actions that only depend on the screen and are safe to replay. finish() and
+# the human-in-the-loop actions always go through the model.
+REPLAYABLE_ACTIONS = {
+    "Launch",
+    "Tap",
+    "Type",
+    "Type_Name",
+    "Swipe",
+    "Back",
+    "Home",
+    "Double Tap",
+    "Long Press",
+    "Wait",
+}
+
+
+@dataclass
+class TrajectoryCacheConfig:
+    """Configuration for the trajectory replay cache."""
+
+    db_path: str = str(Path.home() / ".autoglm" / "trajectory_cache.db")
+    max_entries: int = 200  # Least recently used trajectories beyond this are evicted
+    ttl_hours: float = 168.0  # Trajectories unused for this long are evicted
+    hash_threshold: int = 6  # Max Hamming distance (of 64 bits) for a screen match
+
+    def __post_init__(self):
+        """Load values from environment variables if present."""
+        self.db_path = os.getenv("PHONE_AGENT_TRAJECTORY_CACHE_DB", self.db_path)
+        self.max_entries = int(
+            os.getenv("PHONE_AGENT_TRAJECTORY_CACHE_MAX_ENTRIES", self.max_entries)
+        )
+        self.ttl_hours = float(
+            os.getenv("PHONE_AGENT_TRAJECTORY_CACHE_TTL_HOURS", self.ttl_hours)
+        )
+        self.hash_threshold = int(
+            os.getenv("PHONE_AGENT_TRAJECTORY_CACHE_THRESHOLD", self.hash_threshold)
+        )
+
+
+@dataclass
+class TrajectoryStep:
+    """A single recorded step of a successful run."""
+
+    screen_hash: int
+    current_app: str
+    thinking: str
+    action: str  # Raw action string as returned by the model
+
+    def to_dict(self) -> dict:
+        return {
+            "screen_hash": f"{self.screen_hash:016x}",
+            "current_app": self.current_app,
+            "thinking": self.thinking,
+            "action": self.action,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TrajectoryStep":
+        return cls(
+            screen_hash=int(data["screen_hash"], 16),
+            current_app=data.get("current_app", ""),
+            thinking=data.get("thinking", ""),
+            action=data["action"],
+        )
+
+
+def screen_hash(image_data: bytes) -> int:
+    """
+    Compute a 64-bit difference hash (dHash) of an encoded screenshot.
+
+    Small rendering differences (clock, battery, notification badges) only flip
+    a few bits, while a different screen changes most of them.
+    """
+    img = Image.open(io.BytesIO(image_data))
+    img = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(img.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+def task_key(task: str) -> str:
+    """Stable cache key for a task instruction."""
+    return hashlib.sha256(task.strip().encode("utf-8")).hexdigest()
+
+
+class TrajectoryCache:
+    """SQLite-backed store of successful trajectories keyed by (task, device)."""
+
+    def __init__(self, config: TrajectoryCacheConfig | None = None):
+        self.config = config or TrajectoryCacheConfig()
+        self.db_path = Path(self.config.db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._init_db()
+
+    @contextmanager
+    def _get_conn(self):
+        """Get a database connection with context management."""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        """Initialize database schema."""
+        with self._get_conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trajectories (
+                    task_key TEXT NOT NULL,
+                    device_id TEXT NOT NULL,
+                    steps TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hit_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (task_key, device_id)
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trajectories_last_used ON trajectories(last_used)"
+            )
+
+    def load(self, task: str, device_id: str | None) -> list[TrajectoryStep]:
+        """Load the recorded trajectory for a task on a device (empty if none)."""
+        cutoff = time.time() - self.config.ttl_hours * 3600
+        with self._get_conn() as conn:
+            row = conn.execute(
+                "SELECT steps FROM trajectories WHERE task_key = ? AND device_id = ? AND last_used >= ?",
+                (task_key(task), device_id or "", cutoff),
+            ).fetchone()
+        if not row:
+            return []
+        try:
+            return [TrajectoryStep.from_dict(s) for s in json.loads(row[0])]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Discarding corrupt trajectory: {e}")
+            self.invalidate(task, device_id)
+            return []
+
+    def match(
+        self, step: TrajectoryStep | None, current_hash: int, current_app: str
+    ) -> bool:
+        """Check whether a recorded step applies to the current screen."""
+        matched = (
+            step is not None
+            and step.current_app == current_app
+            and hamming_distance(step.screen_hash, current_hash) <= self.config.hash_threshold
+        )
+        with self._stats_lock:
+            if matched:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return matched
+
+    def store(
+        self, task: str, device_id: str | None, steps: list[TrajectoryStep], hits: int = 0
+    ) -> None:
+        """
+        Store the trajectory of a successful run, replacing any previous one.
+
+        Args:
+            task: Task instruction.
+            device_id: Device the run executed on.
+            steps: Recorded steps of the run.
+            hits: Number of steps of this run that were replayed from the cache.
+        """
+        if not steps:
+            return
+        now = time.time()
+        with self._get_conn() as conn:
+            conn.execute(
+                "INSERT INTO trajectories "
+                "(task_key, device_id, steps, created_at, last_used, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (task_key, device_id) DO UPDATE SET "
+                "steps = excluded.steps, last_used = excluded.last_used, "
+                "hit_count = hit_count + excluded.hit_count",
+                (
+                    task_key(task),
+                    device_id or "",
+                    json.dumps([s.to_dict() for s in steps], ensure_ascii=False),
+                    now,
+                    now,
+                    hits,
+                ),
+            )
+            self._evict(conn, now)
+
+    def invalidate(self, task: str | None = None, device_id: str | None = None) -> int:
+        """
+        Drop recorded trajectories.
+
+        Args:
+            task: Task instruction to invalidate; None for all tasks.
+            device_id: Restrict to one device; None for all devices.
+
+        Returns:
+            Number of trajectories removed.
+        """
+        query = "DELETE FROM trajectories WHERE 1 = 1"
+        params: list = []
+        if task is not None:
+            query += " AND task_key = ?"
+            params.append(task_key(task))
+        if device_id is not None:
+            query += " AND device_id = ?"
+            params.append(device_id)
+        with self._get_conn() as conn:
+            return conn.execute(query, params).rowcount
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Apply the TTL and LRU size limit."""
+        conn.execute(
+            "DELETE FROM trajectories WHERE last_used < ?",
+            (now - self.config.ttl_hours * 3600,),
+        )
+        conn.execute(
+            "DELETE FROM trajectories WHERE rowid NOT IN ("
+            "SELECT rowid FROM trajectories ORDER BY last_used DESC LIMIT ?)",
+            (self.config.max_entries,),
+        )
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._get_conn() as conn:
+            entries, replayed = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit_count), 0) FROM trajectories"
+            ).fetchone()
+        with self._stats_lock:
+            return {
+                "entries": entries,
+                "replayed_steps": replayed,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Global cache instance, created on first use
+_trajectory_cache: TrajectoryCache | None = None
+_trajectory_cache_lock = threading.Lock()
+
+
+def get_trajectory_cache() -> TrajectoryCache:
+    """Get the global trajectory cache."""
+    global _trajectory_cache
+    with _trajectory_cache_lock:
+        if _trajectory_cache is None:
+            _trajectory_cache = TrajectoryCache()
+        return _trajectory_cache
+
+
+__all__ = [
+    "REPLAYABLE_ACTIONS",
+    "TrajectoryCache",
+    "TrajectoryCacheConfig",
+    "TrajectoryStep",
+    "get_trajectory_cache",
+    "hamming_distance",
+    "screen_hash",
+]
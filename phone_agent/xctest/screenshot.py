@@ -5,57 +5,11 @@ import os
 import subprocess
 import tempfile
 import uuid
-from dataclasses import dataclass
 from io import BytesIO
 
 from PIL import Image
 
-from phone_agent.config.screenshot import SCREENSHOT_CONFIG
-
-
-def _compress_image(img: Image.Image) -> tuple[str, int, int]:
-    """
-    Compress an image for API transmission.
-    
-    - Resizes if larger than configured max dimension
-    - Converts to JPEG with configured quality
-    - Returns base64 encoded data and dimensions
-    """
-    width, height = img.size
-    
-    # Resize if too large (use configured max dimension)
-    max_dimension = SCREENSHOT_CONFIG.max_image_dimension
-    if width > max_dimension or height > max_dimension:
-        ratio = min(max_dimension / width, max_dimension / height)
-        new_width = int(width * ratio)
-        new_height = int(height * ratio)
-        img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        width, height = new_width, new_height
-    
-    # Convert RGBA to RGB (JPEG doesn't support alpha channel)
-    if img.mode == 'RGBA':
-        background = Image.new('RGB', img.size, (255, 255, 255))
-        background.paste(img, mask=img.split()[3])
-        img = background
-    elif img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # Compress as JPEG (use configured quality)
-    buffered = BytesIO()
-    img.save(buffered, format="JPEG", quality=SCREENSHOT_CONFIG.jpeg_quality, optimize=True)
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    
-    return base64_data, width, height
-
-
-@dataclass
-class Screenshot:
-    """Represents a captured screenshot."""
-
-    base64_data: str
-    width: int
-    height: int
-    is_sensitive: bool = False
+from phone_agent.imaging import Screenshot, encode_bytes, fallback_screenshot
 
 
 def get_screenshot(
@@ -74,7 +28,7 @@ def get_screenshot(
         timeout: Timeout in seconds for screenshot operations.
 
     Returns:
-        Screenshot object containing base64 data and dimensions.
+        Screenshot object containing the encoded image and dimensions.
 
     Note:
         Tries WebDriverAgent first, falls back to idevicescreenshot if available.
@@ -121,16 +75,9 @@ def _get_screenshot_wda(
 
             if base64_data:
                 # Decode and compress image
-                img_data = base64.b64decode(base64_data)
-                img = Image.open(BytesIO(img_data))
-                compressed_data, width, height = _compress_image(img)
-
-                return Screenshot(
-                    base64_data=compressed_data,
-                    width=width,
-                    height=height,
-                    is_sensitive=False,
-                )
+                encoded = encode_bytes(base64.b64decode(base64_data))
+                if encoded is not None:
+                    return Screenshot.from_encoded(encoded)
 
     except ImportError:
         print("Note: requests library not installed. Install: pip install requests")
@@ -169,15 +116,14 @@ def _get_screenshot_idevice(
 
         if result.returncode == 0 and os.path.exists(temp_path):
             # Read and compress image
-            img = Image.open(temp_path)
-            base64_data, width, height = _compress_image(img)
+            with open(temp_path, "rb") as f:
+                encoded = encode_bytes(f.read())
 
             # Cleanup
             os.remove(temp_path)
 
-            return Screenshot(
-                base64_data=base64_data, width=width, height=height, is_sensitive=False
-            )
+            if encoded is not None:
+                return Screenshot.from_encoded(encoded)
 
     except FileNotFoundError:
         print(
@@ -200,19 +146,7 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
         Screenshot object with black image.
     """
     # Default iPhone screen size (iPhone 14 Pro)
-    default_width, default_height = 1179, 2556
-
-    black_img = Image.new("RGB", (default_width, default_height), color="black")
-    buffered = BytesIO()
-    black_img.save(buffered, format="PNG")
-    base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-    return Screenshot(
-        base64_data=base64_data,
-        width=default_width,
-        height=default_height,
-        is_sensitive=is_sensitive,
-    )
+    return fallback_screenshot(is_sensitive, (1179, 2556))
 
 
 def save_screenshot(
@@ -230,8 +164,7 @@ def save_screenshot(
         True if successful, False otherwise.
     """
     try:
-        img_data = base64.b64decode(screenshot.base64_data)
-        img = Image.open(BytesIO(img_data))
+        img = Image.open(BytesIO(screenshot.data))
         img.save(file_path)
         return True
     except Exception as e:
@@ -257,7 +190,4 @@ def get_screenshot_png(
     """
     screenshot = get_screenshot(wda_url, session_id, device_id)
 
-    try:
-        return base64.b64decode(screenshot.base64_data)
-    except Exception:
-        return None
+    return bytes(screenshot.data) if screenshot else None
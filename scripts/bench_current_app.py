@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark foreground-app resolution on 'dumpsys window' output.
+
+Compares the previous parser (split every line of the full dump and substring
+match each focus line against all of APP_PACKAGES) with the current one (regex
+on the focus lines + reverse package index), on both the full dump and the
+grep-filtered output the device now returns.
+
+Record real output from a device for representative numbers:
+  adb shell dumpsys window > dumpsys_window.txt
+
+Usage:
+  python3 scripts/bench_current_app.py
+  python3 scripts/bench_current_app.py --input dumpsys_window.txt --runs 500
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.adb.device import parse_current_app
+from phone_agent.config.apps import APP_PACKAGES
+
+
+def parse_current_app_legacy(output: str) -> str:
+    """The parser get_current_app used before the reverse index."""
+    if not output:
+        raise ValueError("No output from dumpsys window")
+    for line in output.split("\n"):
+        if "mCurrentFocus" in line or "mFocusedApp" in line:
+            for app_name, package in APP_PACKAGES.items():
+                if package in line:
+                    return app_name
+    return "System Home"
+
+
+def synthetic_dump(package: str, windows: int = 400) -> str:
+    """A 'dumpsys window'-shaped dump with many windows and the focus near the end."""
+    lines = ["WINDOW MANAGER POLICY STATE (dumpsys window policy)"]
+    for i in range(windows):
+        lines += [
+            f"  Window #{i} Window{{{i:x}a1b2 u0 com.example.app{i}/.MainActivity}}:",
+            f"    mDisplayId=0 rootTaskId={i} mSession=Session{{{i:x} 1234:u0a{i}}}",
+            "    mOwnerUid=10123 showForAllUsers=false package=com.example mAppOp=NONE",
+            "    mAttrs={(0,0)(fillxfill) sim={adjust=pan} ty=BASE_APPLICATION fmt=TRANSLUCENT}",
+            "    Requested w=1080 h=2400 mLayoutSeq=1234 mHasSurface=true isReadyForDisplay()=true",
+        ]
+    lines += [
+        f"  mCurrentFocus=Window{{5f3a2b u0 {package}/{package}.ui.LauncherUI}}",
+        f"  mFocusedApp=ActivityRecord{{7c1d u0 {package}/.ui.LauncherUI t42}}",
+        "  mInputMethodTarget=null",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def focus_lines(dump: str) -> str:
+    """What 'dumpsys window | grep -E ...' returns on the device."""
+    return "".join(
+        line + "\n" for line in dump.splitlines() if re.search("mCurrentFocus|mFocusedApp", line)
+    )
+
+
+def bench(fn, data: str, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(data)
+    return (time.perf_counter() - start) / runs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--input", help="Recorded 'adb shell dumpsys window' output")
+    parser.add_argument("--package", default="com.whatsapp", help="Focused package of the synthetic dump")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, encoding="utf-8", errors="ignore") as f:
+            dump = f.read()
+    else:
+        dump = synthetic_dump(args.package)
+    grepped = focus_lines(dump)
+
+    legacy = parse_current_app_legacy(dump)
+    current = parse_current_app(dump)
+    print(f"dump: {len(dump) / 1024:.0f} KB, focus lines: {len(grepped)} B, apps: {len(APP_PACKAGES)}")
+    print(f"resolved: legacy={legacy!r} current={current!r}")
+    if legacy != current:
+        print("WARNING: parsers disagree")
+
+    results = [
+        ("legacy, full dump", bench(parse_current_app_legacy, dump, args.runs)),
+        ("current, full dump", bench(parse_current_app, dump, args.runs)),
+        ("current, focus lines", bench(parse_current_app, grepped, args.runs * 50)),
+    ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:<24} {seconds * 1e6:10.1f} us   x{baseline / seconds:7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark screenshot resize/encode settings: latency, bytes and SSIM.
+
+Every combination of resample filter, image format and JPEG optimize pass is
+run over the sample screenshots through phone_agent.imaging.encode_bytes (the
+path the agent uses). The first row is the baseline: the per-backend
+_compress_image the encoder replaced (full decode, lanczos, white composite,
+optimized JPEG, base64); the speedup column is relative to it. SSIM is
+measured against a lanczos resize of the original to the same size, so it
+scores both the filter and the encoder.
+
+Sample screenshots are the PNG/JPEG files of --samples (e.g. captured with
+'adb exec-out screencap -p > shot.png'); without it, synthetic UI frames are
+used.
+
+Usage:
+  python3 scripts/bench_imaging.py
+  python3 scripts/bench_imaging.py --samples ./screenshots --max-dimension 1280 --runs 5
+"""
+import argparse
+import base64
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageMath
+
+from phone_agent.imaging import RESAMPLE_FILTERS, EncodeOptions, encode_bytes, fit_size
+
+# SSIM constants for 8-bit images (K1=0.01, K2=0.03)
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def synthetic_samples(width: int, height: int, count: int = 3) -> list[tuple[str, bytes]]:
+    """UI-like frames (cards, avatars, text) as 'screencap -p' PNG output."""
+    samples = []
+    for n in range(count):
+        img = Image.new("RGBA", (width, height), (245, 245, 245, 255))
+        draw = ImageDraw.Draw(img)
+        for i, y in enumerate(range(20 * n, height, 160)):
+            draw.rectangle((40, y + 20, width - 40, y + 140), fill=(255, 255, 255, 255))
+            draw.ellipse((60, y + 40, 140, y + 120), fill=((30 * i + 70 * n) % 255, 120, 200, 255))
+            draw.text((170, y + 50), f"Conversation {i} - the quick brown fox", fill=(20, 20, 20, 255))
+            draw.text((170, y + 80), "jumps over the lazy dog 12:34", fill=(120, 120, 120, 255))
+        buffered = BytesIO()
+        img.save(buffered, format="PNG")
+        samples.append((f"synthetic-{n}", buffered.getvalue()))
+    return samples
+
+
+def load_samples(directory: str) -> list[tuple[str, bytes]]:
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+            with open(os.path.join(directory, name), "rb") as f:
+                samples.append((name, f.read()))
+    return samples
+
+
+def ssim(a: Image.Image, b: Image.Image, block: int = 8) -> float:
+    """
+    Mean SSIM of the luma of two equally sized images over block x block windows.
+
+    Local means come from a box reduce, so no numpy is needed.
+    """
+    x = a.convert("L").convert("F")
+    y = b.convert("L").convert("F")
+    size = (max(1, x.width // block), max(1, x.height // block))
+    x, y = x.crop((0, 0, size[0] * block, size[1] * block)), y.crop((0, 0, size[0] * block, size[1] * block))
+
+    def mean(img: Image.Image) -> Image.Image:
+        return img.reduce(block)
+
+    mx, my = mean(x), mean(y)
+    mxx = mean(ImageMath.lambda_eval(lambda v: v["a"] * v["a"], a=x))
+    myy = mean(ImageMath.lambda_eval(lambda v: v["a"] * v["a"], a=y))
+    mxy = mean(ImageMath.lambda_eval(lambda v: v["a"] * v["b"], a=x, b=y))
+    ssim_map = ImageMath.lambda_eval(
+        lambda v: ((2 * v["mx"] * v["my"] + _C1) * (2 * (v["mxy"] - v["mx"] * v["my"]) + _C2))
+        / ((v["mx"] * v["mx"] + v["my"] * v["my"] + _C1)
+           * ((v["mxx"] - v["mx"] * v["mx"]) + (v["myy"] - v["my"] * v["my"]) + _C2)),
+        mx=mx, my=my, mxx=mxx, myy=myy, mxy=mxy,
+    )
+    # Reducing by the full size averages the whole map into one pixel
+    return ssim_map.reduce(ssim_map.size).getpixel((0, 0))
+
+
+def reference(data: bytes, max_dimension: int) -> Image.Image:
+    """Full-quality lanczos resize of a sample, the SSIM reference."""
+    img = Image.open(BytesIO(data)).convert("RGB")
+    return img.resize(fit_size(img.width, img.height, max_dimension), Image.Resampling.LANCZOS)
+
+
+def legacy_compress(data: bytes, options: EncodeOptions) -> bytes:
+    """The _compress_image the backends used before phone_agent.imaging."""
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    if width > options.max_dimension or height > options.max_dimension:
+        img = img.resize(fit_size(width, height, options.max_dimension), Image.Resampling.LANCZOS)
+    if img.mode == "RGBA":
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[3])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    buffered = BytesIO()
+    img.save(buffered, format="JPEG", quality=options.quality, optimize=True)
+    base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return buffered.getvalue()
+
+
+def current_encode(data: bytes, options: EncodeOptions) -> bytes:
+    """phone_agent.imaging, including the (lazy) base64 of the request."""
+    encoded = encode_bytes(data, options)
+    base64.b64encode(encoded.data).decode("ascii")
+    return encoded.data
+
+
+def bench(samples: list[tuple[str, bytes]], options: EncodeOptions, runs: int,
+          references: list[Image.Image], encode=current_encode) -> tuple[float, float, float]:
+    seconds, sizes, scores = 0.0, 0, 0.0
+    for (_, data), ref in zip(samples, references):
+        encoded = encode(data, options)  # Warm-up
+        start = time.perf_counter()
+        for _ in range(runs):
+            encoded = encode(data, options)
+        seconds += (time.perf_counter() - start) / runs
+        sizes += len(encoded)
+        decoded = Image.open(BytesIO(encoded))
+        if decoded.size != ref.size:
+            decoded = decoded.resize(ref.size)
+        scores += ssim(ref, decoded)
+    count = len(samples)
+    return seconds / count, sizes / count, scores / count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--samples", help="Directory of sample screenshots (PNG/JPEG)")
+    parser.add_argument("--width", type=int, default=1080, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=2400, help="Synthetic frame height")
+    parser.add_argument("--max-dimension", type=int, default=1920)
+    parser.add_argument("--quality", type=int, default=70)
+    parser.add_argument("--filters", default="lanczos,bicubic,bilinear,box",
+                        help=f"Comma-separated resample filters ({', '.join(RESAMPLE_FILTERS)})")
+    parser.add_argument("--formats", default="jpeg,webp", help="Comma-separated image formats")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples) if args.samples else synthetic_samples(args.width, args.height)
+    if not samples:
+        print(f"No screenshots in {args.samples}")
+        return 1
+    references = [reference(data, args.max_dimension) for _, data in samples]
+    print(f"{len(samples)} samples, max dimension {args.max_dimension}, quality {args.quality}")
+    print(f"{'filter':<10}{'format':<8}{'optimize':<10}{'latency':>12}{'size':>12}{'ssim':>10}")
+
+    options = EncodeOptions(max_dimension=args.max_dimension, quality=args.quality, optimize=True)
+    baseline, size, score = bench(samples, options, args.runs, references, legacy_compress)
+    print(
+        f"{'baseline':<10}{'jpeg':<8}{'True':<10}"
+        f"{baseline * 1000:9.1f} ms{size / 1024:9.1f} KB{score:10.4f}   x{1:5.2f}"
+    )
+
+    for resample in args.filters.split(","):
+        for image_format in args.formats.split(","):
+            for optimize in ((False, True) if image_format == "jpeg" else (False,)):
+                options = EncodeOptions(
+                    max_dimension=args.max_dimension,
+                    quality=args.quality,
+                    image_format=image_format,
+                    resample=resample,
+                    optimize=optimize,
+                )
+                seconds, size, score = bench(samples, options, args.runs, references)
+                print(
+                    f"{resample:<10}{image_format:<8}{str(optimize):<10}"
+                    f"{seconds * 1000:9.1f} ms{size / 1024:9.1f} KB{score:10.4f}   x{baseline / seconds:5.2f}"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the per-step wall clock of the serial and pipelined agent loops.
+
+Device and model latencies are simulated with sleeps so the comparison is
+reproducible without a phone or an inference server. The defaults mirror what
+we measure on the device farm; override them to match your own setup.
+
+Usage:
+  python3 scripts/bench_pipelined_step.py
+  python3 scripts/bench_pipelined_step.py --steps 20 --model 2.5 --screenshot 1.2
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import phone_agent.device_factory as device_factory_module
+from phone_agent import PhoneAgent
+from phone_agent.adb import unlock
+from phone_agent.adb.screenshot import Screenshot
+from phone_agent.agent import AgentConfig
+from phone_agent.config.timing import TIMING_CONFIG
+from phone_agent.device_factory import DeviceFactory, DeviceType
+from phone_agent.model.client import ModelResponse
+
+
+class SimulatedDevice(DeviceFactory):
+    """Device factory whose operations only sleep for a fixed latency."""
+
+    def __init__(self, args):
+        super().__init__(DeviceType.ADB)
+        self.args = args
+
+    def get_screenshot(self, device_id=None, timeout=10):
+        time.sleep(self.args.screenshot)
+        return Screenshot(data=b"", width=1080, height=2400)
+
+    def get_current_app(self, device_id=None):
+        time.sleep(self.args.current_app)
+        return "System Home"
+
+    def tap(self, x, y, device_id=None, delay=None):
+        time.sleep(self.args.action + TIMING_CONFIG.device.default_tap_delay)
+
+    def detect_and_set_adb_keyboard(self, device_id=None):
+        return ""
+
+    def restore_keyboard(self, ime, device_id=None):
+        return None
+
+
+class SimulatedModel:
+    """Model client that answers with a tap until the last step."""
+
+    def __init__(self, latency: float, steps: int):
+        self.latency = latency
+        self.steps = steps
+        self.calls = 0
+
+    def request(self, messages, on_action=None):
+        time.sleep(self.latency)
+        self.calls += 1
+        if self.calls >= self.steps:
+            action = 'finish(message="done")'
+        else:
+            action = 'do(action="Tap", element=[500, 500])'
+        return ModelResponse(thinking="", action=action, raw_content=action)
+
+
+def run_once(args, pipelined: bool) -> float:
+    agent = PhoneAgent(agent_config=AgentConfig(verbose=False, pipelined=pipelined))
+    agent.model_client = SimulatedModel(args.model, args.steps)
+    # Installed after the agent is built: importing the web rules on first use
+    # resets the global factory to a real ADB one
+    device_factory_module._device_factory = SimulatedDevice(args)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        message = agent.run("benchmark")
+    elapsed = time.perf_counter() - start
+    agent.cleanup()
+    # A run that stopped early (e.g. on a model error) would report a
+    # plausible but meaningless time per step
+    if message.startswith("Model error") or agent.step_count != args.steps:
+        raise RuntimeError(
+            f"Benchmark run ended after {agent.step_count}/{args.steps} steps: {message}"
+        )
+    return elapsed / agent.step_count
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--steps", type=int, default=10, help="steps per run")
+    ap.add_argument("--runs", type=int, default=3, help="runs per mode")
+    ap.add_argument("--model", type=float, default=2.0, help="model round trip (s)")
+    ap.add_argument("--screenshot", type=float, default=0.8, help="screencap + compress (s)")
+    ap.add_argument("--current-app", type=float, default=0.3, help="dumpsys window (s)")
+    ap.add_argument("--screen-size", type=float, default=0.4, help="wm size + rotation (s)")
+    ap.add_argument("--action", type=float, default=0.1, help="input command (s)")
+    ap.add_argument("--settle", type=float, default=1.0, help="post-action sleep (s)")
+    args = ap.parse_args()
+
+    TIMING_CONFIG.device.default_tap_delay = args.settle
+    TIMING_CONFIG.action.keyboard_switch_delay = 0
+    TIMING_CONFIG.action.keyboard_restore_delay = 0
+
+    def simulated_screen_size(device_id):
+        time.sleep(args.screen_size)
+        return 1080, 2400
+
+    unlock.get_screen_size = simulated_screen_size
+
+    results = {}
+    for label, pipelined in (("serial", False), ("pipelined", True)):
+        samples = [run_once(args, pipelined) for _ in range(args.runs)]
+        results[label] = min(samples)
+        print(f"{label:>10}: {results[label]:.3f}s/step (best of {args.runs})")
+
+    saving = results["serial"] - results["pipelined"]
+    print(f"{'saving':>10}: {saving:.3f}s/step ({saving / results['serial'] * 100:.1f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark the PNG and raw screenshot capture paths.
+
+The PNG path runs 'screencap -p' (PNG encode on the device), decodes the PNG
+on the host, resizes and re-encodes as JPEG. The raw path transfers the
+uncompressed frame ('screencap'), wraps it with Image.frombuffer and goes
+straight to resize and JPEG.
+
+With --device, both paths capture from the phone, so device-side encoding
+and the transfer are included (the raw frame is ~10 MB at 1080x2400, so it
+wins on slow phones over USB but may lose over Wi-Fi adb). Without a device,
+a synthetic frame measures the host-side work only, plus the PNG encode the
+device would do.
+
+Usage:
+  python3 scripts/bench_screenshot_capture.py
+  python3 scripts/bench_screenshot_capture.py --device emulator-5554 --runs 10
+"""
+import argparse
+import os
+import struct
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from phone_agent.adb.screenshot import _screenshot_from_png, _screenshot_from_raw
+
+
+def synthetic_frames(width: int, height: int) -> tuple[bytes, bytes]:
+    """A UI-like frame as 'screencap -p' (PNG) and 'screencap' (raw RGBA) output."""
+    img = Image.new("RGBA", (width, height), (245, 245, 245, 255))
+    draw = ImageDraw.Draw(img)
+    for i, y in enumerate(range(0, height, 160)):
+        draw.rectangle((40, y + 20, width - 40, y + 140), fill=(255, 255, 255, 255))
+        draw.ellipse((60, y + 40, 140, y + 120), fill=(30 * i % 255, 120, 200, 255))
+        draw.text((170, y + 60), f"Conversation {i} - the quick brown fox", fill=(20, 20, 20, 255))
+    png = BytesIO()
+    img.save(png, format="PNG")
+    raw = struct.pack("<IIII", width, height, 1, 0) + img.tobytes()
+    return png.getvalue(), raw
+
+
+def capture(device: str, raw: bool) -> tuple[bytes, float]:
+    args = ["adb", "-s", device, "exec-out", "screencap"] + ([] if raw else ["-p"])
+    start = time.perf_counter()
+    result = subprocess.run(args, capture_output=True, timeout=30)
+    return result.stdout, time.perf_counter() - start
+
+
+def bench_device(device: str, runs: int) -> None:
+    for name, raw, process in (
+        ("png", False, _screenshot_from_png),
+        ("raw", True, _screenshot_from_raw),
+    ):
+        capture_times, process_times, sizes = [], [], []
+        for _ in range(runs):
+            data, seconds = capture(device, raw)
+            start = time.perf_counter()
+            screenshot = process(data, time.time())
+            process_times.append(time.perf_counter() - start)
+            capture_times.append(seconds)
+            sizes.append(len(data))
+            if screenshot is None:
+                print(f"{name}: unreadable output ({len(data)} bytes)")
+                return
+        capture_ms = sum(capture_times) / runs * 1000
+        process_ms = sum(process_times) / runs * 1000
+        print(
+            f"{name:<4} capture {capture_ms:8.1f} ms   host {process_ms:7.1f} ms   "
+            f"total {capture_ms + process_ms:8.1f} ms   {sum(sizes) / runs / 1024:8.0f} KB"
+        )
+
+
+def bench_synthetic(width: int, height: int, runs: int) -> None:
+    png, raw = synthetic_frames(width, height)
+    frame = Image.frombuffer("RGBA", (width, height), raw[16:], "raw", "RGBA", 0, 1)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        frame.save(BytesIO(), format="PNG")
+    encode = (time.perf_counter() - start) / runs
+
+    results = []
+    for name, data, process in (("png", png, _screenshot_from_png), ("raw", raw, _screenshot_from_raw)):
+        start = time.perf_counter()
+        for _ in range(runs):
+            process(data, time.time())
+        results.append((name, (time.perf_counter() - start) / runs, len(data)))
+
+    print(f"frame {width}x{height}, PNG encode (device side, host CPU): {encode * 1000:.1f} ms")
+    baseline = results[0][1]
+    for name, seconds, size in results:
+        print(f"{name:<4} host {seconds * 1000:8.1f} ms   {size / 1024:8.0f} KB   x{baseline / seconds:5.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--device", help="ADB device ID to capture from")
+    parser.add_argument("--width", type=int, default=1080, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=2400, help="Synthetic frame height")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.device:
+        bench_device(args.device, args.runs)
+    else:
+        bench_synthetic(args.width, args.height, args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
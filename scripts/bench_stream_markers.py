@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark action-marker detection on streamed model output.
+
+Feeds synthetic streams (thinking text split into token-sized deltas, followed
+by an action call) through the previous marker logic (re-check every marker
+and every marker prefix against a growing buffer, `raw_content +=`) and the
+current _StreamState (incremental Aho-Corasick scanner, chunks joined once).
+Thinking deltas go to a no-op event sink so printing is not measured.
+
+Usage:
+  python3 scripts/bench_stream_markers.py
+  python3 scripts/bench_stream_markers.py --tokens 10000 --runs 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phone_agent.events import AgentEventType, emit_event
+from phone_agent.model.client import _StreamState
+
+WORDS = (
+    "the screen shows a list of chats and I need to find the contact named "
+    "Zhang then tap on it to open the conversation field and send a message "
+    "fixed offered did find before checked scrolled, needed; of if 当前 页面 "
+    "显示 了 聊天 列表 需要 找到 联系人 并 点击 进入 对话"
+).split()
+
+
+class LegacyStreamState:
+    """The marker handling _StreamState used before the shared scanner."""
+
+    ACTION_MARKERS = ["finish(message=", "do(action="]
+
+    def __init__(self, start_time, event_sink=None):
+        self.start_time = start_time
+        self.event_sink = event_sink
+        self.raw_content = ""
+        self.time_to_first_token = None
+        self._buffer = ""
+        self._in_action_phase = False
+
+    def feed(self, content):
+        self.raw_content += content
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.time() - self.start_time
+        if self._in_action_phase:
+            return
+        self._buffer += content
+        for marker in self.ACTION_MARKERS:
+            if marker in self._buffer:
+                self._echo(self._buffer.split(marker, 1)[0])
+                self._in_action_phase = True
+                return
+        for marker in self.ACTION_MARKERS:
+            for i in range(1, len(marker)):
+                if self._buffer.endswith(marker[:i]):
+                    return
+        self._echo(self._buffer)
+        self._buffer = ""
+
+    def _echo(self, text):
+        if text:
+            emit_event(self.event_sink, AgentEventType.THINKING_DELTA, text=text)
+
+
+def synthetic_stream(tokens: int, seed: int) -> list[str]:
+    """Token-sized deltas of a long thinking text, then an action and a tail."""
+    rng = random.Random(seed)
+    deltas = []
+    for _ in range(tokens):
+        word = rng.choice(WORDS)
+        # Tokenizers often split words; partial words end in 'd'/'f' a lot
+        if len(word) > 4 and rng.random() < 0.3:
+            cut = rng.randint(1, len(word) - 1)
+            deltas += [" " + word[:cut], word[cut:]]
+        else:
+            deltas.append(" " + word)
+    deltas += ["\n", "do", "(action", '="Tap"', ", element", "=[500", ", 300", "])"]
+    deltas += ["\n"] * 5
+    return deltas
+
+
+def bench(state_cls, streams: list[list[str]]) -> float:
+    sink = lambda event: None
+    start = time.perf_counter()
+    for deltas in streams:
+        state = state_cls(time.time(), sink)
+        for delta in deltas:
+            state.feed(delta)
+        _ = state.raw_content  # Materialize the full text like _finish_response does
+    return (time.perf_counter() - start) / len(streams)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tokens", type=int, default=10000, help="Thinking tokens per stream")
+    parser.add_argument("--runs", type=int, default=10, help="Streams per implementation")
+    args = parser.parse_args()
+
+    streams = [synthetic_stream(args.tokens, seed) for seed in range(args.runs)]
+    chars = sum(len(d) for d in streams[0])
+    print(f"{args.runs} streams x {len(streams[0])} deltas ({chars / 1024:.0f} KB each)")
+
+    legacy = bench(LegacyStreamState, streams)
+    current = bench(_StreamState, streams)
+    print(f"legacy  {legacy * 1000:8.2f} ms/stream")
+    print(f"current {current * 1000:8.2f} ms/stream   x{legacy / current:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,7 @@ supporting headless systems and multi-user web access.
 """
 
 import logging
+import os
 import sys
 from contextlib import asynccontextmanager
 from http.cookies import SimpleCookie
@@ -172,6 +173,13 @@ async def lifespan(app: FastAPI):
     set_scrcpy_loop(asyncio.get_event_loop())
     logger.info("Main event loop registered for scrcpy callbacks")
 
+    # Serve agent screenshots from running scrcpy sessions (screencap is the fallback)
+    if os.getenv("PHONE_AGENT_SCRCPY_FRAMES", "1") != "0":
+        from phone_agent.frame_source import register_frame_source
+        from web_app.services.scrcpy_service import scrcpy_frame_source
+        register_frame_source(scrcpy_frame_source)
+        logger.info("scrcpy frame source registered for agent screenshots")
+
     # Start the scheduler
     await scheduler_service.start()
     logger.info("Scheduler started")
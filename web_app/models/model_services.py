@@ -103,6 +103,13 @@ class ModelServiceConfig:
     description: str = ""  # 服务描述
     protocol: str = ModelProtocol.OPENAI.value  # 协议类型
     category: str = ""  # 分类（用于UI分组显示）
+    context_budget: int = 0  # 上下文 token 预算（0 表示按模型自动选择）
+    max_concurrency: int = 0  # 同一服务端点的最大并发请求数（0 表示使用网关默认值）
+    fast_service_id: str = ""  # 常规步骤使用的快速模型服务 ID（空表示不分层路由）
+    hedge_service_id: str = ""  # 首 token 超时时对冲请求的备用服务 ID（空表示不对冲）
+    max_request_kb: int = 0  # 单次请求体积上限 KB（0 表示按协议默认值）
+    max_images: int = 0  # 单次请求图片数上限（0 表示按协议默认值）
+    retry_policy: dict = field(default_factory=dict)  # 重试与熔断策略（RetryPolicy 字段，空表示默认值）
 
     def __post_init__(self):
         if not self.id:
@@ -442,11 +449,11 @@ class ModelServicesManager:
         try:
             protocol = (service.protocol or ModelProtocol.OPENAI.value).lower()
             normalized_base_url = self._normalize_openai_like_base_url(service.base_url, protocol)
-            client = OpenAI(
-                base_url=normalized_base_url or service.base_url,
-                api_key=service.api_key or "EMPTY",
-                timeout=30,
-            )
+            from phone_agent.model.pool import get_client_pool
+
+            client = get_client_pool().get(
+                protocol, normalized_base_url or service.base_url, service.api_key or "EMPTY"
+            ).with_options(timeout=30)
 
             # 尝试调用 models 接口
             try:
@@ -540,11 +547,11 @@ class ModelServicesManager:
             elif base_url.endswith('/v1'):
                 base_url = base_url[:-3]  # 移除 /v1
 
-            client = anthropic.Anthropic(
-                api_key=service.api_key or "EMPTY",
-                base_url=base_url,
-                timeout=30,
-            )
+            from phone_agent.model.pool import get_client_pool
+
+            client = get_client_pool().get(
+                ModelProtocol.ANTHROPIC.value, base_url, service.api_key or "EMPTY"
+            ).with_options(timeout=30)
 
             response = client.messages.create(
                 model=service.model_name,
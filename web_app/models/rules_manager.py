@@ -378,9 +378,9 @@ class RulesManager:
 
     def _sync_apps_to_runtime(self):
         """同步应用映射到运行时"""
-        from phone_agent.config.apps import APP_PACKAGES
-        # 将自定义应用添加到运行时字典
-        APP_PACKAGES.update(self._custom_apps)
+        from phone_agent.config.apps import register_apps
+        # 将自定义应用添加到运行时字典（同时重建包名反查索引）
+        register_apps(self._custom_apps)
 
     # ========== 时间延迟规则 ==========
 
@@ -408,6 +408,14 @@ class RulesManager:
             "connection": {
                 "adb_restart_delay": TIMING_CONFIG.connection.adb_restart_delay,
                 "server_restart_delay": TIMING_CONFIG.connection.server_restart_delay,
+            },
+            "settle": {
+                "enabled": float(TIMING_CONFIG.settle.enabled),
+                "min_delay": TIMING_CONFIG.settle.min_delay,
+                "max_delay": TIMING_CONFIG.settle.max_delay,
+                "poll_interval": TIMING_CONFIG.settle.poll_interval,
+                "stable_frames": TIMING_CONFIG.settle.stable_frames,
+                "diff_threshold": TIMING_CONFIG.settle.diff_threshold,
             }
         }
         return config
@@ -430,6 +438,10 @@ class RulesManager:
             setattr(TIMING_CONFIG.device, key, value)
         elif category == "connection":
             setattr(TIMING_CONFIG.connection, key, value)
+        elif category == "settle":
+            # enabled / stable_frames 以数值形式存储，按字段原类型还原
+            current = getattr(TIMING_CONFIG.settle, key, value)
+            setattr(TIMING_CONFIG.settle, key, type(current)(value))
 
     # ========== 动作规则 ==========
 
@@ -25,6 +25,13 @@ class ModelServiceCreate(BaseModel):
     description: str = ""
     protocol: str = "openai"
     category: str = ""
+    context_budget: int = 0
+    max_concurrency: int = 0
+    fast_service_id: str = ""
+    hedge_service_id: str = ""
+    max_request_kb: int = 0
+    max_images: int = 0
+    retry_policy: dict = {}
 
 
 class ModelServiceUpdate(BaseModel):
@@ -41,6 +48,13 @@ class ModelServiceUpdate(BaseModel):
     is_active: bool = False
     protocol: str = "openai"
     category: str = ""
+    context_budget: int = 0
+    max_concurrency: int = 0
+    fast_service_id: str = ""
+    hedge_service_id: str = ""
+    max_request_kb: int = 0
+    max_images: int = 0
+    retry_policy: dict = {}
 
 
 class TestConfigRequest(BaseModel):
@@ -73,6 +87,22 @@ async def get_preset_templates(_: bool = Depends(verify_token)):
     return {"presets": presets}
 
 
+@router.get("/gateway/stats")
+async def get_gateway_stats(_: bool = Depends(verify_token)):
+    """Get per-endpoint request concurrency and queue-wait statistics."""
+    from phone_agent.model.gateway import get_model_gateway
+
+    return {"endpoints": get_model_gateway().get_stats()}
+
+
+@router.get("/retry/stats")
+async def get_model_retry_stats(_: bool = Depends(verify_token)):
+    """Get per-endpoint circuit breaker state and retry counters."""
+    from phone_agent.model.retry import get_retry_stats
+
+    return {"endpoints": get_retry_stats()}
+
+
 @router.get("/{service_id}")
 async def get_model(service_id: str, _: bool = Depends(verify_token)):
     """Get a specific model service."""
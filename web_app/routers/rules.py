@@ -26,7 +26,7 @@ class AppMappingUpdateRequest(BaseModel):
 
 
 class TimingUpdateRequest(BaseModel):
-    category: str  # "action", "device", or "connection"
+    category: str  # "action", "device", "connection", or "settle"
     key: str
     value: float
 
@@ -128,7 +128,7 @@ async def update_timing_config(
     """更新时间配置"""
     manager = get_rules_manager()
     
-    if request.category not in ["action", "device", "connection"]:
+    if request.category not in ["action", "device", "connection", "settle"]:
         raise HTTPException(status_code=400, detail="无效的配置类别")
     
     success = manager.update_timing(request.category, request.key, request.value)
@@ -238,3 +238,19 @@ async def clear_task_logs(task_id: str, _: bool = Depends(verify_token)):
     """Clear logs for a specific task."""
     scheduler_service.clear_task_logs(task_id)
     return {"success": True, "message": "Logs cleared"}
+
+
+@router.delete("/tasks/{task_id}/trajectory-cache")
+async def clear_task_trajectory_cache(task_id: str, _: bool = Depends(verify_token)):
+    """Clear cached trajectories for a specific task."""
+    success = scheduler_service.clear_task_trajectories(task_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"success": True, "message": "Trajectory cache cleared"}
+
+
+@router.get("/trajectory-cache/stats")
+async def get_trajectory_cache_stats(_: bool = Depends(verify_token)):
+    """Get trajectory cache statistics (entries, replayed steps, hits, misses)."""
+    from phone_agent.trajectory_cache import get_trajectory_cache
+    return get_trajectory_cache().get_stats()
@@ -15,6 +15,7 @@ from web_app.auth import verify_token
 from web_app.config import config_manager
 from web_app.services.email_service import email_service
 from phone_agent.config import SCREENSHOT_CONFIG
+from phone_agent.config.screenshot import CAPTURE_FORMATS, RESAMPLE_FILTERS
 
 logger = logging.getLogger(__name__)
 
@@ -111,6 +112,12 @@ class ScreenshotSettings(BaseModel):
     """Screenshot configuration settings."""
     max_image_dimension: int = Field(ge=100, le=4000, description="Maximum image dimension")
     jpeg_quality: int = Field(ge=1, le=100, description="JPEG quality (1-100)")
+    image_format: str = Field(default="jpeg", pattern="^(jpeg|webp)$", description="Image format sent to the model")
+    resample: str = Field(default="lanczos", description="Resize filter")
+    jpeg_optimize: bool = Field(default=False, description="Optimized JPEG Huffman tables (smaller, slower encode)")
+    encode_workers: int = Field(default=0, ge=0, le=32, description="Encoder worker processes (0 = in-process)")
+    capture_format: str = Field(default="png", pattern="^(png|raw)$", description="Capture format (png or raw)")
+    device_capture_formats: Dict[str, str] = Field(default_factory=dict, description="Per-device capture format")
 
 
 def load_config_from_file() -> Dict[str, Any]:
@@ -141,7 +148,13 @@ async def get_screenshot_settings(_: bool = Depends(verify_token)) -> Screenshot
     """Get current screenshot settings."""
     return ScreenshotSettings(
         max_image_dimension=SCREENSHOT_CONFIG.max_image_dimension,
-        jpeg_quality=SCREENSHOT_CONFIG.jpeg_quality
+        jpeg_quality=SCREENSHOT_CONFIG.jpeg_quality,
+        image_format=SCREENSHOT_CONFIG.image_format,
+        resample=SCREENSHOT_CONFIG.resample,
+        jpeg_optimize=SCREENSHOT_CONFIG.jpeg_optimize,
+        encode_workers=SCREENSHOT_CONFIG.encode_workers,
+        capture_format=SCREENSHOT_CONFIG.capture_format,
+        device_capture_formats=SCREENSHOT_CONFIG.device_capture_formats,
     )
 
 
@@ -151,18 +164,36 @@ async def update_screenshot_settings(
     _: bool = Depends(verify_token)
 ) -> Dict[str, str]:
     """Update screenshot settings."""
+    invalid = {d: f for d, f in settings.device_capture_formats.items() if f not in CAPTURE_FORMATS}
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid capture format: {invalid}")
+    if settings.resample not in RESAMPLE_FILTERS:
+        raise HTTPException(status_code=400, detail=f"Invalid resample filter: {settings.resample}")
+
     try:
         # Update runtime config
         SCREENSHOT_CONFIG.max_image_dimension = settings.max_image_dimension
         SCREENSHOT_CONFIG.jpeg_quality = settings.jpeg_quality
+        SCREENSHOT_CONFIG.image_format = settings.image_format
+        SCREENSHOT_CONFIG.resample = settings.resample
+        SCREENSHOT_CONFIG.jpeg_optimize = settings.jpeg_optimize
+        SCREENSHOT_CONFIG.encode_workers = settings.encode_workers
+        SCREENSHOT_CONFIG.capture_format = settings.capture_format
+        SCREENSHOT_CONFIG.device_capture_formats = dict(settings.device_capture_formats)
         
         # Persist to file
         save_config_to_file({
             "max_image_dimension": settings.max_image_dimension,
-            "jpeg_quality": settings.jpeg_quality
+            "jpeg_quality": settings.jpeg_quality,
+            "image_format": settings.image_format,
+            "resample": settings.resample,
+            "jpeg_optimize": settings.jpeg_optimize,
+            "encode_workers": settings.encode_workers,
+            "capture_format": settings.capture_format,
+            "device_capture_formats": settings.device_capture_formats,
         })
         
-        logger.info(f"Updated screenshot config: dimension={settings.max_image_dimension}, quality={settings.jpeg_quality}")
+        logger.info(f"Updated screenshot config: dimension={settings.max_image_dimension}, quality={settings.jpeg_quality}, format={settings.capture_format}")
         return {"status": "success", "message": "Screenshot settings updated"}
     except Exception as e:
         logger.error(f"Failed to update screenshot settings: {e}")
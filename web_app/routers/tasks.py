@@ -81,7 +81,7 @@ async def decompose_task(
     使用当前激活的模型服务进行任务拆解。
     """
     from web_app.services.model_service import model_service
-    from openai import OpenAI
+    from phone_agent.model.pool import get_client_pool
     import json
 
     active_model = model_service.get_active_service()
@@ -164,17 +164,14 @@ async def decompose_task(
             if base_url.endswith('/messages'):
                 base_url = base_url[:-9]
 
-            client = anthropic.Anthropic(
-                api_key=active_model.api_key or "EMPTY",
-                base_url=base_url,
-            )
-
-            logger.info("[API调用] 正在发送请求到 Anthropic 模型...")
-            response = client.messages.create(
-                model=active_model.model_name,
-                max_tokens=2000,
-                messages=[{"role": "user", "content": decompose_prompt}],
-            )
+            # Pooled client: reuses the agents' keep-alive connections
+            with get_client_pool().lease(protocol, base_url, active_model.api_key or "EMPTY") as client:
+                logger.info("[API调用] 正在发送请求到 Anthropic 模型...")
+                response = client.messages.create(
+                    model=active_model.model_name,
+                    max_tokens=2000,
+                    messages=[{"role": "user", "content": decompose_prompt}],
+                )
             content = response.content[0].text if response.content else ""
             tokens = response.usage.input_tokens + response.usage.output_tokens if response.usage else 0
             logger.info("[API调用] 收到 Anthropic 响应")
@@ -186,18 +183,16 @@ async def decompose_task(
                 api_key = active_model.api_key or "ollama"
             else:
                 api_key = active_model.api_key or "EMPTY"
-            client = OpenAI(
-                base_url=normalized_base_url or active_model.base_url,
-                api_key=api_key,
-            )
-
-            logger.info("[API调用] 正在发送请求到模型...")
-            response = client.chat.completions.create(
-                model=active_model.model_name,
-                messages=[{"role": "user", "content": decompose_prompt}],
-                max_tokens=2000,
-                temperature=0.3,
-            )
+            with get_client_pool().lease(
+                protocol, normalized_base_url or active_model.base_url, api_key
+            ) as client:
+                logger.info("[API调用] 正在发送请求到模型...")
+                response = client.chat.completions.create(
+                    model=active_model.model_name,
+                    messages=[{"role": "user", "content": decompose_prompt}],
+                    max_tokens=2000,
+                    temperature=0.3,
+                )
             content = response.choices[0].message.content if response.choices else ""
             tokens = response.usage.total_tokens if response.usage else 0
             logger.info("[API调用] 收到模型响应")
@@ -395,6 +390,38 @@ async def get_task_status(_: bool = Depends(verify_token)):
     )
 
 
+@router.get("/{task_id}/timeline")
+async def get_task_timeline(
+    task_id: str,
+    format: str = "json",
+    _: bool = Depends(verify_token)
+):
+    """
+    Get the per-step latency breakdown of a task.
+
+    format=json returns spans and per-phase totals per device; format=chrome
+    returns Chrome trace events (chrome://tracing, ui.perfetto.dev).
+    """
+    from phone_agent.profiler import get_timeline_store
+
+    timelines = get_timeline_store().get(task_id)
+    if not timelines:
+        raise HTTPException(status_code=404, detail="No timeline recorded for this task")
+
+    if format == "chrome":
+        events = []
+        for pid, timeline in enumerate(timelines.values(), start=1):
+            events.extend(timeline.to_chrome_trace(pid)["traceEvents"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'chrome'")
+
+    return {
+        "task_id": task_id,
+        "devices": {device_id: timeline.to_dict() for device_id, timeline in timelines.items()},
+    }
+
+
 @router.get("/history")
 async def get_task_history(
     limit: int = 10,
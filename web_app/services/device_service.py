@@ -134,7 +134,7 @@ class DeviceService:
         return self._devices.get(device_id)
 
     async def get_screenshot(self, device_id: str) -> Optional[bytes]:
-        """Get screenshot from a device as PNG bytes using phone_agent."""
+        """Get screenshot from a device as encoded image bytes (JPEG by default) using phone_agent."""
         device = self._devices.get(device_id)
         if not device:
             return None
@@ -142,16 +142,14 @@ class DeviceService:
         try:
             # Use phone_agent's screenshot function
             from phone_agent.adb import get_screenshot
-            import base64
 
             loop = asyncio.get_event_loop()
 
             def get_screenshot_sync():
-                # get_screenshot returns a Screenshot object with base64_data
+                # get_screenshot returns a Screenshot object with the encoded image
                 screenshot = get_screenshot(device_id)
-                if screenshot and screenshot.base64_data:
-                    # Decode base64 to bytes
-                    return base64.b64decode(screenshot.base64_data)
+                if screenshot and screenshot.data:
+                    return bytes(screenshot.data)
                 return None
 
             png_data = await loop.run_in_executor(None, get_screenshot_sync)
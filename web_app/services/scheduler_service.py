@@ -200,6 +200,7 @@ class SchedulerService:
         """Update an existing task."""
         if task.id not in self.tasks:
             return False
+        self._invalidate_trajectories(self.tasks[task.id])
         task.update_next_run()
         self.tasks[task.id] = task
         self._storage.save_task(task)
@@ -208,11 +209,31 @@ class SchedulerService:
     def delete_task(self, task_id: str) -> bool:
         """Delete a task."""
         if task_id in self.tasks:
+            self._invalidate_trajectories(self.tasks[task_id])
             del self.tasks[task_id]
             self._storage.delete_task(task_id)
             return True
         return False
 
+    def _invalidate_trajectories(self, task: ScheduledTask):
+        """Drop cached trajectories recorded for a task's previous content."""
+        # Scheduled runs pass task_content unchanged through TaskService.run_task
+        # to agent.arun, so it is the task string the trajectories are keyed by
+        try:
+            from phone_agent.trajectory_cache import get_trajectory_cache
+            removed = get_trajectory_cache().invalidate(task.task_content)
+            if removed:
+                logger.info(f"Invalidated {removed} cached trajectories for task {task.id}")
+        except Exception as e:
+            logger.warning(f"Failed to invalidate trajectory cache: {e}")
+
+    def clear_task_trajectories(self, task_id: str) -> bool:
+        """Drop cached trajectories of a task so its next run asks the model again."""
+        if task_id not in self.tasks:
+            return False
+        self._invalidate_trajectories(self.tasks[task_id])
+        return True
+
     def get_task(self, task_id: str) -> Optional[ScheduledTask]:
         """Get a task by ID."""
         return self.tasks.get(task_id)
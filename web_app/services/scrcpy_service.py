@@ -24,6 +24,10 @@ from typing import Optional, Set
 
 from PIL import Image
 
+from phone_agent.adb.geometry import get_geometry_cache, parse_rotation
+from phone_agent.config.screenshot import SCREENSHOT_CONFIG
+from phone_agent.frame_source import Frame, FrameSource
+
 logger = logging.getLogger(__name__)
 
 # Locate scrcpy-server v3 JAR (from homebrew scrcpy or manual path)
@@ -153,6 +157,7 @@ class ScrcpySession:
     _last_rotation_check_ts: float = 0.0
     _prefer_no_meta: bool = False
     _current_frame_meta: bool = False
+    headless: bool = False  # Started for agent screenshots, not for a viewer
 
 
 class ScrcpyService:
@@ -1844,83 +1849,19 @@ class ScrcpyService:
             session._local_port = 0
 
     async def _get_screen_size(self, device_id: str) -> tuple[int, int]:
-        """Get device screen dimensions via adb."""
-        loop = asyncio.get_event_loop()
-
-        def _get():
-            result = subprocess.run(
-                ["adb", "-s", device_id, "shell", "wm", "size"],
-                capture_output=True, text=True, timeout=15
-            )
-            for line in result.stdout.strip().split('\n'):
-                if 'size' in line.lower():
-                    parts = line.split(':')[-1].strip().split('x')
-                    if len(parts) == 2:
-                        try:
-                            return int(parts[0]), int(parts[1])
-                        except ValueError:
-                            pass
-            return 0, 0
-
-        return await loop.run_in_executor(None, _get)
+        """Get device natural (rotation 0) screen dimensions from the shared geometry cache."""
+        geometry = await get_geometry_cache().aget(device_id)
+        return geometry.width, geometry.height
 
     async def _get_display_rotation(self, device_id: str) -> int:
-        """Get current display rotation (0/1/2/3). Returns -1 if unavailable."""
+        """Get current display rotation (0/1/2/3). Returns -1 if unavailable.
+
+        Always queries the device (this is how rotation changes are detected)
+        and records the result in the shared geometry cache.
+        """
         loop = asyncio.get_event_loop()
 
         def _get():
-            import re
-
-            def parse_rotation(text: str) -> int:
-                if not text:
-                    return -1
-                patterns = (
-                    r"SurfaceOrientation:\s*([0-3])",
-                    r"Surface orientation:\s*([0-3])",
-                    r"SurfaceOrientation(?:=|\s+)([0-3])",
-                    r"mCurrentRotation(?:=|:\s*)([0-3])",
-                    r"mRotation(?:=|:\s*)([0-3])",
-                    r"mCurrentOrientation(?:=|:\s*)([0-3])",
-                    r"orientation(?:=|:\s*|\s+)([0-3])",
-                    r"rotation(?:=|:\s*)([0-3])",
-                )
-                for pattern in patterns:
-                    m = re.search(pattern, text, re.IGNORECASE)
-                    if not m:
-                        continue
-                    try:
-                        value = int(m.group(1))
-                    except Exception:
-                        continue
-                    if 0 <= value <= 3:
-                        return value
-
-                # Some devices print symbolic rotation names.
-                symbolic_patterns = (
-                    r"mCurrentRotation(?:=|:\s*)ROTATION_(0|90|180|270)",
-                    r"mRotation(?:=|:\s*)ROTATION_(0|90|180|270)",
-                    r"rotation(?:=|:\s*)ROTATION_(0|90|180|270)",
-                )
-                symbolic_map = {0: 0, 90: 1, 180: 2, 270: 3}
-                for pattern in symbolic_patterns:
-                    m = re.search(pattern, text, re.IGNORECASE)
-                    if not m:
-                        continue
-                    try:
-                        deg = int(m.group(1))
-                    except Exception:
-                        continue
-                    if deg in symbolic_map:
-                        return symbolic_map[deg]
-
-                m = re.search(r"^\s*([0-3])\s*$", text.strip())
-                if m:
-                    try:
-                        return int(m.group(1))
-                    except Exception:
-                        pass
-                return -1
-
             cmds = [
                 ["adb", "-s", device_id, "shell", "dumpsys", "input"],
                 ["adb", "-s", device_id, "shell", "dumpsys", "window", "displays"],
@@ -1946,7 +1887,9 @@ class ScrcpyService:
 
             return -1
 
-        return await loop.run_in_executor(None, _get)
+        rotation = await loop.run_in_executor(None, _get)
+        get_geometry_cache().update_rotation(device_id, rotation)
+        return rotation
 
     @staticmethod
     def _apply_rotation_to_size(width: int, height: int, rotation: int) -> tuple[int, int]:
@@ -2542,5 +2485,64 @@ class ScrcpyService:
         logger.info("All streaming sessions cleaned up")
 
 
+class ScrcpyFrameSource(FrameSource):
+    """
+    Serves agent screenshots from the latest frame of a running scrcpy session.
+
+    With acquire()/release() a task run keeps a headless session (no viewer,
+    no control or audio channel) per device, so every step reads a streamed
+    frame instead of running screencap.
+    """
+
+    name = "scrcpy"
+
+    def __init__(self, service: ScrcpyService):
+        self._service = service
+        self._starting: dict[str, asyncio.Task] = {}
+
+    def get_frame(self, device_id: Optional[str]) -> Optional[Frame]:
+        session = self._service.get_session(device_id) if device_id else None
+        if not session or not session.is_streaming or not session.is_scrcpy:
+            return None
+        if not (session._client_thread and session._client_thread.is_alive()):
+            return None
+        frame, ts = session.last_frame, session.last_frame_ts
+        if not frame or ts <= 0:
+            return None
+        return Frame(data=frame, timestamp=ts)
+
+    async def acquire(self, device_id: str) -> bool:
+        """Start a headless session in the background; screencap serves until it has frames."""
+        session = self._service.get_session(device_id)
+        if session and session.is_streaming:
+            return False
+        if device_id in self._starting or not (_scrcpy_server_jar and _ffmpeg_available):
+            return False
+        self._starting[device_id] = asyncio.ensure_future(self._start_headless(device_id))
+        return True
+
+    async def release(self, device_id: str) -> None:
+        start_task = self._starting.pop(device_id, None)
+        if start_task is not None:
+            await asyncio.gather(start_task, return_exceptions=True)
+        session = self._service.get_session(device_id)
+        if not session or not session.headless or self._service._has_any_viewers(session):
+            return
+        session.headless = False
+        if session.is_streaming:
+            await self._service.stop_stream(device_id)
+
+    async def _start_headless(self, device_id: str) -> None:
+        try:
+            await self._service.start_stream(
+                device_id, max_size=SCREENSHOT_CONFIG.max_image_dimension
+            )
+            self._service.get_or_create_session(device_id).headless = True
+            logger.info(f"Headless scrcpy session started for agent screenshots on {device_id}")
+        except Exception as e:
+            logger.warning(f"Headless scrcpy session failed for {device_id}, using screencap: {e}")
+
+
 # Global service instance
 scrcpy_service = ScrcpyService()
+scrcpy_frame_source = ScrcpyFrameSource(scrcpy_service)
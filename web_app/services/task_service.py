@@ -4,9 +4,12 @@ Task execution service for running automation tasks.
 """
 
 import asyncio
+import contextvars
 import json
 import logging
+import os
 import sys
+import threading
 import uuid
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
@@ -20,6 +23,70 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 logger = logging.getLogger(__name__)
 
 
+class _TaskLogSink:
+    """Splits streamed text into lines and hands each complete line to on_line."""
+
+    def __init__(self, on_line: Callable[[str], None]):
+        self.on_line = on_line
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            self._buffer += text
+            lines = []
+            while '\n' in self._buffer:
+                line, self._buffer = self._buffer.split('\n', 1)
+                line = line.strip()
+                if line:
+                    lines.append(line)
+        for line in lines:
+            self.on_line(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            line, self._buffer = self._buffer.strip(), ""
+        if line:
+            self.on_line(line)
+
+
+# Log sink of the agent running in the current asyncio task (copied into
+# asyncio.to_thread workers), so concurrent agents on one loop keep their
+# output apart
+_current_log_sink: contextvars.ContextVar[Optional[_TaskLogSink]] = contextvars.ContextVar(
+    "current_log_sink", default=None
+)
+
+
+class _TaskStdoutRouter:
+    """sys.stdout proxy that also routes writes to the current agent's log sink."""
+
+    def __init__(self, original_stdout):
+        self.original_stdout = original_stdout
+
+    def write(self, text):
+        # Also write to original stdout for debugging
+        if self.original_stdout:
+            self.original_stdout.write(text)
+        sink = _current_log_sink.get()
+        if sink is not None:
+            sink.write(text)
+        return len(text)
+
+    def flush(self):
+        if self.original_stdout:
+            self.original_stdout.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.original_stdout, name)
+
+
+def _install_stdout_router() -> None:
+    """Install the stdout router once; it is inert outside agent runs."""
+    if not isinstance(sys.stdout, _TaskStdoutRouter):
+        sys.stdout = _TaskStdoutRouter(sys.stdout)
+
+
 class ChatSessionContext:
     """Context for managing chat session during task execution."""
 
@@ -502,7 +569,7 @@ class TaskService:
                 # Import phone_agent
                 from phone_agent import PhoneAgent
                 from phone_agent.agent import AgentConfig
-                from phone_agent.model import ModelConfig
+                from phone_agent.model import ModelConfig, RequestLimits, RetryPolicy
                 from web_app.services.model_service import model_service
 
                 # Get model config
@@ -516,26 +583,68 @@ class TaskService:
                             "max_tokens": active_model.max_tokens,
                             "temperature": active_model.temperature,
                             "protocol": active_model.protocol,
+                            "context_budget": active_model.context_budget,
+                            "max_concurrency": active_model.max_concurrency,
+                            "fast_service_id": active_model.fast_service_id,
+                            "hedge_service_id": active_model.hedge_service_id,
+                            "max_request_kb": active_model.max_request_kb,
+                            "max_images": active_model.max_images,
+                            "retry_policy": active_model.retry_policy,
                         }
 
                 if not model_config:
                     raise ValueError("No model service configured")
 
                 # Create proper config objects
-                model_cfg = ModelConfig(
-                    base_url=model_config.get("base_url", ""),
-                    api_key=model_config.get("api_key", ""),
-                    model_name=model_config.get("model_name", ""),
-                    max_tokens=model_config.get("max_tokens", 3000),
-                    temperature=model_config.get("temperature", 0.0),
-                    protocol=model_config.get("protocol", "openai"),
-                )
+                def to_model_config(config: dict) -> ModelConfig:
+                    return ModelConfig(
+                        base_url=config.get("base_url", ""),
+                        api_key=config.get("api_key", ""),
+                        model_name=config.get("model_name", ""),
+                        max_tokens=config.get("max_tokens", 3000),
+                        temperature=config.get("temperature", 0.0),
+                        protocol=config.get("protocol", "openai"),
+                        context_budget=config.get("context_budget") or None,
+                        max_concurrency=config.get("max_concurrency") or None,
+                        request_limits=RequestLimits(
+                            max_bytes=(config.get("max_request_kb") or 0) * 1024 or None,
+                            max_images=config.get("max_images") or None,
+                        ),
+                        retry_policy=RetryPolicy.from_dict(config.get("retry_policy") or {}),
+                    )
+
+                model_cfg = to_model_config(model_config)
+
+                # Tiered routing: routine steps go to the fast service
+                fast_model_cfg = None
+                fast_service_id = model_config.get("fast_service_id")
+                if fast_service_id:
+                    fast_service = model_service.get_service_by_id(fast_service_id)
+                    if fast_service:
+                        fast_model_cfg = to_model_config(fast_service)
+                    else:
+                        self._emit_log(task.id, f"Fast model service {fast_service_id} not found, routing disabled")
+
+                # Hedging: slow requests are also sent to a backup service
+                hedge_model_cfg = None
+                hedge_service_id = model_config.get("hedge_service_id")
+                if hedge_service_id:
+                    hedge_service = model_service.get_service_by_id(hedge_service_id)
+                    if hedge_service:
+                        hedge_model_cfg = to_model_config(hedge_service)
+                    else:
+                        self._emit_log(task.id, f"Hedge model service {hedge_service_id} not found, hedging disabled")
 
                 agent_cfg = AgentConfig(
                     device_id=device_id,
                     max_steps=50,
                     verbose=True,
                     debug_mode=debug_mode,
+                    pipelined=os.getenv("PHONE_AGENT_PIPELINED", "0") == "1",
+                    early_action=os.getenv("PHONE_AGENT_EARLY_ACTION", "0") == "1",
+                    # Scheduled tasks repeat the same instruction, so replay earlier runs
+                    trajectory_cache=task.is_scheduled
+                    and os.getenv("PHONE_AGENT_TRAJECTORY_CACHE", "1") == "1",
                 )
 
                 # Create tap preview callback if debug mode is enabled
@@ -549,6 +658,9 @@ class TaskService:
                     model_config=model_cfg,
                     agent_config=agent_cfg,
                     tap_preview_callback=tap_preview_callback,
+                    event_sink=self._make_event_sink(task.id),
+                    fast_model_config=fast_model_cfg,
+                    hedge_model_config=hedge_model_cfg,
                 )
 
                 # Run the agent
@@ -557,6 +669,12 @@ class TaskService:
                 # Store agent instance for cleanup on stop
                 self._agent_instances[device_id] = agent
 
+                # Keep a headless scrcpy session so steps read streamed frames
+                headless_frames = False
+                if os.getenv("PHONE_AGENT_SCRCPY_FRAMES", "1") == "headless":
+                    from web_app.services.scrcpy_service import scrcpy_frame_source
+                    headless_frames = await scrcpy_frame_source.acquire(device_id)
+
                 # Execute task
                 agent_task = asyncio.create_task(
                     self._run_agent(agent, task_content, task.id, device_id)
@@ -580,6 +698,8 @@ class TaskService:
                 finally:
                     self._running_agents.pop(device_id, None)
                     self._agent_instances.pop(device_id, None)
+                    if headless_frames:
+                        await scrcpy_frame_source.release(device_id)
 
             except ImportError as e:
                 result.status = TaskStatus.FAILED.value
@@ -923,123 +1043,97 @@ class TaskService:
         task_id: str,
         device_id: str
     ) -> bool:
-        """Run the phone agent asynchronously with real-time log capture."""
-        import io
-        import sys
-        import threading
-        import queue
+        """
+        Run the phone agent on the event loop.
 
+        Progress arrives as structured events (see _make_event_sink); any
+        other output the agent prints is routed to this task's log as well.
+        """
         try:
-            loop = asyncio.get_event_loop()
+            from phone_agent.profiler import get_timeline_store, reset_timeline, set_timeline
 
-            # Queue for real-time log messages
-            log_queue = queue.Queue()
-
-            class RealTimeStdout:
-                """Custom stdout that captures and queues output in real-time."""
-                def __init__(self, original_stdout, log_queue):
-                    self.original_stdout = original_stdout
-                    self.log_queue = log_queue
-                    self.buffer = ""
-
-                def write(self, text):
-                    # Also write to original stdout for debugging
-                    if self.original_stdout:
-                        self.original_stdout.write(text)
-
-                    # Buffer and process lines
-                    self.buffer += text
-                    while '\n' in self.buffer:
-                        line, self.buffer = self.buffer.split('\n', 1)
-                        line = line.strip()
-                        if line:
-                            self.log_queue.put(line)
-
-                def flush(self):
-                    if self.original_stdout:
-                        self.original_stdout.flush()
-                    # Flush any remaining buffer
-                    if self.buffer.strip():
-                        self.log_queue.put(self.buffer.strip())
-                        self.buffer = ""
-
-            # Background task to process log queue
-            async def process_logs():
-                while True:
-                    try:
-                        # Non-blocking check for new logs
-                        while not log_queue.empty():
-                            line = log_queue.get_nowait()
-                            if line:
-                                # Check for token usage marker
-                                if line.startswith('[TOKENS]') and '[/TOKENS]' in line:
-                                    # Parse token info: [TOKENS]input,output,total[/TOKENS]
-                                    try:
-                                        token_str = line.replace('[TOKENS]', '').replace('[/TOKENS]', '')
-                                        parts = token_str.split(',')
-                                        if len(parts) == 3:
-                                            input_tokens = int(parts[0])
-                                            output_tokens = int(parts[1])
-                                            total_tokens = int(parts[2])
-                                            self._emit_tokens(task_id, input_tokens, output_tokens, total_tokens)
-                                    except Exception:
-                                        pass
-                                # Emit [TOKENS] lines (needed for Bot token tracking)
-                                if line.startswith('[TOKENS]'):
-                                    self._emit_log(task_id, line)
-                                    continue
-                                # Format and emit log
-                                if '💭' in line or '🎯' in line or '✅' in line or '🎉' in line:
-                                    self._emit_log(task_id, line)
-                                elif line.startswith('{') and '"' in line:
-                                    self._emit_log(task_id, f"  {line}")
-                                elif '==' in line:
-                                    self._emit_log(task_id, line)
-                                elif '思考' in line or 'think' in line.lower():
-                                    self._emit_log(task_id, f"🧠 {line}")
-                                elif line.strip() and not line.startswith('-'):
-                                    self._emit_log(task_id, line)
-                        await asyncio.sleep(0.1)  # Check every 100ms
-                    except asyncio.CancelledError:
-                        break
-                    except Exception:
-                        break
-
-            # Start log processor
-            log_task = asyncio.create_task(process_logs())
-
-            def run_sync_with_capture():
-                old_stdout = sys.stdout
-                sys.stdout = RealTimeStdout(old_stdout, log_queue)
-                try:
-                    result = agent.run(task_content)
-                    return result
-                finally:
-                    sys.stdout.flush()
-                    sys.stdout = old_stdout
+            _install_stdout_router()
+            loop = asyncio.get_running_loop()
+            sink = _TaskLogSink(
+                lambda line: loop.call_soon_threadsafe(self._emit_agent_output, task_id, line)
+            )
 
+            token = _current_log_sink.set(sink)
+            # Per-phase step timings, served by /api/tasks/{id}/timeline
+            timeline_token = set_timeline(get_timeline_store().create(task_id, device_id))
             try:
-                result = await loop.run_in_executor(None, run_sync_with_capture)
-                # Give time for remaining logs to be processed
-                await asyncio.sleep(0.5)
+                result = await agent.arun(task_content)
                 return result is not None
             finally:
-                log_task.cancel()
-                try:
-                    await log_task
-                except asyncio.CancelledError:
-                    pass
+                sink.flush()
+                reset_timeline(timeline_token)
+                _current_log_sink.reset(token)
 
         except Exception as e:
             self._emit_log(task_id, f"Agent error on {device_id}: {e}")
             return False
 
+    def _emit_agent_output(self, task_id: str, line: str):
+        """Emit a line the agent printed outside the structured events."""
+        if '✅' in line or '🎉' in line:
+            self._emit_log(task_id, line)
+        elif line.startswith('{') and '"' in line:
+            self._emit_log(task_id, f"  {line}")
+        elif '==' in line:
+            self._emit_log(task_id, line)
+        elif '思考' in line or 'think' in line.lower():
+            self._emit_log(task_id, f"🧠 {line}")
+        elif line.strip() and not line.startswith('-'):
+            self._emit_log(task_id, line)
+
+    def _make_event_sink(self, task_id: str):
+        """
+        Create the agent event sink for a task.
+
+        Events may be emitted from worker threads, so they are handed to the
+        event loop and turned into log, token and completion updates there.
+        """
+        from phone_agent.events import AgentEventType
+
+        loop = asyncio.get_running_loop()
+        thinking = _TaskLogSink(lambda line: self._emit_log(task_id, f"🧠 {line}"))
+
+        def handle(event):
+            if event.type == AgentEventType.THINKING_DELTA:
+                thinking.write(event.data["text"])
+            elif event.type == AgentEventType.STEP_STARTED:
+                self._emit_log(task_id, f"📍 步骤 {event.step}")
+            elif event.type == AgentEventType.ACTION_PARSED:
+                thinking.flush()
+                self._emit_log(task_id, f"🎯 执行动作: {event.data['summary']}")
+            elif event.type == AgentEventType.ACTION_EXECUTED:
+                if not event.data["success"] and event.data["message"]:
+                    self._emit_log(task_id, f"⚠️ 动作执行失败: {event.data['message']}")
+            elif event.type == AgentEventType.TOKENS:
+                input_tokens = event.data["input_tokens"]
+                output_tokens = event.data["output_tokens"]
+                total_tokens = event.data["total_tokens"]
+                self._emit_tokens(task_id, input_tokens, output_tokens, total_tokens)
+                # The [TOKENS] log line is still needed for Bot token tracking
+                self._emit_log(task_id, f"[TOKENS]{input_tokens},{output_tokens},{total_tokens}[/TOKENS]")
+                if event.data.get("cached_tokens"):
+                    self._emit_log(task_id, f"💾 提示词缓存命中: {event.data['cached_tokens']}/{input_tokens} tokens")
+            elif event.type == AgentEventType.FINISHED:
+                thinking.flush()
+                if event.data["success"]:
+                    self._emit_log(task_id, f"🎉 ✅ 任务完成: {event.data['message']}")
+                else:
+                    self._emit_log(task_id, f"⏹️ 任务结束: {event.data['message']}")
+
+        return lambda event: loop.call_soon_threadsafe(handle, event)
+
     async def stop_all_tasks(self) -> bool:
         """Stop all running tasks."""
         self._stop_requested = True
         logger.info("Stop signal received, attempting to stop all tasks")
 
-        # First, request stop on all agent instances (this is checked between steps)
+        # First, request stop on all agent instances. This is checked between
+        # steps and aborts in-flight model requests, freeing the inference server
         for device_id, agent in list(self._agent_instances.items()):
             try:
                 logger.info(f"Requesting stop for agent on device {device_id}")